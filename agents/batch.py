@@ -0,0 +1,412 @@
+"""Offline batch classification and proposal generation.
+
+For backlog processing without interactive latency, requests go through the
+providers' batch endpoints (OpenAI Batch API, Anthropic Message Batches) at
+half the token price (pricing.BATCH_DISCOUNT):
+
+1. write one request file per provider (native JSONL format, keyed by a
+   custom_id derived from the caller's item ID),
+2. submit it,
+3. poll until the batch has ended,
+4. merge the results back by ID, parsed exactly like interactive responses.
+
+Two backends implement submit / status / results:
+
+- ProviderBatchBackend: the real APIs through the shared LLM_CLIENTS.
+- LocalBatchBackend: a directory-based protocol served by the offline
+  stand-in benchmarks/fake_batch_server.py, so the whole flow runs
+  without network access.
+
+Usage:
+    python agents/batch.py backlog.jsonl results.jsonl [--backend local --dir data/batch_standin]
+
+backlog.jsonl holds one {"id": ..., "spec": ...} per line; results.jsonl gets
+classification, routing, proposal and batch-priced savings per item.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.classifier import (
+    CLASSIFIER_MODEL,
+    _classifier_messages,
+    _fallback_classification,
+    _parse_classification,
+)
+from agents.proposal import (
+    _anthropic_prompt,
+    _error_fallback,
+    _openai_messages,
+    _parse_anthropic_proposal,
+    _parse_openai_proposal,
+    _user_prompt,
+)
+from agents.router import route
+from utils.spec_parser import as_spec_features
+
+POLL_INTERVAL_S = 30.0
+BATCH_TIMEOUT_S = 24 * 3600.0
+
+_OPENAI_ENDPOINT = "/v1/chat/completions"
+
+
+def _provider(model):
+    return "anthropic" if model.startswith("claude") else "openai"
+
+
+def classification_request(custom_id, spec):
+    """Batch request line classifying spec with the classifier model."""
+    features = as_spec_features(spec)
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": _OPENAI_ENDPOINT,
+        "body": {
+            "model": CLASSIFIER_MODEL,
+            "messages": _classifier_messages(features.raw),
+            "response_format": {"type": "json_object"},
+            "temperature": 0.1,
+        },
+    }
+
+
+def proposal_request(custom_id, spec, model, matched_products):
+    """Batch request line generating a proposal with model (OpenAI or Anthropic format)."""
+    user_prompt = _user_prompt(as_spec_features(spec), matched_products, model)
+    if _provider(model) == "anthropic":
+        return {
+            "custom_id": custom_id,
+            "params": {
+                "model": model,
+                "max_tokens": 2048,
+                **_anthropic_prompt(user_prompt),
+            },
+        }
+    return {
+        "custom_id": custom_id,
+        "method": "POST",
+        "url": _OPENAI_ENDPOINT,
+        "body": {
+            "model": model,
+            "messages": _openai_messages(user_prompt),
+            "response_format": {"type": "json_object"},
+            "temperature": 0.3,
+        },
+    }
+
+
+def normalize_result(line):
+    """Return (custom_id, response body or None, error or None) for one result line.
+
+    Accepts OpenAI batch output lines ({"custom_id", "response", "error"})
+    and Anthropic batch results ({"custom_id", "result": {"type", ...}}).
+    """
+    custom_id = line["custom_id"]
+    if "result" in line:
+        result = line["result"]
+        if result.get("type") == "succeeded":
+            return custom_id, result["message"], None
+        return custom_id, None, json.dumps(result.get("error") or result.get("type"))
+    response = line.get("response") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        return custom_id, None, json.dumps(line.get("error") or response.get("body"))
+    return custom_id, response["body"], None
+
+
+class ProviderBatchBackend:
+    """Batch submission through the OpenAI and Anthropic batch APIs."""
+
+    def __init__(self, clients=None):
+        if clients is None:
+            from utils.llm_clients import LLM_CLIENTS
+
+            clients = LLM_CLIENTS
+        self._clients = clients
+
+    def submit(self, provider, request_path):
+        client = self._clients.client(provider)
+        if provider == "anthropic":
+            with open(request_path, encoding="utf-8") as f:
+                requests = [json.loads(line) for line in f if line.strip()]
+            return client.messages.batches.create(requests=requests).id
+        with open(request_path, "rb") as f:
+            uploaded = client.files.create(file=f, purpose="batch")
+        batch = client.batches.create(
+            input_file_id=uploaded.id, endpoint=_OPENAI_ENDPOINT, completion_window="24h"
+        )
+        return batch.id
+
+    def status(self, provider, batch_id):
+        """Return "in_progress", "completed" or "failed"."""
+        client = self._clients.client(provider)
+        if provider == "anthropic":
+            batch = client.messages.batches.retrieve(batch_id)
+            return "completed" if batch.processing_status == "ended" else "in_progress"
+        batch = client.batches.retrieve(batch_id)
+        if batch.status == "completed":
+            return "completed"
+        if batch.status in ("failed", "expired", "cancelled"):
+            return "failed"
+        return "in_progress"
+
+    def results(self, provider, batch_id):
+        """Yield raw result lines (dicts)."""
+        client = self._clients.client(provider)
+        if provider == "anthropic":
+            for entry in client.messages.batches.results(batch_id):
+                yield entry.model_dump()
+            return
+        batch = client.batches.retrieve(batch_id)
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if file_id:
+                for line in client.files.content(file_id).text.splitlines():
+                    if line.strip():
+                        yield json.loads(line)
+
+
+class LocalBatchBackend:
+    """Directory-based batch protocol served by benchmarks/fake_batch_server.py.
+
+    submit copies the request file to <directory>/<batch_id>/input.jsonl and
+    writes status.json ({"status": "in_progress", ...}). The stand-in
+    answers every line into output.jsonl (provider-native result format)
+    and sets the status to "completed".
+
+    Args:
+        directory: Shared directory between this client and the stand-in.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def submit(self, provider, request_path):
+        batch_id = f"batch_{uuid.uuid4().hex[:16]}"
+        batch_dir = os.path.join(self.directory, batch_id)
+        os.makedirs(batch_dir)
+        with open(request_path, encoding="utf-8") as src, \
+                open(os.path.join(batch_dir, "input.jsonl"), "w", encoding="utf-8") as dst:
+            dst.write(src.read())
+        write_status(batch_dir, {
+            "id": batch_id, "provider": provider, "status": "in_progress", "submitted_at": time.time(),
+        })
+        return batch_id
+
+    def status(self, provider, batch_id):
+        with open(os.path.join(self.directory, batch_id, "status.json"), encoding="utf-8") as f:
+            return json.load(f)["status"]
+
+    def results(self, provider, batch_id):
+        with open(os.path.join(self.directory, batch_id, "output.jsonl"), encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def write_status(batch_dir, status):
+    """Atomically write a local batch's status.json."""
+    path = os.path.join(batch_dir, "status.json")
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(status, f)
+    os.replace(path + ".tmp", path)
+
+
+def run_batch(requests, backend, workdir, name, poll_interval_s=POLL_INTERVAL_S, timeout_s=BATCH_TIMEOUT_S):
+    """Write, submit and poll one batch per provider; return results by custom_id.
+
+    Args:
+        requests: {provider: [request lines]}.
+        backend: ProviderBatchBackend or LocalBatchBackend.
+        workdir: Directory for the request files and the job manifest.
+        name: Prefix of the written files (e.g. "classify").
+
+    Returns:
+        {custom_id: (response body or None, error or None)} and the
+        manifest dict (batch IDs, request counts, turnaround seconds).
+    """
+    os.makedirs(workdir, exist_ok=True)
+    manifest = {"name": name, "batches": {}}
+    for provider, lines in requests.items():
+        if not lines:
+            continue
+        path = os.path.join(workdir, f"{name}-{provider}.jsonl")
+        with open(path, "w", encoding="utf-8") as f:
+            for line in lines:
+                f.write(json.dumps(line) + "\n")
+        manifest["batches"][provider] = {
+            "batch_id": backend.submit(provider, path), "requests": len(lines), "submitted_at": time.time(),
+        }
+    with open(os.path.join(workdir, f"{name}-manifest.json"), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    results = {}
+    deadline = time.monotonic() + timeout_s
+    pending = dict(manifest["batches"])
+    while pending:
+        for provider, info in list(pending.items()):
+            status = backend.status(provider, info["batch_id"])
+            if status == "in_progress":
+                continue
+            info["status"] = status
+            info["turnaround_s"] = round(time.time() - info["submitted_at"], 1)
+            if status == "completed":
+                for line in backend.results(provider, info["batch_id"]):
+                    custom_id, body, error = normalize_result(line)
+                    results[custom_id] = (body, error)
+            del pending[provider]
+        if pending:
+            if time.monotonic() >= deadline:
+                raise TimeoutError(f"Batches still running after {timeout_s:.0f}s: {sorted(pending)}")
+            time.sleep(poll_interval_s)
+    return results, manifest
+
+
+def _as_response(value):
+    """Turn a JSON response body into an object with attribute access, like the SDKs'."""
+    if isinstance(value, dict):
+        return SimpleNamespace(**{k: _as_response(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return [_as_response(v) for v in value]
+    return value
+
+
+def classify_batch(specs, backend, workdir, **poll):
+    """Classify many specs through the batch API.
+
+    Args:
+        specs: {item ID: spec text or SpecFeatures}.
+        backend, workdir, poll: See run_batch.
+
+    Returns:
+        {item ID: classification dict like classify_spec, with batch=True}.
+        latency_ms is the batch turnaround. Failed items get the MEDIUM
+        fallback classification with "error".
+    """
+    ids = {f"classify-{i}": item_id for i, item_id in enumerate(specs)}
+    requests = {"openai": [classification_request(cid, specs[item_id]) for cid, item_id in ids.items()]}
+    results, manifest = run_batch(requests, backend, workdir, "classify", **poll)
+    latency_ms = int(manifest["batches"]["openai"].get("turnaround_s", 0) * 1000) if ids else 0
+
+    classifications = {}
+    for custom_id, item_id in ids.items():
+        body, error = results.get(custom_id, (None, "missing from batch results"))
+        try:
+            if error:
+                raise RuntimeError(error)
+            result = _parse_classification(_as_response(body), latency_ms)
+        except Exception as e:
+            result = _fallback_classification(e, latency_ms)
+        classifications[item_id] = {**result, "from_cache": False, "batch": True}
+    return classifications
+
+
+def generate_proposals_batch(items, backend, workdir, **poll):
+    """Generate many proposals through the batch APIs (one batch per provider).
+
+    Args:
+        items: {item ID: (spec, model, matched_products)}.
+        backend, workdir, poll: See run_batch.
+
+    Returns:
+        {item ID: proposal dict like generate_proposal, with batch=True}.
+        Failed items get the error fallback.
+    """
+    ids, requests = {}, {"openai": [], "anthropic": []}
+    for i, (item_id, (spec, model, matched_products)) in enumerate(items.items()):
+        custom_id = f"proposal-{i}"
+        ids[custom_id] = (item_id, model)
+        requests[_provider(model)].append(proposal_request(custom_id, spec, model, matched_products))
+    results, manifest = run_batch(requests, backend, workdir, "proposal", **poll)
+
+    proposals = {}
+    for custom_id, (item_id, model) in ids.items():
+        info = manifest["batches"].get(_provider(model), {})
+        latency_ms = int(info.get("turnaround_s", 0) * 1000)
+        body, error = results.get(custom_id, (None, "missing from batch results"))
+        try:
+            if error:
+                raise RuntimeError(error)
+            parse = _parse_anthropic_proposal if _provider(model) == "anthropic" else _parse_openai_proposal
+            result = parse(_as_response(body), model, latency_ms)
+        except Exception as e:
+            result = _error_fallback(model, str(e), latency_ms)
+        proposals[item_id] = {**result, "batch": True}
+    return proposals
+
+
+def process_backlog(specs, backend, workdir, k=5, **poll):
+    """Classify, route, search and generate proposals for a backlog in two batch rounds.
+
+    Args:
+        specs: {item ID: spec text}.
+
+    Returns:
+        {item ID: {classification, routing, product_matches, proposal, savings}}
+        with savings priced at batch rates.
+    """
+    from products import search_products
+    from utils.cost_calculator import build_savings_summary
+    from utils.spec_parser import parse_spec
+
+    features = {item_id: parse_spec(spec) for item_id, spec in specs.items()}
+    classifications = classify_batch(features, backend, workdir, **poll)
+    routings = {item_id: route(c) for item_id, c in classifications.items()}
+    matches = {item_id: search_products(f, k=k) for item_id, f in features.items()}
+    proposals = generate_proposals_batch(
+        {item_id: (features[item_id], routings[item_id]["selected_model"], matches[item_id]) for item_id in specs},
+        backend, workdir, **poll,
+    )
+
+    merged = {}
+    for item_id in specs:
+        classification, proposal = classifications[item_id], proposals[item_id]
+        merged[item_id] = {
+            "classification": classification,
+            "routing": routings[item_id],
+            "product_matches": matches[item_id],
+            "proposal": proposal,
+            "savings": build_savings_summary(
+                CLASSIFIER_MODEL, classification, routings[item_id]["selected_model"], proposal, batch=True,
+            ),
+        }
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Process a spec backlog through the batch APIs.")
+    parser.add_argument("backlog_path", help="JSONL with one {\"id\", \"spec\"} per line")
+    parser.add_argument("output_path")
+    parser.add_argument("--backend", choices=("provider", "local"), default="provider")
+    parser.add_argument("--dir", default=os.path.join("data", "batch_standin"),
+                        help="Shared directory of the local stand-in (--backend local)")
+    parser.add_argument("--workdir", default=os.path.join("data", "batch_jobs"),
+                        help="Where request files and manifests are written")
+    parser.add_argument("--poll-interval", type=float, default=POLL_INTERVAL_S)
+    args = parser.parse_args()
+
+    with open(args.backlog_path, encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    specs = {str(r["id"]): r["spec"] for r in records}
+    backend = LocalBatchBackend(args.dir) if args.backend == "local" else ProviderBatchBackend()
+    workdir = os.path.join(args.workdir, time.strftime("%Y%m%d-%H%M%S"))
+
+    merged = process_backlog(specs, backend, workdir, poll_interval_s=args.poll_interval)
+    with open(args.output_path, "w", encoding="utf-8") as f:
+        for item_id, result in merged.items():
+            f.write(json.dumps({"id": item_id, **result}) + "\n")
+
+    batch_cost = sum(r["savings"]["actual_total_cost"] for r in merged.values())
+    batch_savings = sum(r["savings"]["batch_savings"] for r in merged.values())
+    errors = sum("error" in r["classification"] or "error" in r["proposal"] for r in merged.values())
+    print(f"{len(merged)} specs -> {args.output_path} ({errors} with errors)")
+    print(f"cost at batch rates: ${batch_cost:.4f}  |  saved vs. interactive: ${batch_savings:.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""Cheap-first cascade: local validation of proposal drafts and escalation.
+
+With cascade on (pipeline cascade=True, live mode), a request routed to
+GPT-5 Mini or Claude Sonnet 4 is first drafted by the tier below
+(agents.router.CASCADE_START). validate_proposal() checks the draft
+without another model call:
+
+- generation: the call (with its fallbacks) returned a proposal;
+- schema: the proposal fields have the types PROPOSAL_SYSTEM_PROMPT asks
+  for, match scores are 0-100, feasibility statuses are met, partial or
+  not met, and the output was not truncated;
+- catalog: every recommended product ID exists in the catalog, and a
+  search that found products yields at least one recommendation;
+- feasibility: every wavelength or power the feasibility matrix marks
+  "met" is covered by a recommended product, and if a matched product
+  covers a requested wavelength, a recommendation does too.
+
+A draft that passes is the proposal; one that fails, or a failed call, is
+escalated to the next tier up to the routed model, whose draft is kept
+either way. A draft is also kept when the deadline leaves no time to
+escalate.
+CASCADE_STATS compares what the cascade spent with the predicted cost of
+calling the routed model directly.
+"""
+
+import sys
+import os
+import threading
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import calculate_cost
+from products import get_product_by_id
+from agents.proposal import spec_coverage, spec_values
+from utils.spec_parser import parse_spec
+
+FEASIBILITY_STATUSES = ("met", "partial", "not met")
+VALIDATION_CHECKS = ("generation", "schema", "catalog", "feasibility")
+CASCADE_STOPS = ("accepted", "exhausted", "deadline")
+
+
+def validate_proposal(features, proposal, matched_products):
+    """Check a proposal draft against its schema, the catalog and the spec's numbers.
+
+    Args:
+        features: SpecFeatures of the customer spec.
+        proposal: Proposal dict from agents.proposal.
+        matched_products: Product matches the draft was written from.
+
+    Returns:
+        Dict with valid, errors (one message per problem, prefixed with
+        its check) and checks (names of the failed VALIDATION_CHECKS).
+    """
+    errors = []
+    if "error" in proposal:
+        errors.append(f"generation: the call failed ({proposal['error']})")
+    else:
+        errors += _schema_errors(proposal)
+        recommended = _recommended_products(proposal, errors)
+        if not recommended and matched_products and not any(e.startswith("catalog") for e in errors):
+            errors.append("catalog: no product recommended although the search found matches")
+        errors += _feasibility_errors(features, proposal, recommended, matched_products)
+    checks = sorted({e.split(":", 1)[0] for e in errors}, key=VALIDATION_CHECKS.index)
+    return {"valid": not errors, "errors": errors, "checks": checks}
+
+
+def _schema_errors(proposal):
+    errors = []
+    if proposal.get("repaired"):
+        errors.append("schema: output was truncated or malformed JSON")
+    if not isinstance(proposal.get("proposal_text"), str) or not proposal["proposal_text"].strip():
+        errors.append("schema: proposal_text is empty")
+    matches = proposal.get("product_matches")
+    if not isinstance(matches, list) or not all(isinstance(m, dict) for m in matches):
+        errors.append("schema: product_matches is not a list of objects")
+    else:
+        for match in matches:
+            score = match.get("match_score")
+            if not isinstance(match.get("product_id"), str):
+                errors.append("schema: product match without product_id")
+            if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 100:
+                errors.append(f"schema: match_score {score!r} of {match.get('product_id')} is not 0-100")
+    matrix = proposal.get("feasibility_matrix")
+    if not isinstance(matrix, dict):
+        errors.append("schema: feasibility_matrix is not an object")
+    else:
+        for parameter, row in matrix.items():
+            if not isinstance(row, dict) or str(row.get("status", "")).lower() not in FEASIBILITY_STATUSES:
+                errors.append(f"schema: feasibility status of {parameter!r} is not met, partial or not met")
+    steps = proposal.get("next_steps")
+    if not isinstance(steps, list) or not all(isinstance(s, str) for s in steps):
+        errors.append("schema: next_steps is not a list of strings")
+    return errors
+
+
+def _recommended_products(proposal, errors):
+    """Catalog records of the draft's recommendations; unknown IDs are added to errors."""
+    products = []
+    matches = proposal.get("product_matches")
+    for match in matches if isinstance(matches, list) else []:
+        product_id = match.get("product_id") if isinstance(match, dict) else None
+        if not isinstance(product_id, str):
+            continue
+        product = get_product_by_id(product_id)
+        if product is None:
+            errors.append(f"catalog: product {product_id!r} is not in the catalog")
+        else:
+            products.append(product)
+    return products
+
+
+def _feasibility_errors(features, proposal, recommended, matched_products):
+    covered = {label for product in recommended for label in spec_coverage(product, features)}
+    requested = {label for label, _, _ in spec_values(features)}
+    errors = []
+    matrix = proposal.get("feasibility_matrix")
+    for parameter, row in (matrix.items() if isinstance(matrix, dict) else ()):
+        if not isinstance(row, dict) or str(row.get("status", "")).lower() != "met":
+            continue
+        claimed = {label for label, _, _ in spec_values(parse_spec(f"{parameter}: {row.get('note', '')}"))}
+        claimed &= requested
+        for label in sorted(claimed - covered):
+            errors.append(f"feasibility: {parameter!r} is marked met, but no recommended product covers {label}")
+    wavelengths = {label for label, unit, _ in spec_values(features) if unit == "nm"}
+    if wavelengths and not wavelengths & covered:
+        feasible = [
+            match.get("product", match).get("id") for match in matched_products
+            if wavelengths & set(spec_coverage(match.get("product", match), features))
+        ]
+        if feasible:
+            errors.append(
+                f"feasibility: no recommendation covers a requested wavelength, but {feasible[0]} does"
+            )
+    return errors
+
+
+def cascade_attempt(proposal, validation):
+    """Record of one cascade draft: model, validation result, tokens and cost."""
+    return {
+        "model": proposal["model"],
+        "valid": validation["valid"],
+        "errors": validation["errors"],
+        "checks": validation["checks"],
+        "input_tokens": proposal["input_tokens"],
+        "output_tokens": proposal["output_tokens"],
+        "cost": calculate_cost(
+            proposal["model"], proposal["input_tokens"], proposal["output_tokens"],
+            cache_read_tokens=proposal.get("cache_read_tokens", 0),
+            cache_write_tokens=proposal.get("cache_write_tokens", 0),
+        ),
+        "latency_ms": proposal.get("latency_ms", 0),
+    }
+
+
+def cascade_record(path, attempts, direct_estimate, stopped):
+    """proposal["cascade"] for the drafts of one request.
+
+    Args:
+        path: Model requested for each draft (a draft's attempt names the
+            model that answered, which differs after a fallback).
+        attempts: cascade_attempt() records, in order; the last is the
+            proposal that was kept.
+        direct_estimate: Predicted call of the routed model
+            (agents.proposal.estimate_proposal), or None.
+        stopped: Why no further draft was made, one of CASCADE_STOPS:
+            the last draft passed, no higher tier was left, or the
+            deadline had run out.
+
+    escalation_* are the tokens and cost of the rejected drafts;
+    direct_cost is the predicted cost of calling the routed model
+    instead, or the actual cost when the routed model drafted the kept
+    proposal.
+    """
+    rejected = attempts[:-1]
+    final = attempts[-1]
+    direct_cost = direct_estimate["cost"] if direct_estimate else final["cost"]
+    if direct_estimate and final["model"] == direct_estimate["model"]:
+        direct_cost = final["cost"]
+    return {
+        "path": list(path),
+        "attempts": attempts,
+        "escalations": len(rejected),
+        "accepted": final["valid"],
+        "stopped": stopped,
+        "escalation_tokens": sum(a["input_tokens"] + a["output_tokens"] for a in rejected),
+        "escalation_cost": sum(a["cost"] for a in rejected),
+        "cascade_cost": sum(a["cost"] for a in attempts),
+        "direct_cost": direct_cost,
+    }
+
+
+class CascadeStats:
+    """Thread-safe counters of cascaded requests."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"requests": 0, "first_draft_accepted": 0, "escalations": 0,
+                        "cascade_cost": 0.0, "direct_cost": 0.0}
+        self._failed_checks = Counter()
+
+    def record(self, cascade):
+        """Record the cascade dict of one proposal (see cascade_record)."""
+        with self._lock:
+            self._counts["requests"] += 1
+            self._counts["first_draft_accepted"] += int(cascade["escalations"] == 0 and cascade["accepted"])
+            self._counts["escalations"] += cascade["escalations"]
+            self._counts["cascade_cost"] += cascade["cascade_cost"]
+            self._counts["direct_cost"] += cascade["direct_cost"]
+            for attempt in cascade["attempts"]:
+                self._failed_checks.update(attempt["checks"])
+
+    def summary(self):
+        """Return request and escalation counts, cascade vs direct cost and failed checks."""
+        with self._lock:
+            counts = dict(self._counts)
+            failed_checks = dict(self._failed_checks)
+        return {
+            **counts,
+            "failed_checks": failed_checks,
+            "escalation_rate": counts["escalations"] / counts["requests"] if counts["requests"] else 0.0,
+            "savings": counts["direct_cost"] - counts["cascade_cost"],
+        }
+
+
+CASCADE_STATS = CascadeStats()
@@ -1,7 +1,22 @@
 """Complexity classifier agent using GPT-5 Nano."""
 
 import json
+import logging
 import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.local_classifier import TierStats, local_classify, start_shadow
+from pricing import calculate_cost
+from utils.classification_cache import ClassificationCache, classification_key
+from utils.llm_clients import LLM_CLIENTS, openai_cache_tokens
+from utils.resilience import PROVIDER_HEALTH
+from utils.spec_parser import as_spec_features
+from utils.token_estimator import USAGE_HISTORY, count_message_tokens
+
+logger = logging.getLogger(__name__)
 
 CLASSIFIER_SYSTEM_PROMPT = """You are a technical classifier for laser and photonics requests.
 Analyze the customer specification and classify the complexity:
@@ -21,68 +36,320 @@ Respond ONLY with a JSON object:
 {"complexity": "SIMPLE|MEDIUM|COMPLEX", "reasoning": "brief explanation", "key_parameters": ["param1", "param2"]}"""
 
 
-def classify_spec(spec, demo_mode=True):
+CLASSIFIER_MODEL = "gpt-5-nano"
+
+# Persistent cache of live classifications (see utils.classification_cache).
+CLASSIFICATION_CACHE = ClassificationCache()
+
+# Tiered classification: live specs whose local confidence reaches the
+# threshold skip the API; a sample of them is re-checked by the LLM in the
+# background (see agents.local_classifier).
+LOCAL_CONFIDENCE_THRESHOLD = 0.85
+SHADOW_SAMPLE_RATE = 0.05
+TIER_STATS = TierStats()
+
+# Trained linear model for mode="local" (see utils.complexity_model), loaded
+# on first use; False once the model file turned out to be missing.
+LOCAL_LINEAR_MODEL = "local-linear"
+_complexity_model = None
+
+# Append every fresh live classification to this JSON Lines file when set;
+# the log is the training data for utils.complexity_model.
+CLASSIFICATION_LOG_PATH = os.environ.get("CLASSIFICATION_LOG_PATH")
+
+
+def classify_spec(spec, demo_mode=True, use_cache=True, local_threshold=LOCAL_CONFIDENCE_THRESHOLD,
+                  mode=None, deadline=None):
     """Classify customer specification complexity.
 
     Args:
-        spec: Customer specification text.
+        spec: Customer specification text or parsed SpecFeatures.
         demo_mode: If True, return mock data without API call.
+        use_cache: In live mode, reuse an earlier classification of the same
+            normalized spec (same prompt and model) instead of calling the API.
+        local_threshold: In live mode, answer locally when the local
+            classifier's confidence is at least this; None always calls
+            the API.
+        mode: "demo", "live" or "local". "local" answers with the trained
+            linear model from utils.complexity_model, offline and without
+            API calls. None picks "demo" or "live" from demo_mode.
+        deadline: Optional utils.resilience.Deadline for the live API call.
+            A call that misses it, fails, or hits an open circuit breaker
+            returns the MEDIUM fallback classification (with "error").
 
     Returns:
         Dict with complexity, reasoning, key_parameters, model,
-        input_tokens, output_tokens, latency_ms.
+        input_tokens, output_tokens, latency_ms and from_cache. For cached
+        results the token counts are those of the original call, which cost
+        nothing this time. Local answers have model "local-rules" or
+        "local-linear", zero tokens and a confidence.
     """
-    if demo_mode:
-        return _mock_classify(spec)
-    return _live_classify(spec)
+    features = as_spec_features(spec)
+    mode = _resolve_mode(mode, demo_mode)
+    if mode == "local":
+        return _model_classify(features)
+    if mode == "demo":
+        return {**_mock_classify(features), "from_cache": False}
 
+    start = time.time()
+    key = classification_key(features.raw, CLASSIFIER_SYSTEM_PROMPT, CLASSIFIER_MODEL)
+    cached = _cached_classification(key, start) if use_cache else None
+    if cached is not None:
+        return cached
 
-def _live_classify(spec):
-    """Call GPT-5 Nano for real classification."""
-    import openai
+    local, answer = _local_tier(features, local_threshold)
+    if answer is not None:
+        start_shadow(
+            lambda: _store_classification(key, _live_classify(features.raw), use_cache, features.raw),
+            local, TIER_STATS, sample_rate=SHADOW_SAMPLE_RATE,
+        )
+        return answer
+    result = _live_classify(features.raw, deadline)
+    return _llm_tier(local, _store_classification(key, result, use_cache, features.raw))
+
+
+async def classify_spec_async(spec, demo_mode=True, use_cache=True,
+                              local_threshold=LOCAL_CONFIDENCE_THRESHOLD, mode=None, deadline=None):
+    """Async variant of classify_spec using the async OpenAI client.
+
+    Same arguments and return value as classify_spec; lets the pipeline run
+    classification concurrently with other stages. The live call is also
+    hedged after GPT-5 Nano's p95 latency (see utils.resilience).
+    """
+    features = as_spec_features(spec)
+    mode = _resolve_mode(mode, demo_mode)
+    if mode == "local":
+        return _model_classify(features)
+    if mode == "demo":
+        return {**_mock_classify(features), "from_cache": False}
 
-    client = openai.OpenAI()
+    start = time.time()
+    key = classification_key(features.raw, CLASSIFIER_SYSTEM_PROMPT, CLASSIFIER_MODEL)
+    cached = _cached_classification(key, start) if use_cache else None
+    if cached is not None:
+        return cached
+
+    local, answer = _local_tier(features, local_threshold)
+    if answer is not None:
+        start_shadow(
+            lambda: _store_classification(key, _live_classify(features.raw), use_cache, features.raw),
+            local, TIER_STATS, sample_rate=SHADOW_SAMPLE_RATE,
+        )
+        return answer
+    result = await _live_classify_async(features.raw, deadline)
+    return _llm_tier(local, _store_classification(key, result, use_cache, features.raw))
+
+
+def estimate_classification(spec, local_threshold=LOCAL_CONFIDENCE_THRESHOLD):
+    """Predict the live classification call for spec before making it.
+
+    Args:
+        spec: Customer specification text or parsed SpecFeatures.
+        local_threshold: As in classify_spec; a spec the local classifier
+            answers costs nothing.
+
+    Returns:
+        Dict with complexity and confidence (the local classifier's
+        prediction), model, input_tokens, output_tokens, cost and
+        latency_ms of the call (all zero when answered locally).
+    """
+    features = as_spec_features(spec)
+    local = local_classify(features)
+    estimate = {"complexity": local["complexity"], "confidence": local["confidence"], "model": CLASSIFIER_MODEL}
+    if local_threshold is not None and local["confidence"] >= local_threshold:
+        return {**estimate, "model": local["model"], "input_tokens": 0, "output_tokens": 0, "cost": 0.0,
+                "latency_ms": 0}
+    input_tokens = _estimated_input_tokens(features.raw)
+    output_tokens = USAGE_HISTORY.output_tokens("classifier")
+    return {
+        **estimate,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": calculate_cost(CLASSIFIER_MODEL, input_tokens, output_tokens),
+        "latency_ms": USAGE_HISTORY.latency_ms(CLASSIFIER_MODEL, output_tokens),
+    }
+
+
+def _resolve_mode(mode, demo_mode):
+    if mode is None:
+        return "demo" if demo_mode else "live"
+    if mode not in ("demo", "live", "local"):
+        raise ValueError(f"Unknown classifier mode {mode!r}; expected 'demo', 'live' or 'local'")
+    return mode
+
+
+def _model_classify(features):
+    """Classify with the trained linear model (loaded once per process).
+
+    Without a model file (none is shipped; train one with
+    python -m utils.complexity_model train) the rule-based local
+    classifier answers instead.
+    """
+    global _complexity_model
+    from utils.complexity_model import load_model, predict_proba
+
+    if _complexity_model is None:
+        try:
+            _complexity_model = load_model()
+        except FileNotFoundError as e:
+            logger.warning(
+                "No trained complexity model (%s); mode='local' falls back to the rule-based "
+                "local classifier. Train one with: python -m utils.complexity_model train "
+                "<log.jsonl> <model.npz>", e,
+            )
+            _complexity_model = False
+    if _complexity_model is False:
+        return {**local_classify(features), "from_cache": False}
+    start = time.perf_counter()
+    probabilities = predict_proba(_complexity_model, features)
+    complexity = max(probabilities, key=probabilities.get)
+    return {
+        "complexity": complexity,
+        "reasoning": f"Trained local model ({probabilities[complexity]:.0%} confidence).",
+        "key_parameters": [],
+        "model": LOCAL_LINEAR_MODEL,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        "confidence": round(probabilities[complexity], 4),
+        "probabilities": {label: round(p, 4) for label, p in probabilities.items()},
+        "from_cache": False,
+    }
+
+
+def _local_tier(features, threshold):
+    """Run the local classifier; return (local result, answer if confident enough)."""
+    if threshold is None:
+        return None, None
+    local = local_classify(features)
+    if local["confidence"] < threshold:
+        return local, None
+    TIER_STATS.record(local, tier="local")
+    return local, {**local, "from_cache": False}
+
+
+def _llm_tier(local, result):
+    """Record an LLM-tier decision against the local prediction and return result."""
+    if local is not None:
+        TIER_STATS.record(local, result, tier="llm")
+    return result
+
+
+def _cached_classification(key, start):
+    """Return the cached result for key marked from_cache, or None."""
+    cached = CLASSIFICATION_CACHE.get(key)
+    if cached is None:
+        return None
+    return {**cached, "latency_ms": int((time.time() - start) * 1000), "from_cache": True}
+
+
+def _store_classification(key, result, use_cache, spec=None):
+    """Cache and log a fresh live result (unless it is an error fallback) and mark it."""
+    if "error" not in result:
+        if use_cache:
+            CLASSIFICATION_CACHE.put(key, result)
+        if spec is not None:
+            _record_usage(spec, result)
+            if CLASSIFICATION_LOG_PATH:
+                _log_classification(spec, result)
+    return {**result, "from_cache": False}
+
+
+def _estimated_input_tokens(spec):
+    return int(count_message_tokens(_classifier_messages(spec)) * USAGE_HISTORY.input_scale(CLASSIFIER_MODEL))
+
+
+def _record_usage(spec, result):
+    """Feed a live call's billed tokens and latency to the pre-flight estimates."""
+    USAGE_HISTORY.calibrate(CLASSIFIER_MODEL, _estimated_input_tokens(spec), result["input_tokens"])
+    USAGE_HISTORY.record("classifier", CLASSIFIER_MODEL, result["output_tokens"], result["latency_ms"])
+
+
+def _log_classification(spec, result):
+    """Append a (spec, complexity) training record to CLASSIFICATION_LOG_PATH."""
+    record = {"spec": spec, "complexity": result["complexity"], "model": result["model"], "ts": time.time()}
+    try:
+        with open(CLASSIFICATION_LOG_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+    except OSError:
+        pass
+
+
+def _classifier_messages(spec):
+    return [
+        {"role": "system", "content": CLASSIFIER_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Customer specification:\n{spec}"},
+    ]
+
+
+def _live_classify(spec, deadline=None):
+    """Call GPT-5 Nano for real classification."""
+    client = LLM_CLIENTS.client("openai")
+    if deadline is not None:
+        client = client.with_options(timeout=deadline.remaining(), max_retries=0)
     start = time.time()
 
     try:
-        response = client.chat.completions.create(
-            model="gpt-5-nano",
-            messages=[
-                {"role": "system", "content": CLASSIFIER_SYSTEM_PROMPT},
-                {"role": "user", "content": f"Customer specification:\n{spec}"},
-            ],
+        response = PROVIDER_HEALTH.call_sync(CLASSIFIER_MODEL, lambda: client.chat.completions.create(
+            model=CLASSIFIER_MODEL,
+            messages=_classifier_messages(spec),
             response_format={"type": "json_object"},
             temperature=0.1,
-        )
-        latency_ms = int((time.time() - start) * 1000)
+        ), deadline, kind="classify")
+        return _parse_classification(response, int((time.time() - start) * 1000))
+    except Exception as e:
+        return _fallback_classification(e, int((time.time() - start) * 1000))
 
-        result = json.loads(response.choices[0].message.content)
-        return {
-            "complexity": result.get("complexity", "MEDIUM"),
-            "reasoning": result.get("reasoning", "Classification complete"),
-            "key_parameters": result.get("key_parameters", []),
-            "model": "gpt-5-nano",
-            "input_tokens": response.usage.prompt_tokens,
-            "output_tokens": response.usage.completion_tokens,
-            "latency_ms": latency_ms,
-        }
+
+async def _live_classify_async(spec, deadline=None):
+    """Call GPT-5 Nano through the async client (deadline, hedging, breaker)."""
+    client = LLM_CLIENTS.async_client("openai").with_options(max_retries=0)
+    start = time.time()
+
+    try:
+        response = await PROVIDER_HEALTH.call(CLASSIFIER_MODEL, lambda: client.chat.completions.create(
+            model=CLASSIFIER_MODEL,
+            messages=_classifier_messages(spec),
+            response_format={"type": "json_object"},
+            temperature=0.1,
+        ), deadline, kind="classify")
+        return _parse_classification(response, int((time.time() - start) * 1000))
     except Exception as e:
-        latency_ms = int((time.time() - start) * 1000)
-        return {
-            "complexity": "MEDIUM",
-            "reasoning": f"Fallback classification (API error: {e})",
-            "key_parameters": [],
-            "model": "gpt-5-nano",
-            "input_tokens": 0,
-            "output_tokens": 0,
-            "latency_ms": latency_ms,
-            "error": str(e),
-        }
+        return _fallback_classification(e, int((time.time() - start) * 1000))
+
+
+def _parse_classification(response, latency_ms):
+    """Build the classification dict from a chat completion response."""
+    result = json.loads(response.choices[0].message.content)
+    return {
+        "complexity": result.get("complexity", "MEDIUM"),
+        "reasoning": result.get("reasoning", "Classification complete"),
+        "key_parameters": result.get("key_parameters", []),
+        "model": CLASSIFIER_MODEL,
+        "input_tokens": response.usage.prompt_tokens,
+        "output_tokens": response.usage.completion_tokens,
+        "cache_read_tokens": openai_cache_tokens(response.usage),
+        "latency_ms": latency_ms,
+    }
+
+
+def _fallback_classification(error, latency_ms):
+    """MEDIUM fallback used when the API call fails."""
+    return {
+        "complexity": "MEDIUM",
+        "reasoning": f"Fallback classification (API error: {error})",
+        "key_parameters": [],
+        "model": CLASSIFIER_MODEL,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "latency_ms": latency_ms,
+        "error": str(error),
+    }
 
 
-def _mock_classify(spec):
+def _mock_classify(features):
     """Keyword-based mock classification for demo mode."""
-    spec_lower = spec.lower()
+    spec_lower = features.text
 
     # Keywords indicating complex multi-component or system-level requests
     complex_keywords = [
@@ -103,7 +370,7 @@ def _mock_classify(spec):
                 "Multi-component setup with system integration detected. "
                 "Requires deep technical analysis and creative solution development."
             ),
-            "key_parameters": _extract_mock_params(spec_lower, "COMPLEX"),
+            "key_parameters": _extract_mock_params(features, "COMPLEX"),
             "model": "gpt-5-nano",
             "input_tokens": 847,
             "output_tokens": 95,
@@ -117,7 +384,7 @@ def _mock_classify(spec):
                 "Multiple simultaneous parameters and specific requirements detected. "
                 "Extended matching with parameter comparison required."
             ),
-            "key_parameters": _extract_mock_params(spec_lower, "MEDIUM"),
+            "key_parameters": _extract_mock_params(features, "MEDIUM"),
             "model": "gpt-5-nano",
             "input_tokens": 623,
             "output_tokens": 82,
@@ -130,7 +397,7 @@ def _mock_classify(spec):
             "Standard wavelength with clear power specification. "
             "Direct catalog lookup sufficient."
         ),
-        "key_parameters": _extract_mock_params(spec_lower, "SIMPLE"),
+        "key_parameters": _extract_mock_params(features, "SIMPLE"),
         "model": "gpt-5-nano",
         "input_tokens": 512,
         "output_tokens": 68,
@@ -138,30 +405,27 @@ def _mock_classify(spec):
     }
 
 
-def _extract_mock_params(spec_lower, complexity):
-    """Extract plausible key parameters from spec text for mock response."""
+def _extract_mock_params(features, complexity):
+    """Extract plausible key parameters from parsed spec for mock response."""
     params = []
 
-    import re
-    wavelengths = re.findall(r"(\d{3,4})\s*nm", spec_lower)
-    for wl in wavelengths:
-        params.append(f"{wl} nm")
+    for wl in features.wavelengths_nm:
+        if 100 <= wl < 10000:
+            params.append(f"{wl:g} nm")
 
-    power_mw = re.findall(r"(\d+)\s*mw", spec_lower)
-    for p in power_mw:
-        params.append(f"{p} mW")
+    for p in features.power_mw:
+        params.append(f"{p:g} mW")
 
-    power_w = re.findall(r"(\d+(?:\.\d+)?)\s*w\b", spec_lower)
-    for p in power_w:
-        params.append(f"{p} W")
+    for p in features.power_w:
+        params.append(f"{p:g} W")
 
-    if "noise" in spec_lower or "rms" in spec_lower:
+    if features.noise:
         params.append("Noise/RMS")
 
     if complexity == "COMPLEX":
-        if "thz" in spec_lower or "terahertz" in spec_lower:
+        if features.terahertz:
             params.append("THz range")
-        if "integration" in spec_lower or "rs-232" in spec_lower:
+        if "integration" in features.text or "rs-232" in features.text:
             params.append("System integration")
 
     return params if params else ["Wavelength", "Power"]
@@ -0,0 +1,210 @@
+"""Local fast-path complexity classifier with confidence, and tier statistics.
+
+local_classify scores a parsed spec in microseconds from keyword evidence
+and the parsed numeric features, and returns a confidence (the softmax
+probability of the winning class). classify_spec only sends specs below a
+confidence threshold to the LLM.
+
+TierStats records every tiered decision so the threshold can be tuned:
+
+- local fraction: share of requests answered locally
+- agreement: how often the local label matches the LLM label. LLM labels
+  come for free for specs that went to the LLM, and from a random shadow
+  sample of locally answered specs (classified by the LLM in the
+  background, off the request path, by at most SHADOW_MAX_WORKERS
+  threads; samples beyond SHADOW_MAX_PENDING in flight are dropped).
+"""
+
+import math
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+LOCAL_MODEL = "local-rules"
+
+SHADOW_MAX_WORKERS = 2
+SHADOW_MAX_PENDING = 8
+
+# Evidence weight per trigger word (substring match on the lowercased spec).
+COMPLEX_EVIDENCE = {
+    "terahertz": 2.5, "thz": 2.5, "integration": 2.0, "production line": 2.0,
+    "multi-component": 2.0, "custom": 1.5, "rs-232": 2.0, "manufacturing": 1.5,
+    "quality control": 1.5, "system": 1.0, "tunable": 1.0,
+}
+MEDIUM_EVIDENCE = {
+    "multiline": 2.0, "multi-line": 2.0, "multiple": 1.5, "combination": 1.5,
+    "noise": 1.5, "rms": 1.5, "super-resolution": 2.0, "compact": 1.0,
+    "combiner": 1.5, "tunable": 1.0,
+}
+SIMPLE_PRIOR = 1.0
+
+
+def local_classify(features):
+    """Classify a parsed spec locally.
+
+    Args:
+        features: SpecFeatures from utils.spec_parser.parse_spec.
+
+    Returns:
+        Classification dict like classify_spec (zero tokens) plus confidence
+        and probabilities (per class).
+    """
+    start = time.perf_counter()
+    text = features.text
+    wavelengths = set(features.wavelengths_nm) or set(features.wavelength_numbers)
+    powers = len(features.power_mw) + len(features.power_w)
+
+    complex_score = sum(w for kw, w in COMPLEX_EVIDENCE.items() if kw in text)
+    complex_score += 1.0 * len(features.thz_values)
+    medium_score = sum(w for kw, w in MEDIUM_EVIDENCE.items() if kw in text)
+    medium_score += 0.75 * max(0, len(wavelengths) - 1) + 1.0 * len(features.noise_limits_percent)
+    simple_score = SIMPLE_PRIOR
+    if len(wavelengths) == 1:
+        simple_score += 1.0
+    if powers == 1:
+        simple_score += 0.5
+    if len(text) > 400:
+        simple_score -= 0.5
+
+    scores = {"SIMPLE": simple_score, "MEDIUM": medium_score, "COMPLEX": complex_score}
+    top = max(scores.values())
+    exp = {label: math.exp(score - top) for label, score in scores.items()}
+    total = sum(exp.values())
+    probabilities = {label: round(value / total, 4) for label, value in exp.items()}
+    complexity = max(probabilities, key=probabilities.get)
+
+    return {
+        "complexity": complexity,
+        "reasoning": (
+            f"Local fast path ({probabilities[complexity]:.0%} confidence): "
+            f"evidence scores S={simple_score:.1f}, M={medium_score:.1f}, C={complex_score:.1f}."
+        ),
+        "key_parameters": [],
+        "model": LOCAL_MODEL,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "latency_ms": round((time.perf_counter() - start) * 1000, 3),
+        "confidence": probabilities[complexity],
+        "probabilities": probabilities,
+    }
+
+
+class TierStats:
+    """Thread-safe counters and observations for the tiered classifier.
+
+    Args:
+        max_observations: Number of most recent request confidences and
+            (confidence, local label, LLM label) triples kept for
+            threshold reports.
+    """
+
+    def __init__(self, max_observations=10_000):
+        self._lock = threading.Lock()
+        self._confidences = deque(maxlen=max_observations)
+        self._labelled = deque(maxlen=max_observations)
+        self._counts = {"local": 0, "llm": 0, "shadow_samples": 0, "shadow_agreements": 0,
+                        "shadow_failures": 0, "shadow_dropped": 0}
+
+    def record(self, local, llm_result=None, tier="llm", shadow=False):
+        """Record one decision.
+
+        Args:
+            local: Result of local_classify for the spec.
+            llm_result: LLM classification of the same spec, if known.
+            tier: "local" or "llm", the tier that answered the request.
+            shadow: True when llm_result comes from a shadow sample of a
+                request already recorded as local; a missing or failed
+                result counts as a shadow failure.
+        """
+        llm_label = llm_result["complexity"] if llm_result and "error" not in llm_result else None
+        if shadow and llm_label is None:
+            self.count("shadow_failures")
+            return
+        with self._lock:
+            if shadow:
+                self._counts["shadow_samples"] += 1
+                self._counts["shadow_agreements"] += int(llm_label == local["complexity"])
+            else:
+                self._counts[tier] += 1
+                self._confidences.append(local["confidence"])
+            if llm_label is not None:
+                self._labelled.append((local["confidence"], local["complexity"], llm_label))
+
+    def count(self, name):
+        """Increment one of the shadow counters (shadow_failures, shadow_dropped)."""
+        with self._lock:
+            self._counts[name] += 1
+
+    def summary(self):
+        """Return request counts, local fraction and shadow agreement rate."""
+        with self._lock:
+            counts = dict(self._counts)
+        requests = counts["local"] + counts["llm"]
+        return {
+            **counts,
+            "requests": requests,
+            "local_fraction": counts["local"] / requests if requests else 0.0,
+            "shadow_agreement": (
+                counts["shadow_agreements"] / counts["shadow_samples"] if counts["shadow_samples"] else None
+            ),
+        }
+
+    def threshold_report(self, thresholds=(0.5, 0.6, 0.7, 0.8, 0.9, 0.95)):
+        """Estimate local fraction and agreement for candidate thresholds.
+
+        Returns:
+            List of dicts with threshold, local_fraction (share of recorded
+            requests at or above it), agreement (local == LLM among labelled
+            specs at or above it, or None) and labelled (their number).
+        """
+        with self._lock:
+            confidences = list(self._confidences)
+            labelled = list(self._labelled)
+        rows = []
+        for threshold in thresholds:
+            above = [o for o in labelled if o[0] >= threshold]
+            rows.append({
+                "threshold": threshold,
+                "local_fraction": (
+                    sum(c >= threshold for c in confidences) / len(confidences) if confidences else 0.0
+                ),
+                "agreement": sum(o[1] == o[2] for o in above) / len(above) if above else None,
+                "labelled": len(above),
+            })
+        return rows
+
+
+_SHADOW_EXECUTOR = ThreadPoolExecutor(max_workers=SHADOW_MAX_WORKERS, thread_name_prefix="classifier-shadow")
+_SHADOW_SLOTS = threading.BoundedSemaphore(SHADOW_MAX_PENDING)
+
+
+def start_shadow(classify, local, stats, rng=random.random, sample_rate=0.05):
+    """With probability sample_rate, check a local answer against the LLM in the background.
+
+    Args:
+        classify: Zero-argument callable returning the LLM classification.
+        local: The local_classify result that was returned to the caller.
+        stats: TierStats receiving the outcome.
+
+    Returns:
+        The Future of the shadow call, or None if the spec was not sampled
+        or SHADOW_MAX_PENDING samples are already in flight.
+    """
+    if rng() >= sample_rate:
+        return None
+    if not _SHADOW_SLOTS.acquire(blocking=False):
+        stats.count("shadow_dropped")
+        return None
+
+    def run():
+        try:
+            result = classify()
+        except Exception as e:
+            result = {"error": str(e)}
+        finally:
+            _SHADOW_SLOTS.release()
+        stats.record(local, result, tier="local", shadow=True)
+
+    return _SHADOW_EXECUTOR.submit(run)
@@ -0,0 +1,461 @@
+"""Spec-to-proposal pipeline: concurrent classification and search, routing, proposal.
+
+Deadlines, reuse, speculation and the cascade are described in docs/architecture.md.
+"""
+
+import asyncio
+import json
+import time
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pricing import calculate_cost
+from products import search_products_cached
+from agents.classifier import classify_spec_async, estimate_classification
+from agents.local_classifier import local_classify
+from agents.router import ROUTING_TABLE, apply_cascade, apply_reroute, apply_reuse, cascade_models, route
+from agents.cascade import CASCADE_STATS, cascade_attempt, cascade_record, validate_proposal
+from agents.proposal import estimate_proposal, generate_proposal_async, stream_proposal
+from agents.speculation import SPECULATION_STATS, SpeculativeStream, speculative_model, wasted_output_tokens
+from utils.llm_clients import LLM_CLIENTS
+from utils.proposal_index import PROPOSAL_INDEX
+from utils.resilience import Deadline
+from utils.token_estimator import USAGE_HISTORY, tokenizer_name
+
+PIPELINE_DEADLINE_S = 90.0
+CLASSIFY_DEADLINE_S = 15.0
+
+REUSE_MODES = ("off", "draft", "adapt")
+REUSE_ADAPT_MODEL = ROUTING_TABLE["SIMPLE"]
+
+
+async def _timed(timings, stage, awaitable):
+    """Await awaitable and store its wall time in ms under timings[stage]."""
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 1)
+
+
+def _estimate_proposals(spec_features, product_matches, complexity):
+    """Predicted proposal call per ROUTING_TABLE model."""
+    return {
+        model: estimate_proposal(spec_features, model, product_matches, complexity)
+        for model in ROUTING_TABLE.values()
+    }
+
+
+def preflight_estimate(spec_features, k=5, ranking_mode="rules", budget=None):
+    """Predict tokens, cost and latency of a live run before starting it.
+
+    Searches the catalog (cached) and routes on the local classifier's
+    predicted complexity; no API call is made.
+
+    Returns:
+        Dict with classification (estimate_classification), routing (as
+        route() would return it for that complexity, with estimate and
+        budget enforcement), input_tokens, output_tokens, cost and
+        latency_ms of the whole run, and tokenizer.
+    """
+    classification = estimate_classification(spec_features)
+    product_matches = search_products_cached(spec_features, k=k, mode=ranking_mode)
+    estimates = _estimate_proposals(spec_features, product_matches, classification["complexity"])
+    routing = route(classification, estimates, budget)
+    proposal = routing["estimate"]
+    return {
+        "classification": classification,
+        "routing": routing,
+        "input_tokens": classification["input_tokens"] + proposal["input_tokens"],
+        "output_tokens": classification["output_tokens"] + proposal["output_tokens"],
+        "cost": routing["classifier_cost"] + proposal["cost"],
+        "latency_ms": classification["latency_ms"] + proposal["latency_ms"],
+        "tokenizer": tokenizer_name(),
+    }
+
+
+async def _prepare_async(spec_features, demo_mode, k, ranking_mode, deadline, timings, budget=None,
+                         speculate=None):
+    """Classify and search concurrently, then route.
+
+    speculate, if given, is called with the product matches when the
+    search finishes before the classifier and returns the started
+    speculation (see _start_speculation).
+
+    Returns:
+        (classification, routing, product_matches, speculation or None).
+    """
+    classify_task = asyncio.ensure_future(_timed(timings, "classify", classify_spec_async(
+        spec_features, demo_mode=demo_mode, deadline=deadline.within(CLASSIFY_DEADLINE_S)
+    )))
+    try:
+        product_matches = await _timed(timings, "search", asyncio.to_thread(
+            search_products_cached, spec_features, k=k, mode=ranking_mode
+        ))
+    except BaseException:
+        classify_task.cancel()
+        raise
+    speculation = None
+    if speculate is not None and not classify_task.done():
+        speculation = speculate(product_matches)
+    classification = await classify_task
+    if speculation is not None:
+        speculation["classified_at"] = time.perf_counter()
+
+    route_start = time.perf_counter()
+    estimates = _estimate_proposals(spec_features, product_matches, classification.get("complexity", "MEDIUM"))
+    routing = route(classification, estimates, budget)
+    timings["route"] = round((time.perf_counter() - route_start) * 1000, 1)
+    return classification, routing, product_matches, speculation
+
+
+def _start_speculation(spec_features, product_matches, budget, start_call):
+    """Start the proposal for the locally predicted tier; return the speculation.
+
+    start_call(model) starts the call and returns its handle (an asyncio
+    task or a SpeculativeStream).
+    """
+    estimates = _estimate_proposals(spec_features, product_matches, local_classify(spec_features)["complexity"])
+    model = speculative_model(spec_features, estimates, budget)
+    return {
+        "model": model,
+        "estimate": estimates[model],
+        "started_at": time.perf_counter(),
+        "handle": start_call(model),
+    }
+
+
+def _speculation_record(speculation, hit, proposal=None, wasted_output=0):
+    """proposal["speculation"] for a hit (with its proposal) or a miss.
+
+    A hit saved the time the call ran before the classifier finished (at
+    most the whole call). A miss wasted the prompt and the output streamed
+    or, for a blocking call, probably generated until it was cancelled.
+    """
+    if hit:
+        saved = min((speculation["classified_at"] - speculation["started_at"]) * 1000, proposal["latency_ms"])
+        wasted_input = wasted_output = 0
+    else:
+        saved = 0.0
+        wasted_input = speculation["estimate"]["input_tokens"]
+    record = {
+        "model": speculation["model"],
+        "hit": hit,
+        "latency_saved_ms": round(saved, 1),
+        "wasted_input_tokens": wasted_input,
+        "wasted_output_tokens": wasted_output,
+        "wasted_cost": calculate_cost(speculation["model"], wasted_input, wasted_output),
+    }
+    SPECULATION_STATS.record(record)
+    return record
+
+
+async def _resolve_speculation_async(speculation, routing):
+    """Await a speculative proposal that matches routing, or cancel it.
+
+    Returns:
+        (proposal or None on a miss, speculation record).
+    """
+    task = speculation["handle"]
+    if speculation["model"] == routing["selected_model"]:
+        proposal = await task
+        return proposal, _speculation_record(speculation, True, proposal)
+    if task.done() and "error" not in task.result():
+        finished = task.result()
+        speculation["estimate"] = {**speculation["estimate"], "input_tokens": finished["input_tokens"]}
+        return None, _speculation_record(speculation, False, wasted_output=finished["output_tokens"])
+    task.cancel()
+    elapsed_ms = (time.perf_counter() - speculation["started_at"]) * 1000
+    return None, _speculation_record(speculation, False, wasted_output=wasted_output_tokens(
+        speculation["model"], elapsed_ms, speculation["estimate"]["output_tokens"]
+    ))
+
+
+def _next_cascade_model(models, model, proposal):
+    """The cascade model to try after model's rejected draft, or None.
+
+    Models at or below the tier that answered are skipped (a fallback may
+    have answered from a higher tier); after a failed call only those at or
+    below the requested model are.
+    """
+    tiers = list(ROUTING_TABLE.values())
+    floor = tiers.index(model)
+    if "error" not in proposal and proposal["model"] in tiers:
+        floor = max(floor, tiers.index(proposal["model"]))
+    later = [m for m in models if tiers.index(m) > floor]
+    return later[0] if later else None
+
+
+def _cascade_stop(validation, next_model, deadline):
+    """Why the cascade ends after a draft ("accepted", "exhausted" or "deadline"), or None to escalate."""
+    if validation["valid"]:
+        return "accepted"
+    if next_model is None:
+        return "exhausted"
+    if deadline.expired():
+        return "deadline"
+    return None
+
+
+def _settle_cascade(routing, proposal, path, attempts, stopped):
+    """Return (routing with the escalation path, proposal with its cascade record)."""
+    cascade = cascade_record(path, attempts, routing.get("estimate"), stopped)
+    CASCADE_STATS.record(cascade)
+    return apply_cascade(routing, cascade), {**proposal, "cascade": cascade}
+
+
+async def _cascade_async(spec_features, routing, product_matches, deadline):
+    """Draft with the cascade's models, cheapest first, until a draft passes validation.
+
+    Returns:
+        (routing, proposal) as _settle_cascade.
+    """
+    models = cascade_models(routing)
+    path, attempts, model, stopped = [], [], models[0], None
+    while stopped is None:
+        proposal = await generate_proposal_async(
+            spec_features, model, product_matches, demo_mode=False, deadline=deadline
+        )
+        validation = validate_proposal(spec_features, proposal, product_matches)
+        path.append(model)
+        attempts.append(cascade_attempt(proposal, validation))
+        model = _next_cascade_model(models, model, proposal)
+        stopped = _cascade_stop(validation, model, deadline)
+    return _settle_cascade(routing, proposal, path, attempts, stopped)
+
+
+def _stream_cascade(spec_features, routing, product_matches, deadline):
+    """Streaming variant of _cascade_async.
+
+    Yields each draft's delta events and, before every escalation,
+    {"type": "escalate", "from", "to", "errors"}; returns (routing,
+    proposal) as _settle_cascade.
+    """
+    models = cascade_models(routing)
+    path, attempts, model, stopped = [], [], models[0], None
+    while stopped is None:
+        for event in stream_proposal(spec_features, model, product_matches, demo_mode=False, deadline=deadline):
+            if event["type"] == "delta":
+                yield event
+            else:
+                proposal = event["proposal"]
+        validation = validate_proposal(spec_features, proposal, product_matches)
+        path.append(model)
+        attempts.append(cascade_attempt(proposal, validation))
+        failed_model, model = path[-1], _next_cascade_model(models, path[-1], proposal)
+        stopped = _cascade_stop(validation, model, deadline)
+        if stopped is None:
+            yield {"type": "escalate", "from": failed_model, "to": model, "errors": validation["errors"]}
+    return _settle_cascade(routing, proposal, path, attempts, stopped)
+
+
+def _find_reusable(spec_features, demo_mode, reuse):
+    """Return the near-duplicate index match to reuse for this run, or None."""
+    if demo_mode or reuse == "off":
+        return None
+    return PROPOSAL_INDEX.find(spec_features.raw)
+
+
+def _reused_draft(match):
+    """The earlier proposal of match as this run's proposal (no tokens spent)."""
+    return {**match["proposal"], "model": match["model"], "input_tokens": 0, "output_tokens": 0, "latency_ms": 0}
+
+
+def _settle_proposal(spec_features, demo_mode, routing, proposal, match, reuse):
+    """Update routing for the proposal that was produced and record it.
+
+    Books the savings of a reused proposal (proposal["reuse"]), adds new
+    live proposals to the near-duplicate index unless reuse is "off" and
+    feeds their usage to the pre-flight estimates. Returns (routing, proposal).
+    """
+    if "error" in proposal:
+        return routing, proposal
+    if match is None:
+        if not demo_mode:
+            if reuse != "off":
+                PROPOSAL_INDEX.add(spec_features.raw, proposal)
+            _record_usage(routing, proposal)
+        return apply_reroute(routing, proposal["model"]), proposal
+
+    spent = proposal["input_tokens"] + proposal["output_tokens"]
+    proposal = {**proposal, "reuse": {
+        "mode": reuse,
+        "source_id": match["id"],
+        "similarity": match["similarity"],
+        "tokens_saved": match["input_tokens"] + match["output_tokens"] - spent,
+        "cost_saved": (
+            calculate_cost(routing["selected_model"], match["input_tokens"], match["output_tokens"])
+            - calculate_cost(proposal["model"], proposal["input_tokens"], proposal["output_tokens"],
+                             cache_read_tokens=proposal.get("cache_read_tokens", 0),
+                             cache_write_tokens=proposal.get("cache_write_tokens", 0))
+        ),
+    }}
+    PROPOSAL_INDEX.record_savings(proposal["reuse"]["tokens_saved"])
+    if reuse == "adapt":
+        PROPOSAL_INDEX.add(spec_features.raw, proposal)
+        return apply_reuse(routing, proposal["model"], match["similarity"]), proposal
+    return apply_reuse(routing, None, match["similarity"]), proposal
+
+
+def _record_usage(routing, proposal):
+    """Feed a live proposal's billed tokens and latency to USAGE_HISTORY."""
+    estimate = routing.get("estimate")
+    if estimate is not None and estimate["model"] == proposal["model"]:
+        USAGE_HISTORY.calibrate(proposal["model"], estimate["input_tokens"], proposal["input_tokens"])
+    USAGE_HISTORY.record(routing["complexity"], proposal["model"], proposal["output_tokens"],
+                         proposal["latency_ms"])
+
+
+async def run_pipeline_async(spec_features, demo_mode=True, k=5, ranking_mode="rules",
+                             deadline_s=PIPELINE_DEADLINE_S, reuse="off", budget=None, speculate=False,
+                             cascade=False):
+    """Classify, search, route and generate the proposal for one spec.
+
+    Args:
+        spec_features: SpecFeatures from utils.spec_parser.parse_spec.
+        demo_mode: If True, agents return mock data without API calls.
+        k: Number of product matches passed to the proposal.
+        ranking_mode: Product ranking mode (see products.RANKING_MODES).
+        deadline_s: Time budget for all provider calls of this run.
+        reuse: Near-duplicate reuse in live mode, one of REUSE_MODES.
+        budget: Optional {"max_cost", "max_latency_ms"} limits (see agents.router.route).
+        speculate: Start the proposal before classification finishes (live mode).
+        cascade: Draft with cheaper tiers first and escalate on failed validation (live mode).
+
+    Returns:
+        Dict with classification, routing, product_matches, proposal and
+        timings (wall ms per stage).
+    """
+    timings = {}
+    start = time.perf_counter()
+    deadline = Deadline(deadline_s)
+    match = _find_reusable(spec_features, demo_mode, reuse)
+    on_search = None
+    cascading = cascade and not demo_mode and match is None
+    if speculate and not cascading and not demo_mode and match is None:
+        def on_search(matches):
+            return _start_speculation(spec_features, matches, budget, lambda model: asyncio.ensure_future(
+                generate_proposal_async(spec_features, model, matches, demo_mode=False, deadline=deadline)
+            ))
+    classification, routing, product_matches, speculation = await _prepare_async(
+        spec_features, demo_mode, k, ranking_mode, deadline, timings, budget, on_search
+    )
+
+    proposal_start = time.perf_counter()
+    proposal = speculation_record = None
+    if speculation is not None:
+        proposal, speculation_record = await _resolve_speculation_async(speculation, routing)
+    if proposal is not None:
+        pass
+    elif match is not None and reuse == "draft":
+        proposal = _reused_draft(match)
+    elif cascading and len(cascade_models(routing)) > 1:
+        routing, proposal = await _cascade_async(spec_features, routing, product_matches, deadline)
+    else:
+        proposal = await generate_proposal_async(
+            spec_features, REUSE_ADAPT_MODEL if match else routing["selected_model"], product_matches,
+            demo_mode=demo_mode, deadline=deadline, prior=match,
+        )
+    timings["proposal"] = round((time.perf_counter() - proposal_start) * 1000, 1)
+    routing, proposal = _settle_proposal(spec_features, demo_mode, routing, proposal, match, reuse)
+    if speculation_record is not None:
+        proposal = {**proposal, "speculation": speculation_record}
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+
+    return {
+        "classification": classification,
+        "routing": routing,
+        "product_matches": product_matches,
+        "proposal": proposal,
+        "timings": timings,
+    }
+
+
+def run_pipeline(spec_features, demo_mode=True, k=5, ranking_mode="rules", deadline_s=PIPELINE_DEADLINE_S,
+                 reuse="off", budget=None, speculate=False, cascade=False):
+    """Blocking wrapper around run_pipeline_async (for Streamlit and scripts).
+
+    Runs on the shared client registry's event loop, so pooled async
+    connections are reused from one request to the next.
+    """
+    return LLM_CLIENTS.run(run_pipeline_async(
+        spec_features, demo_mode=demo_mode, k=k, ranking_mode=ranking_mode, deadline_s=deadline_s, reuse=reuse,
+        budget=budget, speculate=speculate, cascade=cascade,
+    ))
+
+
+def stream_pipeline(spec_features, demo_mode=True, k=5, ranking_mode="rules", deadline_s=PIPELINE_DEADLINE_S,
+                    reuse="off", budget=None, speculate=False, cascade=False):
+    """Like run_pipeline, but streams the proposal as it is generated.
+
+    Yields:
+        {"type": "prepared", ...} after routing, the proposal's "delta"
+        events (and "escalate" events of a cascade), then {"type": "done",
+        **run_pipeline result}.
+    """
+    timings = {}
+    start = time.perf_counter()
+    deadline = Deadline(deadline_s)
+    match = _find_reusable(spec_features, demo_mode, reuse)
+    on_search = None
+    cascading = cascade and not demo_mode and match is None
+    if speculate and not cascading and not demo_mode and match is None:
+        def on_search(matches):
+            return _start_speculation(spec_features, matches, budget, lambda model: SpeculativeStream(
+                lambda: stream_proposal(spec_features, model, matches, demo_mode=False, deadline=deadline)
+            ))
+    classification, routing, product_matches, speculation = LLM_CLIENTS.run(_prepare_async(
+        spec_features, demo_mode, k, ranking_mode, deadline, timings, budget, on_search
+    ))
+    yield {
+        "type": "prepared",
+        "classification": classification,
+        "routing": routing,
+        "product_matches": product_matches,
+    }
+
+    proposal_start = time.perf_counter()
+    events = speculation_record = None
+    if speculation is not None:
+        if speculation["model"] == routing["selected_model"]:
+            events = speculation["handle"].events()
+        else:
+            speculation_record = _speculation_record(
+                speculation, False, wasted_output=speculation["handle"].cancel()
+            )
+    if events is None and match is not None and reuse == "draft":
+        proposal = _reused_draft(match)
+        yield {"type": "delta", "text": json.dumps(match["proposal"])}
+        proposal["ttft_ms"] = int((time.perf_counter() - proposal_start) * 1000)
+    elif cascading and len(cascade_models(routing)) > 1:
+        routing, proposal = yield from _stream_cascade(spec_features, routing, product_matches, deadline)
+    else:
+        if events is None:
+            events = stream_proposal(
+                spec_features, REUSE_ADAPT_MODEL if match else routing["selected_model"], product_matches,
+                demo_mode=demo_mode, deadline=deadline, prior=match,
+            )
+        for event in events:
+            if event["type"] == "delta":
+                yield event
+            else:
+                proposal = event["proposal"]
+        if speculation is not None and speculation_record is None:
+            speculation_record = _speculation_record(speculation, True, proposal)
+    timings["proposal"] = round((time.perf_counter() - proposal_start) * 1000, 1)
+    timings["ttft"] = proposal.get("ttft_ms")
+    routing, proposal = _settle_proposal(spec_features, demo_mode, routing, proposal, match, reuse)
+    if speculation_record is not None:
+        proposal = {**proposal, "speculation": speculation_record}
+    timings["total"] = round((time.perf_counter() - start) * 1000, 1)
+
+    yield {
+        "type": "done",
+        "classification": classification,
+        "routing": routing,
+        "product_matches": product_matches,
+        "proposal": proposal,
+        "timings": timings,
+    }
@@ -4,139 +4,501 @@ import json
 import time
 import sys
 import os
+from types import SimpleNamespace
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from pricing import calculate_cost
 from products import search_products
+from agents.router import fallback_models
+from utils.llm_clients import LLM_CLIENTS, anthropic_input_tokens, openai_cache_tokens
+from utils.context_packer import MAX_ATTRIBUTES_PER_FIELD, content_words, context_budget, pack_context
+from utils.json_stream import parse_json_object
+from utils.resilience import PROVIDER_HEALTH
+from utils.spec_parser import as_spec_features
+from utils.token_estimator import USAGE_HISTORY, count_message_tokens
 
 PROPOSAL_SYSTEM_PROMPT = """You are a senior application engineer specializing in laser and terahertz solutions.
 Based on the customer specification and matched products, create a professional proposal draft.
 
-Respond as JSON with the following structure:
+Respond as JSON with the following structure, in this field order:
 {
-    "proposal_text": "Full proposal text in Markdown",
     "product_matches": [
         {"product_id": "...", "product_name": "...", "match_score": 85, "reasoning": "..."}
     ],
     "feasibility_matrix": {
         "Parameter-Name": {"status": "met|partial|not met", "note": "Explanation"}
     },
+    "proposal_text": "Full proposal text in Markdown",
     "next_steps": ["Step 1", "Step 2"]
 }
 
 Tone: Professional, technically precise, solution-oriented.
 Language: English."""
 
+# Order of the proposal JSON fields: the short structured fields come first
+# so a streaming UI can show them before the prose (utils/json_stream.py).
+_PROPOSAL_FIELDS = ("product_matches", "feasibility_matrix", "proposal_text", "next_steps")
+
+# Demo-mode streaming pace (stream_proposal with demo_mode=True).
+DEMO_STREAM_CHUNK_CHARS = 24
+DEMO_STREAM_DELAY_S = 0.005
+
 
-def generate_proposal(spec, model, matched_products, demo_mode=True):
+def generate_proposal(spec, model, matched_products, demo_mode=True, deadline=None, prior=None):
     """Generate a technical proposal based on spec and matched products.
 
     Args:
-        spec: Customer specification text.
+        spec: Customer specification text or parsed SpecFeatures.
         model: Model ID to use for generation.
         matched_products: List of product match dicts from search_products().
         demo_mode: If True, return mock data without API call.
+        deadline: Optional utils.resilience.Deadline for live calls.
+        prior: Optional near-duplicate match from utils.proposal_index;
+            the model then adapts that earlier proposal to this spec
+            instead of writing one from scratch.
 
     Returns:
         Dict with proposal_text, product_matches, feasibility_matrix,
-        model, input_tokens, output_tokens, latency_ms.
+        model, input_tokens, output_tokens, latency_ms. In live mode, if
+        model fails or its circuit breaker is open, the next models from
+        router.fallback_models are tried while the deadline allows; model
+        is then the one that answered and rerouted_from the requested one.
     """
+    features = as_spec_features(spec)
     if demo_mode:
-        return _mock_proposal(spec, model, matched_products)
-    return _live_proposal(spec, model, matched_products)
+        return _mock_proposal(features, model, matched_products)
+    return _live_proposal(features, model, matched_products, deadline, prior)
 
 
-def _live_proposal(spec, model, matched_products):
-    """Call the selected model for real proposal generation."""
-    products_context = _build_products_context(matched_products)
-    user_prompt = (
-        f"Customer specification:\n{spec}\n\n"
-        f"Matching products:\n{products_context}\n\n"
-        "Create a professional proposal draft as JSON."
-    )
+async def generate_proposal_async(spec, model, matched_products, demo_mode=True, deadline=None, prior=None):
+    """Async variant of generate_proposal using the async OpenAI/Anthropic clients.
 
-    if model.startswith("claude"):
-        return _call_anthropic(model, user_prompt)
-    return _call_openai(model, user_prompt)
+    Same arguments and return value as generate_proposal. Live calls are
+    also hedged after the model's p95 latency (see utils.resilience).
+    """
+    features = as_spec_features(spec)
+    if demo_mode:
+        return _mock_proposal(features, model, matched_products)
+    user_prompt = _user_prompt(features, matched_products, model, prior)
+    result = None
+    for candidate in [model] + fallback_models(model):
+        if candidate.startswith("claude"):
+            result = await _call_anthropic_async(candidate, user_prompt, deadline)
+        else:
+            result = await _call_openai_async(candidate, user_prompt, deadline)
+        if "error" not in result or (deadline is not None and deadline.expired()):
+            break
+    return _mark_reroute(result, model)
+
+
+def estimate_proposal(spec, model, matched_products, complexity, prior=None):
+    """Predict a live proposal call before making it (see utils.token_estimator).
+
+    Input tokens are counted on the prompt generate_proposal would send;
+    output tokens and latency come from recent proposals of the
+    complexity tier.
 
+    Returns:
+        Dict with model, input_tokens, output_tokens, cost, latency_ms.
+    """
+    features = as_spec_features(spec)
+    messages = _openai_messages(_user_prompt(features, matched_products, model, prior))
+    input_tokens = int(count_message_tokens(messages) * USAGE_HISTORY.input_scale(model))
+    output_tokens = USAGE_HISTORY.output_tokens(complexity)
+    return {
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cost": calculate_cost(model, input_tokens, output_tokens),
+        "latency_ms": USAGE_HISTORY.latency_ms(model, output_tokens),
+    }
+
+
+def _user_prompt(features, matched_products, model, prior=None):
+    """Return the user prompt as (product context, customer request).
+
+    The spec and product facts are packed into model's context budget, so
+    a long upload is cut down to its most relevant sentences. With a prior
+    match the request asks to adapt that earlier proposal.
+    """
+    packed = _pack_context(features, matched_products, model)
+    products_context = "\n".join(packed["product_lines"]) or "No direct matches found in catalog."
+    if prior is None:
+        request = f"Customer specification:\n{packed['spec']}\n\nCreate a professional proposal draft as JSON."
+    else:
+        request = (
+            f"Earlier specification:\n{prior['spec']}\n\n"
+            f"Earlier proposal:\n{json.dumps(prior['proposal'])}\n\n"
+            f"Customer specification:\n{packed['spec']}\n\n"
+            "The customer specification is a near-duplicate of the earlier one. Adapt the earlier "
+            "proposal to it as JSON: keep what still applies and correct every detail that differs."
+        )
+    return f"Matching products:\n{products_context}", request
+
+
+def _live_proposal(features, model, matched_products, deadline=None, prior=None):
+    """Call the selected model (or its fallbacks) for real proposal generation."""
+    user_prompt = _user_prompt(features, matched_products, model, prior)
+    result = None
+    for candidate in [model] + fallback_models(model):
+        if candidate.startswith("claude"):
+            result = _call_anthropic(candidate, user_prompt, deadline)
+        else:
+            result = _call_openai(candidate, user_prompt, deadline)
+        if "error" not in result or (deadline is not None and deadline.expired()):
+            break
+    return _mark_reroute(result, model)
+
+
+def _mark_reroute(result, model):
+    """Tag a proposal generated by a fallback model with the requested model."""
+    if result["model"] == model:
+        return result
+    return {**result, "rerouted_from": model}
+
+
+def stream_proposal(spec, model, matched_products, demo_mode=True, deadline=None, prior=None):
+    """Streaming variant of generate_proposal.
+
+    Args:
+        Same as generate_proposal.
+
+    Yields:
+        {"type": "delta", "text": chunk} for every chunk of the raw model
+        output (the proposal JSON) as it arrives, then one
+        {"type": "done", "proposal": dict}: the parsed proposal like
+        generate_proposal, with its token usage, plus streamed=True,
+        ttft_ms (request to first token) and tokens_per_s (output tokens
+        over the time from first to last token). A model that fails
+        before its first token is replaced by the next fallback model.
+    """
+    features = as_spec_features(spec)
+    if demo_mode:
+        yield from _stream_mock(features, model, matched_products)
+        return
+
+    user_prompt = _user_prompt(features, matched_products, model, prior)
+    candidates = [model] + fallback_models(model)
+    for i, candidate in enumerate(candidates):
+        stream = _stream_anthropic if candidate.startswith("claude") else _stream_openai
+        started = False
+        for event in stream(candidate, user_prompt, deadline):
+            if event["type"] == "delta":
+                started = True
+                yield event
+            else:
+                result = event["proposal"]
+        out_of_time = deadline is not None and deadline.expired()
+        if "error" not in result or started or out_of_time or i == len(candidates) - 1:
+            yield {"type": "done", "proposal": _mark_reroute(result, model)}
+            return
+
+
+def _stream_metrics(start, first_token_at, end, output_tokens):
+    """Latency, time to first token and output throughput of a streamed call."""
+    streaming_s = end - first_token_at if first_token_at is not None else 0.0
+    return {
+        "latency_ms": int((end - start) * 1000),
+        "ttft_ms": int((first_token_at - start) * 1000) if first_token_at is not None else None,
+        "tokens_per_s": round(output_tokens / streaming_s, 1) if streaming_s > 0 else None,
+        "streamed": True,
+    }
 
-def _call_openai(model, user_prompt):
-    """Call OpenAI API (GPT-5 Nano or GPT-5 Mini)."""
-    import openai
 
-    client = openai.OpenAI()
+def _stream_openai(model, user_prompt, deadline=None):
+    """Stream a proposal from the OpenAI API (see stream_proposal for the events)."""
+    client = LLM_CLIENTS.client("openai")
+    if deadline is not None:
+        client = client.with_options(timeout=deadline.remaining(), max_retries=0)
+    messages = _openai_messages(user_prompt)
     start = time.time()
+    first_token_at = None
+    parts, usage = [], None
 
     try:
-        response = client.chat.completions.create(
+        stream = PROVIDER_HEALTH.call_sync(model, lambda: client.chat.completions.create(
             model=model,
-            messages=[
-                {"role": "system", "content": PROPOSAL_SYSTEM_PROMPT},
-                {"role": "user", "content": user_prompt},
-            ],
+            messages=messages,
             response_format={"type": "json_object"},
             temperature=0.3,
+            stream=True,
+            stream_options={"include_usage": True},
+        ), deadline, kind=None)
+    except Exception as e:
+        yield {"type": "done", "proposal": _error_fallback(model, str(e), int((time.time() - start) * 1000))}
+        return
+
+    try:
+        for chunk in stream:
+            if deadline is not None and deadline.expired():
+                raise TimeoutError(f"{model} stream did not finish within the deadline")
+            if chunk.usage:
+                usage = chunk.usage
+            text = chunk.choices[0].delta.content if chunk.choices else None
+            if text:
+                first_token_at = first_token_at or time.time()
+                parts.append(text)
+                yield {"type": "delta", "text": text}
+        response = SimpleNamespace(
+            choices=[SimpleNamespace(message=SimpleNamespace(content="".join(parts)))], usage=usage
+        )
+        result = _parse_openai_proposal(response, model, 0)
+    except Exception as e:
+        PROVIDER_HEALTH.breaker(model).record_failure()
+        result = _error_fallback(model, str(e), 0)
+    finally:
+        stream.close()
+    yield {"type": "done", "proposal": {
+        **result, **_stream_metrics(start, first_token_at, time.time(), result["output_tokens"]),
+    }}
+
+
+def _stream_anthropic(model, user_prompt, deadline=None):
+    """Stream a proposal from the Anthropic API (see stream_proposal for the events)."""
+    client = LLM_CLIENTS.client("anthropic")
+    if deadline is not None:
+        client = client.with_options(timeout=deadline.remaining(), max_retries=0)
+    prompt = _anthropic_prompt(user_prompt)
+    start = time.time()
+    first_token_at = None
+    parts, start_usage, output_tokens = [], None, 0
+
+    try:
+        stream = PROVIDER_HEALTH.call_sync(model, lambda: client.messages.create(
+            model=model,
+            max_tokens=2048,
+            **prompt,
+            stream=True,
+        ), deadline, kind=None)
+    except Exception as e:
+        yield {"type": "done", "proposal": _error_fallback(model, str(e), int((time.time() - start) * 1000))}
+        return
+
+    try:
+        for event in stream:
+            if deadline is not None and deadline.expired():
+                raise TimeoutError(f"{model} stream did not finish within the deadline")
+            if event.type == "message_start":
+                start_usage = event.message.usage
+            elif event.type == "message_delta":
+                output_tokens = event.usage.output_tokens
+            elif event.type == "content_block_delta" and getattr(event.delta, "text", None):
+                first_token_at = first_token_at or time.time()
+                parts.append(event.delta.text)
+                yield {"type": "delta", "text": event.delta.text}
+        response = SimpleNamespace(
+            content=[SimpleNamespace(text="".join(parts))],
+            usage=SimpleNamespace(
+                input_tokens=start_usage.input_tokens if start_usage else 0,
+                output_tokens=output_tokens,
+                cache_read_input_tokens=getattr(start_usage, "cache_read_input_tokens", 0),
+                cache_creation_input_tokens=getattr(start_usage, "cache_creation_input_tokens", 0),
+            ),
         )
+        result = _parse_anthropic_proposal(response, model, 0)
+    except Exception as e:
+        PROVIDER_HEALTH.breaker(model).record_failure()
+        result = _error_fallback(model, str(e), 0)
+    finally:
+        stream.close()
+    yield {"type": "done", "proposal": {
+        **result, **_stream_metrics(start, first_token_at, time.time(), result["output_tokens"]),
+    }}
+
+
+def _stream_mock(features, model, matched_products):
+    """Demo-mode stream: the mock proposal's JSON in small timed chunks."""
+    proposal = _mock_proposal(features, model, matched_products)
+    text = json.dumps({key: proposal.get(key) for key in _PROPOSAL_FIELDS})
+    start = time.time()
+    first_token_at = None
+    for i in range(0, len(text), DEMO_STREAM_CHUNK_CHARS):
+        time.sleep(DEMO_STREAM_DELAY_S)
+        first_token_at = first_token_at or time.time()
+        yield {"type": "delta", "text": text[i:i + DEMO_STREAM_CHUNK_CHARS]}
+    metrics = _stream_metrics(start, first_token_at, time.time(), proposal.get("output_tokens", 0))
+    # Keep the simulated latency of the mock; report the measured stream metrics.
+    yield {"type": "done", "proposal": {**proposal, **metrics, "latency_ms": proposal.get("latency_ms", 0)}}
+
+
+def _check_user_prompt(user_prompt):
+    """Raise TypeError unless user_prompt is the (product context, request) pair of _user_prompt."""
+    if not (isinstance(user_prompt, tuple) and len(user_prompt) == 2
+            and all(isinstance(part, str) for part in user_prompt)):
+        raise TypeError(
+            "user_prompt must be the (products_context, request) tuple from _user_prompt(), "
+            f"not {type(user_prompt).__name__}"
+        )
+
+
+def _openai_messages(user_prompt):
+    """Chat messages for OpenAI, whose prompt cache reuses matching prefixes automatically."""
+    _check_user_prompt(user_prompt)
+    return [
+        {"role": "system", "content": PROPOSAL_SYSTEM_PROMPT},
+        {"role": "user", "content": "\n\n".join(user_prompt)},
+    ]
+
+
+def _anthropic_prompt(user_prompt):
+    """System and messages for Anthropic, with a cache breakpoint after the system prompt.
+
+    The system prompt is the only part shared by every request (the
+    product context depends on the spec). It is shorter than the model's
+    minimum cacheable prefix (1,024 tokens for Sonnet), so the breakpoint
+    only takes effect once the system prompt grows past it.
+    """
+    _check_user_prompt(user_prompt)
+    products_context, request = user_prompt
+    return {
+        "system": [{"type": "text", "text": PROPOSAL_SYSTEM_PROMPT, "cache_control": {"type": "ephemeral"}}],
+        "messages": [{"role": "user", "content": [
+            {"type": "text", "text": products_context},
+            {"type": "text", "text": request},
+        ]}],
+    }
+
+
+def _call_openai(model, user_prompt, deadline=None):
+    """Call OpenAI API (GPT-5 Nano or GPT-5 Mini)."""
+    client = LLM_CLIENTS.client("openai")
+    if deadline is not None:
+        client = client.with_options(timeout=deadline.remaining(), max_retries=0)
+    messages = _openai_messages(user_prompt)
+    start = time.time()
+
+    try:
+        response = PROVIDER_HEALTH.call_sync(model, lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0.3,
+        ), deadline, kind="proposal")
+        return _parse_openai_proposal(response, model, int((time.time() - start) * 1000))
+    except Exception as e:
         latency_ms = int((time.time() - start) * 1000)
-        content = response.choices[0].message.content or "{}"
-        result = json.loads(content)
-        usage = response.usage
+        return _error_fallback(model, str(e), latency_ms)
 
-        return {
-            **result,
-            "model": model,
-            "input_tokens": usage.prompt_tokens if usage else 0,
-            "output_tokens": usage.completion_tokens if usage else 0,
-            "latency_ms": latency_ms,
-        }
+
+async def _call_openai_async(model, user_prompt, deadline=None):
+    """Call OpenAI API through the async client (deadline, hedging, breaker)."""
+    client = LLM_CLIENTS.async_client("openai").with_options(max_retries=0)
+    messages = _openai_messages(user_prompt)
+    start = time.time()
+
+    try:
+        response = await PROVIDER_HEALTH.call(model, lambda: client.chat.completions.create(
+            model=model,
+            messages=messages,
+            response_format={"type": "json_object"},
+            temperature=0.3,
+        ), deadline, kind="proposal")
+        return _parse_openai_proposal(response, model, int((time.time() - start) * 1000))
     except Exception as e:
         latency_ms = int((time.time() - start) * 1000)
         return _error_fallback(model, str(e), latency_ms)
 
 
-def _call_anthropic(model, user_prompt):
-    """Call Anthropic API (Claude Sonnet 4)."""
-    import anthropic
+def _parse_openai_proposal(response, model, latency_ms):
+    """Build the proposal dict from a chat completion response."""
+    result = _proposal_fields(response.choices[0].message.content or "{}")
+    usage = response.usage
+
+    return {
+        **result,
+        "model": model,
+        "input_tokens": usage.prompt_tokens if usage else 0,
+        "output_tokens": usage.completion_tokens if usage else 0,
+        "cache_read_tokens": openai_cache_tokens(usage) if usage else 0,
+        "cache_write_tokens": 0,
+        "latency_ms": latency_ms,
+    }
 
-    client = anthropic.Anthropic()
+
+def _call_anthropic(model, user_prompt, deadline=None):
+    """Call Anthropic API (Claude Sonnet 4)."""
+    client = LLM_CLIENTS.client("anthropic")
+    if deadline is not None:
+        client = client.with_options(timeout=deadline.remaining(), max_retries=0)
+    prompt = _anthropic_prompt(user_prompt)
     start = time.time()
 
     try:
-        response = client.messages.create(
+        response = PROVIDER_HEALTH.call_sync(model, lambda: client.messages.create(
             model=model,
             max_tokens=2048,
-            system=PROPOSAL_SYSTEM_PROMPT,
-            messages=[{"role": "user", "content": user_prompt}],
-        )
+            **prompt,
+        ), deadline, kind="proposal")
+        return _parse_anthropic_proposal(response, model, int((time.time() - start) * 1000))
+    except Exception as e:
         latency_ms = int((time.time() - start) * 1000)
+        return _error_fallback(model, str(e), latency_ms)
 
-        content_text = ""
-        for block in response.content:
-            if hasattr(block, "text"):
-                content_text += block.text
-
-        try:
-            result = json.loads(content_text)
-        except json.JSONDecodeError:
-            result = {
-                "proposal_text": content_text,
-                "product_matches": [],
-                "feasibility_matrix": {},
-                "next_steps": [],
-            }
 
-        return {
-            **result,
-            "model": model,
-            "input_tokens": response.usage.input_tokens,
-            "output_tokens": response.usage.output_tokens,
-            "latency_ms": latency_ms,
-        }
+async def _call_anthropic_async(model, user_prompt, deadline=None):
+    """Call Anthropic API through the async client (deadline, hedging, breaker)."""
+    client = LLM_CLIENTS.async_client("anthropic").with_options(max_retries=0)
+    prompt = _anthropic_prompt(user_prompt)
+    start = time.time()
+
+    try:
+        response = await PROVIDER_HEALTH.call(model, lambda: client.messages.create(
+            model=model,
+            max_tokens=2048,
+            **prompt,
+        ), deadline, kind="proposal")
+        return _parse_anthropic_proposal(response, model, int((time.time() - start) * 1000))
     except Exception as e:
         latency_ms = int((time.time() - start) * 1000)
         return _error_fallback(model, str(e), latency_ms)
 
 
+def _parse_anthropic_proposal(response, model, latency_ms):
+    """Build the proposal dict from a Messages API response."""
+    content_text = ""
+    for block in response.content:
+        if hasattr(block, "text"):
+            content_text += block.text
+
+    input_tokens, cache_read_tokens, cache_write_tokens = anthropic_input_tokens(response.usage)
+    return {
+        **_proposal_fields(content_text),
+        "model": model,
+        "input_tokens": input_tokens,
+        "output_tokens": response.usage.output_tokens,
+        "cache_read_tokens": cache_read_tokens,
+        "cache_write_tokens": cache_write_tokens,
+        "latency_ms": latency_ms,
+    }
+
+
+def _proposal_fields(content_text):
+    """Parse the model's proposal JSON, repairing truncated or malformed output.
+
+    Fields that survive the repair are kept (repaired=True marks the
+    result); only output without any JSON object is used as raw text.
+    """
+    result, repaired = parse_json_object(content_text)
+    if not result:
+        return {
+            "proposal_text": content_text,
+            "product_matches": [],
+            "feasibility_matrix": {},
+            "next_steps": [],
+        }
+    result = {
+        "proposal_text": "",
+        "product_matches": [],
+        "feasibility_matrix": {},
+        "next_steps": [],
+        **result,
+    }
+    if repaired:
+        result["repaired"] = True
+    return result
+
+
 def _error_fallback(model, error_msg, latency_ms):
     """Return error fallback response."""
     return {
@@ -147,29 +509,85 @@ def _error_fallback(model, error_msg, latency_ms):
         "model": model,
         "input_tokens": 0,
         "output_tokens": 0,
+        "cache_read_tokens": 0,
+        "cache_write_tokens": 0,
         "latency_ms": latency_ms,
         "error": error_msg,
     }
 
 
-def _build_products_context(matched_products):
-    """Build a text summary of matched products for the LLM prompt."""
-    if not matched_products:
-        return "No direct matches found in catalog."
+def _product_facts(matched_products, features):
+    """Return (headers, attributes, vocabulary) of the top 5 matches for the packer.
 
-    lines = []
+    A header names the product, its ID, category and match score and the
+    spec's wavelengths and powers it covers. Attribute candidates are the
+    MAX_ATTRIBUTES_PER_FIELD applications and key features most relevant to
+    the spec, valued by match score, words shared with the spec and catalog
+    order; of equally valued ones the earlier in the catalog list is kept
+    (see utils.context_packer).
+    """
+    spec_words = content_words(features.raw)
+    headers, attributes, vocabulary = [], [], set()
     for match in matched_products[:5]:
         product = match.get("product", match)
-        name = product.get("name", "N/A")
-        category = product.get("category", "N/A")
-        apps = ", ".join(product.get("applications", [])[:3])
-        features = ", ".join(product.get("key_features", [])[:3])
         score = match.get("score", "N/A")
-        lines.append(
-            f"- {name} ({category}): Match {score}% | "
-            f"Applications: {apps} | Features: {features}"
+        header = (
+            f"- {product.get('name', 'N/A')} [{product.get('id', 'N/A')}] "
+            f"({product.get('category', 'N/A')}): Match {score}%"
         )
-    return "\n".join(lines)
+        covered = spec_coverage(product, features)
+        if covered:
+            header += f" | Covers: {', '.join(covered)}"
+        headers.append(header)
+
+        weight = score / 100 if isinstance(score, (int, float)) else 0.5
+        candidates = []
+        for field, key in (("Applications", "applications"), ("Features", "key_features")):
+            ranked = sorted(
+                ((weight * (1 + 0.5 * len(content_words(text) & spec_words)) * 0.85 ** i, i, text)
+                 for i, text in enumerate(product.get(key, []))),
+                key=lambda r: (-r[0], r[1]),
+            )[:MAX_ATTRIBUTES_PER_FIELD]
+            candidates += [(field, text, value) for value, _, text in sorted(ranked, key=lambda r: r[1])]
+        attributes.append(candidates)
+        vocabulary |= content_words(" ".join([product.get("category", "")] + product.get("applications", [])))
+    return headers, attributes, vocabulary
+
+
+def _pack_context(features, matched_products, model):
+    """Spec and product lines packed into model's context budget (utils.context_packer)."""
+    headers, attributes, vocabulary = _product_facts(matched_products, features)
+    return pack_context(features.raw, headers, attributes, context_budget(model), vocabulary)
+
+
+def spec_values(features):
+    """Return the spec's wavelengths and powers as (label, unit, value) triples.
+
+    label is how proposals name the value ("532 nm", "100 mW", "2 W");
+    unit is "nm" or "mW", with watts converted to mW.
+    """
+    return (
+        [(f"{wl:g} nm", "nm", wl) for wl in features.wavelengths_nm]
+        + [(f"{mw:g} mW", "mW", mw) for mw in features.power_mw]
+        + [(f"{w:g} W", "mW", w * 1000) for w in features.power_w]
+    )
+
+
+def spec_coverage(product, features):
+    """Return the labels (see spec_values) of the spec's values a product covers."""
+    wavelengths = product.get("wavelengths")
+    wl_range = product.get("wavelengths_range")
+    power_range = product.get("power_range_mw")
+    covered = []
+    for label, unit, value in spec_values(features):
+        if unit == "nm":
+            if (isinstance(wavelengths, list) and value in wavelengths) or (
+                wl_range and wl_range[0] <= value <= wl_range[1]
+            ):
+                covered.append(label)
+        elif power_range and power_range[0] <= value <= power_range[1]:
+            covered.append(label)
+    return covered
 
 
 # ---------------------------------------------------------------------------
@@ -359,9 +777,9 @@ This system combines three product lines (Laser, Tunable, THz) into an integrate
 }
 
 
-def _mock_proposal(spec, model, matched_products):
+def _mock_proposal(features, model, matched_products):
     """Return a pre-written mock proposal based on complexity."""
-    spec_lower = spec.lower()
+    spec_lower = features.text
 
     complex_keywords = [
         "terahertz", "thz", "system", "integration", "production line",
@@ -37,16 +37,33 @@ ROUTING_RATIONALE = {
     ),
 }
 
+# First model of a cascade per tier (agents.cascade): its draft is validated
+# locally and escalated up ROUTING_TABLE only if it fails.
+CASCADE_START = {
+    "MEDIUM": "gpt-5-nano",
+    "COMPLEX": "gpt-5-mini",
+}
+
 
-def route(classification):
+def route(classification, estimates=None, budget=None):
     """Determine which model to use based on classification.
 
     Args:
         classification: Dict from classifier with at least 'complexity' key.
+        estimates: Optional {model: estimate} of the proposal call per
+            ROUTING_TABLE model (agents.proposal.estimate_proposal), with
+            input_tokens, output_tokens, cost and latency_ms.
+        budget: Optional per-request limits {"max_cost": USD,
+            "max_latency_ms": ms}, covering the classification already
+            made plus the predicted proposal call. Needs estimates.
 
     Returns:
         Dict with selected_model, selected_model_label, complexity,
-        rationale, classifier_cost.
+        rationale, classifier_cost. With estimates also estimate (the
+        selected model's). If the routed model's estimate breaks the
+        budget, the closest lower tier that fits is selected instead and
+        budget_downgraded_from names the routed model; if no tier fits,
+        the cheapest is selected and over_budget is True.
     """
     complexity = classification.get("complexity", "MEDIUM")
     if complexity not in ROUTING_TABLE:
@@ -59,7 +76,7 @@ def route(classification):
         classification.get("output_tokens", 0),
     )
 
-    return {
+    routing = {
         "selected_model": selected_model,
         "selected_model_label": DISPLAY_NAMES.get(selected_model, selected_model),
         "complexity": complexity,
@@ -67,3 +84,171 @@ def route(classification):
         "classifier_cost": classifier_cost,
         "classifier_latency_ms": classification.get("latency_ms", 0),
     }
+    if not estimates or selected_model not in estimates:
+        return routing
+    routing["estimate"] = estimates[selected_model]
+    if not budget:
+        return routing
+    return _apply_budget(routing, estimates, budget)
+
+
+def _within_budget(routing, estimate, budget):
+    max_cost, max_latency = budget.get("max_cost"), budget.get("max_latency_ms")
+    if max_cost is not None and routing["classifier_cost"] + estimate["cost"] > max_cost:
+        return False
+    if max_latency is not None and routing["classifier_latency_ms"] + estimate["latency_ms"] > max_latency:
+        return False
+    return True
+
+
+def _apply_budget(routing, estimates, budget):
+    """Move routing down the tiers until the predicted call fits budget."""
+    selected = routing["selected_model"]
+    if _within_budget(routing, estimates[selected], budget):
+        return routing
+    tiers = list(ROUTING_TABLE.values())
+    lower = [m for m in tiers[:tiers.index(selected)][::-1] if m in estimates]
+    fitting = [m for m in lower if _within_budget(routing, estimates[m], budget)]
+    model = fitting[0] if fitting else (lower[-1] if lower else selected)
+    downgraded = {
+        **routing,
+        "selected_model": model,
+        "selected_model_label": DISPLAY_NAMES.get(model, model),
+        "estimate": estimates[model],
+        "budget_downgraded_from": selected,
+    }
+    if fitting:
+        downgraded["rationale"] = (
+            f"{routing['rationale']} The predicted cost or latency of {DISPLAY_NAMES.get(selected, selected)} "
+            f"exceeds the request budget, so {DISPLAY_NAMES.get(model, model)} was selected."
+        )
+    else:
+        downgraded["over_budget"] = True
+        downgraded["rationale"] = (
+            f"{routing['rationale']} No model fits the request budget, so the cheapest, "
+            f"{DISPLAY_NAMES.get(model, model)}, was selected."
+        )
+    if model == selected:
+        del downgraded["budget_downgraded_from"]
+    return downgraded
+
+
+def fallback_models(model):
+    """Return the models to try, in order, when model is unavailable.
+
+    Higher ROUTING_TABLE tiers come first (same or better quality), then
+    the lower tiers from the closest down.
+    """
+    tiers = list(ROUTING_TABLE.values())
+    if model not in tiers:
+        return [m for m in tiers if m != model]
+    position = tiers.index(model)
+    return tiers[position + 1:] + tiers[:position][::-1]
+
+
+def apply_reroute(routing, model):
+    """Return routing updated for a proposal actually generated by model.
+
+    Adds rerouted_from (the originally selected model) when they differ.
+    """
+    if model == routing["selected_model"]:
+        return routing
+    return {
+        **routing,
+        "selected_model": model,
+        "selected_model_label": DISPLAY_NAMES.get(model, model),
+        "rerouted_from": routing["selected_model"],
+        "rationale": (
+            f"{routing['rationale']} {DISPLAY_NAMES.get(routing['selected_model'], routing['selected_model'])} "
+            f"was unavailable, so the request was rerouted to {DISPLAY_NAMES.get(model, model)}."
+        ),
+    }
+
+
+def apply_reuse(routing, model, similarity):
+    """Return routing updated for a proposal reused from a near-duplicate spec.
+
+    Args:
+        routing: Routing dict from route().
+        model: Model that adapted the earlier proposal, or None if it was
+            reused unchanged as a draft.
+        similarity: Estimated similarity of the two specs (0-1).
+
+    Adds reused_instead_of (the originally selected model).
+    """
+    selected = routing["selected_model"]
+    if model is None:
+        label, how = "Earlier proposal (reused)", "reused as an instant draft"
+    else:
+        label, how = DISPLAY_NAMES.get(model, model), f"adapted by {DISPLAY_NAMES.get(model, model)}"
+    return {
+        **routing,
+        "selected_model": model or selected,
+        "selected_model_label": label,
+        "reused_instead_of": selected,
+        "rationale": (
+            f"{routing['rationale']} The spec is a near-duplicate ({similarity:.0%} similar) of an earlier "
+            f"request, so its proposal was {how} instead of generating one with "
+            f"{DISPLAY_NAMES.get(selected, selected)}."
+        ),
+    }
+
+
+def cascade_models(routing):
+    """Return the models a cascade tries for routing, cheapest first.
+
+    From CASCADE_START of the complexity up to the selected model; just the
+    selected model for SIMPLE requests or when a budget already moved the
+    selection below the cascade start.
+    """
+    tiers = list(ROUTING_TABLE.values())
+    selected = routing["selected_model"]
+    start = CASCADE_START.get(routing["complexity"])
+    if start is None or selected not in tiers or tiers.index(start) >= tiers.index(selected):
+        return [selected]
+    return tiers[tiers.index(start):tiers.index(selected) + 1]
+
+
+def apply_cascade(routing, cascade):
+    """Return routing updated for a cascade of proposal drafts.
+
+    Args:
+        routing: Routing dict from route().
+        cascade: Cascade record (agents.cascade.cascade_record) whose path
+            lists the models that drafted, in order; the last one's draft
+            is the proposal.
+
+    Adds escalation_path (the path) and, when the proposal came from a
+    lower tier than routed, cascaded_from (the originally selected model).
+    The rationale names every draft's outcome and why the cascade stopped.
+    """
+    selected = routing["selected_model"]
+    path = cascade["path"]
+    model = path[-1]
+    steps = []
+    for i, (drafted_by, attempt) in enumerate(zip(path, cascade["attempts"])):
+        label = DISPLAY_NAMES.get(drafted_by, drafted_by)
+        if attempt["valid"]:
+            step = f"{label}'s draft passed local validation"
+        elif "generation" in attempt["checks"]:
+            step = f"the call to {label} failed"
+        else:
+            step = f"{label}'s draft failed local validation ({attempt['errors'][0]})"
+        if i + 1 < len(path):
+            step += f", so the request escalated to {DISPLAY_NAMES.get(path[i + 1], path[i + 1])}"
+        steps.append(step[0].upper() + step[1:])
+    outcome = "the request failed" if "generation" in cascade["attempts"][-1]["checks"] else "that draft was kept"
+    if cascade["stopped"] == "exhausted":
+        steps.append(f"No higher tier was left to escalate to, so {outcome}")
+    elif cascade["stopped"] == "deadline":
+        steps.append(f"The deadline left no time to escalate further, so {outcome}")
+    cascaded = {
+        **routing,
+        "selected_model": model,
+        "selected_model_label": DISPLAY_NAMES.get(model, model),
+        "escalation_path": list(path),
+        "rationale": f"{routing['rationale']} Cascade: {'. '.join(steps)}.",
+    }
+    if model != selected:
+        cascaded["cascaded_from"] = selected
+    return cascaded
@@ -0,0 +1,110 @@
+"""Speculative proposal generation while the classifier is still running.
+
+With speculation on (pipeline speculate=True, live mode), the proposal call
+does not wait for the classifier: as soon as the catalog search is done,
+the proposal for the local classifier's predicted tier is started. When the
+real classification arrives and routes to the same model, that call's
+result is used (a hit: the proposal had a head start of up to the
+classifier's latency). Otherwise it is cancelled and the routed model is
+called as usual (a miss: the prompt and any output generated so far are
+billed for nothing).
+
+SPECULATION_STATS counts attempts, hits, latency saved and wasted tokens.
+"""
+
+import queue
+import sys
+import os
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.local_classifier import local_classify
+from agents.router import route
+from utils.token_estimator import USAGE_HISTORY, count_tokens
+
+
+def speculative_model(features, estimates=None, budget=None):
+    """Model route() would pick for the local classifier's predicted tier."""
+    return route(local_classify(features), estimates, budget)["selected_model"]
+
+
+def wasted_output_tokens(model, elapsed_ms, predicted_tokens):
+    """Output tokens a call to model probably generated before being cancelled after elapsed_ms."""
+    return min(predicted_tokens, int(elapsed_ms / USAGE_HISTORY.ms_per_output_token(model)))
+
+
+class SpeculativeStream:
+    """Runs a proposal stream in a background thread, buffering its events.
+
+    Args:
+        make_stream: Zero-argument callable returning the
+            agents.proposal.stream_proposal generator.
+    """
+
+    def __init__(self, make_stream):
+        self._make_stream = make_stream
+        self._events = queue.Queue()
+        self._cancelled = threading.Event()
+        self.streamed_text = ""
+        self.started_at = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="proposal-speculation", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        stream = self._make_stream()
+        try:
+            for event in stream:
+                if self._cancelled.is_set():
+                    break
+                if event["type"] == "delta":
+                    self.streamed_text += event["text"]
+                self._events.put(event)
+        finally:
+            stream.close()
+            self._events.put(None)
+
+    def events(self):
+        """Yield the stream's events: those buffered so far, then the rest as they arrive."""
+        while True:
+            event = self._events.get()
+            if event is None:
+                return
+            yield event
+
+    def cancel(self):
+        """Stop the stream at its next event; return output tokens streamed so far."""
+        self._cancelled.set()
+        return count_tokens(self.streamed_text)
+
+
+class SpeculationStats:
+    """Thread-safe counters of speculative proposal calls."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {"attempts": 0, "hits": 0, "latency_saved_ms": 0.0, "wasted_tokens": 0, "wasted_cost": 0.0}
+
+    def record(self, speculation):
+        """Record the speculation dict of one proposal (see agents.pipeline)."""
+        with self._lock:
+            self._counts["attempts"] += 1
+            self._counts["hits"] += int(speculation["hit"])
+            self._counts["latency_saved_ms"] += speculation["latency_saved_ms"]
+            self._counts["wasted_tokens"] += (
+                speculation["wasted_input_tokens"] + speculation["wasted_output_tokens"]
+            )
+            self._counts["wasted_cost"] += speculation["wasted_cost"]
+
+    def summary(self):
+        """Return attempts, hits, hit rate, total latency saved and wasted tokens and cost."""
+        with self._lock:
+            counts = dict(self._counts)
+        return {
+            **counts,
+            "hit_rate": counts["hits"] / counts["attempts"] if counts["attempts"] else 0.0,
+        }
+
+
+SPECULATION_STATS = SpeculationStats()
@@ -9,13 +9,19 @@ import plotly.graph_objects as go
 
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from products import search_products
+from products import CATALOG_MANAGER, PHOTONICS_CATALOG
 from pricing import MODEL_PRICING
-from agents.classifier import classify_spec
-from agents.router import route, DISPLAY_NAMES
-from agents.proposal import generate_proposal
+from agents.classifier import TIER_STATS
+from agents.pipeline import REUSE_MODES, preflight_estimate, stream_pipeline
+from agents.speculation import SPECULATION_STATS
+from agents.cascade import CASCADE_STATS
+from agents.router import DISPLAY_NAMES
 from utils.cost_calculator import format_cost, build_comparison_table, build_savings_summary
 from utils.export import generate_proposal_pdf
+from utils.llm_clients import LLM_CLIENTS
+from utils.proposal_index import PROPOSAL_INDEX
+from utils.json_stream import IncrementalJSONParser
+from utils.spec_parser import parse_spec
 
 # ---------------------------------------------------------------------------
 # Page config (must be first Streamlit call)
@@ -27,6 +33,9 @@ st.set_page_config(
     initial_sidebar_state="expanded",
 )
 
+# Pick up catalog file edits without restarting the app (no-op on reruns).
+CATALOG_MANAGER.start_watching()
+
 # ---------------------------------------------------------------------------
 # Load custom CSS
 # ---------------------------------------------------------------------------
@@ -45,6 +54,48 @@ if "spec_text" not in st.session_state:
 if "pa_sent" not in st.session_state:
     st.session_state.pa_sent = False
 
+# Minimum seconds between redraws of the streaming proposal
+STREAM_RENDER_INTERVAL_S = 0.05
+
+# ---------------------------------------------------------------------------
+# Rendering helpers
+# ---------------------------------------------------------------------------
+def feasibility_matrix_html(feasibility):
+    """Render the proposal's feasibility matrix as HTML rows."""
+    matrix_html = '<div class="feasibility-container">'
+    for param, info in feasibility.items():
+        if isinstance(info, dict):
+            status = info.get("status", "")
+            note = info.get("note", "")
+        else:
+            status = str(info)
+            note = ""
+
+        status_lower = status.lower()
+        if "met" in status_lower and "not" not in status_lower and "partial" not in status_lower:
+            status_class = "status-green"
+            icon = "\u2713"
+        elif "partial" in status_lower:
+            status_class = "status-yellow"
+            icon = "\u25cb"
+        else:
+            status_class = "status-red"
+            icon = "\u2717"
+
+        p = html_mod.escape(param)
+        s = html_mod.escape(status)
+        n = html_mod.escape(note)
+        matrix_html += (
+            f'<div class="feasibility-row">'
+            f'<div class="feasibility-param">{p}</div>'
+            f'<div class="feasibility-status {status_class}">{icon} {s}</div>'
+            f'<div class="feasibility-note">{n}</div>'
+            f'</div>'
+        )
+    matrix_html += '</div>'
+    return matrix_html
+
+
 # ---------------------------------------------------------------------------
 # Example queries
 # ---------------------------------------------------------------------------
@@ -78,6 +129,9 @@ with st.sidebar:
 
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
+    reuse_mode = "off"
+    speculate = False
+    cascade = False
     demo_mode = st.toggle(
         "Demo Mode",
         value=True,
@@ -107,6 +161,74 @@ with st.sidebar:
                 api_key_ok = False
         if not api_key_ok:
             st.warning("API keys required for Live Mode")
+        else:
+            LLM_CLIENTS.warm_up()
+        reuse_mode = st.radio(
+            "Near-Duplicate Reuse",
+            REUSE_MODES,
+            index=REUSE_MODES.index("off"),
+            format_func={"off": "Off", "draft": "Instant draft", "adapt": "Adapt (Nano)"}.get,
+            horizontal=True,
+            help="Specs nearly identical to an earlier one reuse its proposal: unchanged as an "
+                 "instant draft, or adapted to the new spec by GPT-5 Nano",
+        )
+        speculate = st.toggle(
+            "Speculative Proposal",
+            value=False,
+            help="Start the proposal for the locally predicted tier while the classifier is still "
+                 "running; kept if the classifier agrees, cancelled otherwise (wasted tokens)",
+        )
+        speculation_stats = SPECULATION_STATS.summary()
+        if speculation_stats["attempts"]:
+            st.caption(
+                f"Speculation: {speculation_stats['hit_rate']:.0%} hits of {speculation_stats['attempts']} "
+                f"\u00b7 {speculation_stats['latency_saved_ms'] / 1000:.1f} s saved "
+                f"\u00b7 {speculation_stats['wasted_tokens']:,} tokens wasted"
+            )
+        cascade = st.toggle(
+            "Cascade Routing",
+            value=False,
+            help="Draft Medium and Complex requests with the next cheaper model first; escalate only "
+                 "drafts that fail local validation (schema, catalog IDs, wavelength and power coverage)",
+        )
+        cascade_stats = CASCADE_STATS.summary()
+        if cascade_stats["requests"]:
+            st.caption(
+                f"Cascade: {cascade_stats['escalation_rate']:.0%} escalated of {cascade_stats['requests']} "
+                f"\u00b7 {format_cost(cascade_stats['cascade_cost'])} vs. "
+                f"{format_cost(cascade_stats['direct_cost'])} direct"
+            )
+        tiers = TIER_STATS.summary()
+        if tiers["requests"]:
+            agreement = tiers["shadow_agreement"]
+            st.caption(
+                f"Local fast path: {tiers['local_fraction']:.0%} of {tiers['requests']} requests"
+                + (f" \u00b7 shadow agreement {agreement:.0%}" if agreement is not None else "")
+                + (f" \u00b7 {tiers['shadow_failures']} shadow calls failed" if tiers["shadow_failures"] else "")
+            )
+
+    ranking_mode = st.radio(
+        "Product Ranking",
+        ["rules", "bm25"],
+        format_func={"rules": "Rules", "bm25": "BM25"}.get,
+        horizontal=True,
+        help="Rules: hand-weighted keyword scoring | BM25: text relevance + wavelength/power rules",
+    )
+
+    with st.expander("Request Budget"):
+        max_cost = st.number_input(
+            "Max cost per request ($)", min_value=0.0, value=0.0, step=0.001, format="%.4f",
+            help="0 = no limit. Requests predicted to cost more are routed to a cheaper model",
+        )
+        max_latency_s = st.number_input(
+            "Max latency (s)", min_value=0.0, value=0.0, step=0.5,
+            help="0 = no limit. Requests predicted to take longer are routed to a faster model",
+        )
+    budget = {}
+    if max_cost:
+        budget["max_cost"] = max_cost
+    if max_latency_s:
+        budget["max_latency_ms"] = max_latency_s * 1000
 
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
@@ -129,6 +251,19 @@ with st.sidebar:
         else:
             spec_input = ""
 
+    if spec_input.strip() and not demo_mode:
+        # Predicted before any API call: prompt tokens are counted locally,
+        # output size and latency come from recent live requests. Demo mode
+        # bills nothing, so no estimate is shown there.
+        estimate = preflight_estimate(parse_spec(spec_input), k=5, ranking_mode=ranking_mode, budget=budget)
+        estimate_routing = estimate["routing"]
+        st.caption(
+            f"Estimate: {estimate_routing['complexity']} \u2192 {estimate_routing['selected_model_label']} "
+            f"\u00b7 ~{estimate['input_tokens']:,} in / ~{estimate['output_tokens']:,} out tokens "
+            f"\u00b7 ~{format_cost(estimate['cost'])} \u00b7 ~{estimate['latency_ms'] / 1000:.1f} s"
+            + (" \u00b7 over budget" if estimate_routing.get("over_budget") else "")
+        )
+
     analyze_clicked = st.button(
         "START ANALYSIS",
         type="primary",
@@ -219,33 +354,68 @@ if analyze_clicked and spec_input.strip():
         unsafe_allow_html=True,
     )
 
-    with st.spinner("Classifying request..."):
-        classification = classify_spec(spec_input, demo_mode=demo_mode)
-
-    with st.spinner("Routing to optimal model..."):
-        routing = route(classification)
+    spec_features = parse_spec(spec_input)
 
-    with st.spinner("Searching product catalog (16 products)..."):
-        product_matches = search_products(spec_input)
+    # Classification and catalog search run concurrently; the proposal starts
+    # as soon as both are done and is rendered while it streams in
+    # (see agents/pipeline.py).
+    events = stream_pipeline(
+        spec_features, demo_mode=demo_mode, k=5, ranking_mode=ranking_mode, reuse=reuse_mode, budget=budget,
+        speculate=speculate, cascade=cascade,
+    )
+    with st.spinner(
+        f"Classifying request and searching catalog ({len(PHOTONICS_CATALOG)} products)..."
+    ):
+        prepared = next(events)
 
-    with st.spinner("Generating proposal..."):
-        proposal_result = generate_proposal(
-            spec_input,
-            routing["selected_model"],
-            product_matches,
-            demo_mode=demo_mode,
-        )
+    stream_placeholder = st.empty()
+    stream_placeholder.caption(
+        f"Generating proposal with {prepared['routing']['selected_model_label']}..."
+    )
+    # Top-level fields are shown as soon as they are complete (the prompt
+    # asks for the matches and feasibility matrix before the prose), and
+    # proposal_text is redrawn while it is still open.
+    parser, last_render = IncrementalJSONParser(), 0.0
+    for event in events:
+        if event["type"] == "escalate":
+            parser = IncrementalJSONParser()
+            stream_placeholder.caption(
+                f"{DISPLAY_NAMES.get(event['from'], event['from'])} draft rejected "
+                f"({event['errors'][0]}); regenerating with {DISPLAY_NAMES.get(event['to'], event['to'])}..."
+            )
+            continue
+        if event["type"] != "delta":
+            pipeline = event
+            continue
+        completed = parser.feed(event["text"])
+        if not completed and time.time() - last_render < STREAM_RENDER_INTERVAL_S:
+            continue
+        preview = ""
+        streamed_matches = parser.fields.get("product_matches")
+        if isinstance(streamed_matches, list) and streamed_matches:
+            names = ", ".join(
+                html_mod.escape(f"{m.get('product_name', 'N/A')} ({m.get('match_score', 0)}%)")
+                for m in streamed_matches if isinstance(m, dict)
+            )
+            preview += f'<div class="section-subheader">Matching products: {names}</div>'
+        streamed_feasibility = parser.fields.get("feasibility_matrix")
+        if isinstance(streamed_feasibility, dict) and streamed_feasibility:
+            preview += feasibility_matrix_html(streamed_feasibility)
+        streamed_text = parser.partial("proposal_text")
+        if isinstance(streamed_text, str) and streamed_text:
+            preview += f'<div class="proposal-text">{streamed_text}</div>'
+        if preview:
+            stream_placeholder.markdown(preview, unsafe_allow_html=True)
+        last_render = time.time()
+    stream_placeholder.empty()
+    classification = pipeline["classification"]
+    routing = pipeline["routing"]
+    product_matches = pipeline["product_matches"]
+    proposal_result = pipeline["proposal"]
 
     pii_placeholder.empty()
 
-    savings_summary = build_savings_summary(
-        classifier_model="gpt-5-nano",
-        classifier_input_tokens=classification.get("input_tokens", 0),
-        classifier_output_tokens=classification.get("output_tokens", 0),
-        proposal_model=routing["selected_model"],
-        proposal_input_tokens=proposal_result.get("input_tokens", 0),
-        proposal_output_tokens=proposal_result.get("output_tokens", 0),
-    )
+    savings_summary = build_savings_summary("gpt-5-nano", classification, routing["selected_model"], proposal_result)
 
     st.session_state.results = {
         "classification": classification,
@@ -253,6 +423,7 @@ if analyze_clicked and spec_input.strip():
         "product_matches": product_matches,
         "proposal": proposal_result,
         "savings": savings_summary,
+        "timings": pipeline["timings"],
         "spec_text": spec_input,
     }
     st.session_state.pa_sent = False
@@ -402,6 +573,17 @@ with c3:
         unsafe_allow_html=True,
     )
 
+timings = results.get("timings")
+if timings:
+    st.caption(
+        f"Stage wall time: classify {timings['classify']:,.0f} ms \u2016 "
+        f"search {timings['search']:,.1f} ms \u2192 route {timings['route']:,.1f} ms \u2192 "
+        f"proposal {timings['proposal']:,.0f} ms \u00b7 total {timings['total']:,.0f} ms"
+        + (f" \u00b7 first token after {timings['ttft']:,.0f} ms" if timings.get("ttft") is not None else "")
+        + (f" \u00b7 {results['proposal']['tokens_per_s']:,.0f} tokens/s"
+           if results["proposal"].get("tokens_per_s") else "")
+    )
+
 st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
 # ---------------------------------------------------------------------------
@@ -508,37 +690,7 @@ if feasibility:
         unsafe_allow_html=True,
     )
 
-    matrix_html = '<div class="feasibility-container">'
-    for param, info in feasibility.items():
-        if isinstance(info, dict):
-            status = info.get("status", "")
-            note = info.get("note", "")
-        else:
-            status = str(info)
-            note = ""
-
-        status_lower = status.lower()
-        if "met" in status_lower and "not" not in status_lower and "partial" not in status_lower:
-            status_class = "status-green"
-            icon = "\u2713"
-        elif "partial" in status_lower:
-            status_class = "status-yellow"
-            icon = "\u25cb"
-        else:
-            status_class = "status-red"
-            icon = "\u2717"
-
-        p = html_mod.escape(param)
-        s = html_mod.escape(status)
-        n = html_mod.escape(note)
-        matrix_html += (
-            f'<div class="feasibility-row">'
-            f'<div class="feasibility-param">{p}</div>'
-            f'<div class="feasibility-status {status_class}">{icon} {s}</div>'
-            f'<div class="feasibility-note">{n}</div>'
-            f'</div>'
-        )
-    matrix_html += '</div>'
+    matrix_html = feasibility_matrix_html(feasibility)
     st.markdown(matrix_html, unsafe_allow_html=True)
 
     st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
@@ -642,6 +794,37 @@ with eco_left:
     st.plotly_chart(fig, use_container_width=True)
 
 with eco_right:
+    cached_input_note = ""
+    if savings.get("cache_read_tokens") or savings.get("cache_write_tokens"):
+        cached_input_note = (
+            f" ({savings['cache_read_tokens']:,} cached, {savings['cache_write_tokens']:,} cache write,"
+            f" saved {format_cost(savings['prompt_cache_savings'])})"
+        )
+    speculation_note = ""
+    if savings.get("speculation_wasted_cost"):
+        speculation_note = (
+            f"<br>Speculation: {savings['speculation_wasted_tokens']:,} tokens wasted "
+            f"({format_cost(savings['speculation_wasted_cost'])})"
+        )
+    elif savings.get("speculation_latency_saved_ms"):
+        speculation_note = f"<br>Speculation: {savings['speculation_latency_saved_ms'] / 1000:.1f} s saved"
+    predicted_note = ""
+    if routing.get("estimate") and not proposal.get("reuse") and not proposal.get("cascade"):
+        predicted_note = f" (predicted {format_cost(routing['estimate']['cost'])})"
+    reuse_note = ""
+    reuse = proposal.get("reuse")
+    if reuse:
+        reuse_note = (
+            f" ({'reused' if reuse['mode'] == 'draft' else 'adapted'} from a {reuse['similarity']:.0%}"
+            f" similar spec, saved {format_cost(savings['reuse_savings'])})"
+        )
+    cascade_note = ""
+    if proposal.get("cascade"):
+        path = " \u2192 ".join(DISPLAY_NAMES.get(m, m) for m in proposal["cascade"]["path"])
+        cascade_note = (
+            f"<br>Cascade: {path}, {format_cost(savings['cascade_escalation_cost'])} on rejected drafts, "
+            f"{format_cost(savings['cascade_savings'])} saved vs. direct"
+        )
     st.markdown(
         f"""
         <div class="savings-highlight">
@@ -671,16 +854,22 @@ with eco_right:
             <div class="cost-row">
                 <div class="cost-label">Breakdown</div>
                 <div class="cost-breakdown">
-                    Input: {savings['total_input_tokens']:,}<br>
+                    Input: {savings['total_input_tokens']:,}{cached_input_note}<br>
                     Output: {savings['total_output_tokens']:,}<br>
-                    Classifier: {format_cost(savings['classifier_cost'])}<br>
-                    Proposal: {format_cost(savings['proposal_cost'])}
+                    Classifier: {format_cost(savings['classifier_cost'])}{" (cached)" if savings.get("classifier_from_cache") else ""}<br>
+                    Proposal: {format_cost(savings['proposal_cost'])}{predicted_note}{reuse_note}{speculation_note}{cascade_note}
                 </div>
             </div>
         </div>
         """,
         unsafe_allow_html=True,
     )
+    reuse_stats = PROPOSAL_INDEX.stats() if reuse_mode != "off" else None
+    if reuse_stats and reuse_stats["lookups"]:
+        st.caption(
+            f"Near-duplicate reuse: {reuse_stats['hit_rate']:.0%} hit rate over "
+            f"{reuse_stats['lookups']:,} lookups \u00b7 {reuse_stats['tokens_saved']:,} tokens saved"
+        )
 
 st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
 
@@ -0,0 +1,81 @@
+"""Benchmark search_products_batch against per-spec search_products.
+
+Usage:
+    python benchmarks/bench_batch_scoring.py [--sizes 1000 10000 100000]
+
+Specs are synthesized from catalog vocabulary and parsed up front, so the
+timings compare scoring and ranking only. Every batch result is checked
+against the scalar scorer.
+"""
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from products import PHOTONICS_CATALOG, get_search_index, search_products, search_products_batch
+from utils.batch_scoring import compile_search_index, score_matrix
+from utils.spec_parser import parse_spec
+
+
+def synthetic_specs(n, seed=0):
+    """Return n random specs mixing catalog phrases, numbers and units."""
+    rng = random.Random(seed)
+    vocab = ["laser", "need", "for", "with", "system", "compact", "tunable", "pulsed",
+             "thz", "security", "noise", "rms", "femtosecond", "modulated"]
+    for product in PHOTONICS_CATALOG:
+        vocab.extend(product.get("applications", []))
+        vocab.extend(product.get("keywords", []))
+        vocab.extend(product["category"].split())
+    quantities = ["{} nm", "{} mW", "{} W", "{}-{} nm", "{} THz", "<{}% RMS"]
+
+    specs = []
+    for _ in range(n):
+        words = [rng.choice(vocab) for _ in range(rng.randint(5, 30))]
+        for _ in range(rng.randint(0, 4)):
+            template = rng.choice(quantities)
+            words.append(template.format(*(rng.randint(1, 2000) for _ in range(2))))
+        rng.shuffle(words)
+        specs.append(" ".join(words))
+    return specs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    args = parser.parse_args()
+
+    compiled = compile_search_index(get_search_index())
+    search_products_batch(["warm-up"])
+
+    print(f"{'specs':>8} {'scalar s':>10} {'batch s':>10} {'speedup':>8} "
+          f"{'matrix s':>10} {'speedup':>8}  match")
+    for n in args.sizes:
+        features = [parse_spec(s) for s in synthetic_specs(n)]
+
+        start = time.perf_counter()
+        scalar = [search_products(f) for f in features]
+        scalar_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        batch = search_products_batch(features)
+        batch_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for i in range(0, n, 10_000):
+            score_matrix(compiled, features[i:i + 10_000])
+        matrix_s = time.perf_counter() - start
+
+        def key(results):
+            return [[(r["product"]["id"], r["score"]) for r in rs] for rs in results]
+
+        match = key(scalar) == key(batch)
+        print(f"{n:>8} {scalar_s:>10.3f} {batch_s:>10.3f} {scalar_s / batch_s:>7.1f}x "
+              f"{matrix_s:>10.3f} {scalar_s / matrix_s:>7.1f}x  {match}")
+
+
+if __name__ == "__main__":
+    main()
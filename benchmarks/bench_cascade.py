@@ -0,0 +1,87 @@
+"""Benchmark cascade routing against direct routing over a replayed corpus.
+
+Usage:
+    python benchmarks/bench_cascade.py [--corpus backlog.jsonl] [--specs 60]
+        [--nano-flaw-rate 0.3] [--mini-flaw-rate 0.1]
+
+Replays a corpus through the live pipeline against the local stand-in
+server (benchmarks/fake_llm_server.py), once with direct routing and once
+with cascade=True. The corpus is a batch backlog file (one {"id": ...,
+"spec": ...} per line, see agents/batch.py) or, without --corpus, synthetic
+specs. The stand-in spoils a share of each model's proposals (flaw_rate)
+with mistakes local validation catches; Claude Sonnet 4 is never wrong.
+Reports the proposal cost of both runs per complexity tier, the cascade's
+escalation rate and the share of final proposals passing validation.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import synthetic_specs
+from fake_llm_server import FakeLLMServer
+
+
+def load_corpus(path):
+    """Spec texts of a batch backlog file."""
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line)["spec"] for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus")
+    parser.add_argument("--specs", type=int, default=60)
+    parser.add_argument("--nano-flaw-rate", type=float, default=0.3)
+    parser.add_argument("--mini-flaw-rate", type=float, default=0.1)
+    args = parser.parse_args()
+
+    texts = load_corpus(args.corpus) if args.corpus else synthetic_specs(args.specs, seed=25)
+    workdir = tempfile.mkdtemp()
+    os.environ["CLASSIFICATION_CACHE_PATH"] = os.path.join(workdir, "classification_cache.sqlite")
+    os.environ["PROPOSAL_INDEX_PATH"] = os.path.join(workdir, "proposal_index.sqlite")
+    faults = {"gpt-5-nano": {"flaw_rate": args.nano_flaw_rate}, "gpt-5-mini": {"flaw_rate": args.mini_flaw_rate}}
+    with FakeLLMServer(faults=faults) as server:
+        os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+        os.environ["ANTHROPIC_BASE_URL"] = server.anthropic_base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-standin")
+        os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-standin")
+
+        from agents.cascade import validate_proposal
+        from agents.pipeline import run_pipeline
+        from utils.cost_calculator import build_cascade_report
+        from utils.llm_clients import LLM_CLIENTS
+        from utils.spec_parser import parse_spec
+
+        LLM_CLIENTS.warm_up(background=False)
+        specs = [parse_spec(text) for text in texts]
+        runs = {cascade: [run_pipeline(features, demo_mode=False, cascade=cascade) for features in specs]
+                for cascade in (False, True)}
+
+    report = build_cascade_report(runs[False], runs[True])
+    print(f"requests: {report['requests']}, flaw rate nano {args.nano_flaw_rate:.0%}, "
+          f"mini {args.mini_flaw_rate:.0%}")
+    print(f"{'tier':<8} {'requests':>8} {'direct':>10} {'cascade':>10}")
+    for tier in ("SIMPLE", "MEDIUM", "COMPLEX"):
+        row = report["by_complexity"].get(tier)
+        if row:
+            print(f"{tier:<8} {row['requests']:>8} ${row['direct_cost']:>9.4f} ${row['cascade_cost']:>9.4f}")
+    print(f"{'total':<8} {report['requests']:>8} ${report['direct_cost']:>9.4f} ${report['cascade_cost']:>9.4f}")
+    print(f"tokens: direct {report['direct_tokens']:,}, cascade {report['cascade_tokens']:,}")
+    print(f"cascaded: {report['cascaded']}, first draft accepted {report['first_draft_accepted']}, "
+          f"escalation rate {report['escalation_rate']:.0%}")
+    print(f"savings: ${report['savings']:.4f} ({report['savings_pct']:.0f}%)")
+    for cascade in (False, True):
+        valid = sum(
+            validate_proposal(features, result["proposal"], result["product_matches"])["valid"]
+            for features, result in zip(specs, runs[cascade])
+        )
+        print(f"valid final proposals, {'cascade' if cascade else 'direct':<7}: {valid / len(specs):.0%}")
+
+
+if __name__ == "__main__":
+    main()
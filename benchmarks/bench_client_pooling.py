@@ -0,0 +1,82 @@
+"""Benchmark shared pooled LLM clients against a new client per call.
+
+Usage:
+    python benchmarks/bench_client_pooling.py [--calls 50] [--latency 0.01]
+
+Runs live-mode classify and proposal calls against the local stand-in
+server (benchmarks/fake_llm_server.py) twice: once constructing a fresh
+SDK client per call, as the agents used to, and once through the shared
+LLM_CLIENTS registry after warm-up. Reports mean latency per call and the
+number of TCP connections the server accepted.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm_server import FakeLLMServer
+
+
+def _calls(n, classify, propose):
+    specs = [f"{405 + i} nm diode laser, {10 + i} mW" for i in range(n)]
+    start = time.perf_counter()
+    for spec in specs:
+        classify(spec)
+        propose("gpt-5-mini", spec)
+        propose("claude-sonnet-4-20250514", spec)
+    return (time.perf_counter() - start) / (3 * n)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--latency", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with FakeLLMServer(latency_s=args.latency) as server:
+        os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+        os.environ["ANTHROPIC_BASE_URL"] = server.anthropic_base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-standin")
+        os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-standin")
+
+        import anthropic
+        import openai
+
+        from agents import classifier, proposal
+        from utils.llm_clients import LLM_CLIENTS, LLMClientRegistry
+        from utils.spec_parser import parse_spec
+
+        class _FreshClients(LLMClientRegistry):
+            """A new SDK client (and connection) per call, like the old agents."""
+
+            def client(self, provider):
+                return openai.OpenAI() if provider == "openai" else anthropic.Anthropic()
+
+        rows = []
+        for label, registry in (("new client per call", _FreshClients()), ("shared registry", LLM_CLIENTS)):
+            classifier.LLM_CLIENTS = proposal.LLM_CLIENTS = registry
+            if registry is LLM_CLIENTS:
+                registry.warm_up(background=False)
+            before = server.stats()
+            per_call = _calls(
+                args.calls,
+                lambda spec: classifier._live_classify(spec),
+                lambda model, spec: (
+                    proposal._call_anthropic if model.startswith("claude") else proposal._call_openai
+                )(model, proposal._user_prompt(parse_spec(spec), [], model)),
+            )
+            after = server.stats()
+            rows.append((label, per_call, after["connections"] - before["connections"],
+                         after["requests"] - before["requests"]))
+
+    print(f"calls: {3 * args.calls} (classifier + 2 proposal models), server latency {args.latency * 1000:.0f} ms")
+    print(f"{'clients':<22} {'ms/call':>8} {'connections':>12} {'requests':>9}")
+    for label, per_call, connections, requests in rows:
+        print(f"{label:<22} {per_call * 1000:>8.2f} {connections:>12} {requests:>9}")
+
+
+if __name__ == "__main__":
+    main()
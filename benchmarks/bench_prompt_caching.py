@@ -0,0 +1,67 @@
+"""Benchmark provider prompt caching on proposal calls.
+
+Usage:
+    python benchmarks/bench_prompt_caching.py [--specs 100] [--min-tokens 1024]
+
+Generates live-mode proposals for synthetic specs with GPT-5 Mini and
+Claude Sonnet 4 against the local stand-in server
+(benchmarks/fake_llm_server.py), which simulates both providers' prompt
+caches. Reports the average prompt size, the share of input tokens read
+from or written to the cache, and the input cost with and without cached
+pricing. --min-tokens lowers the provider minimum to see the effect on a
+prompt prefix shorter than 1,024 tokens.
+"""
+
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import synthetic_specs
+from fake_llm_server import FakeLLMServer
+
+MODELS = ("gpt-5-mini", "claude-sonnet-4-20250514")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--specs", type=int, default=100)
+    parser.add_argument("--min-tokens", type=int, default=1024)
+    args = parser.parse_args()
+
+    with FakeLLMServer(prompt_cache_min_tokens=args.min_tokens) as server:
+        os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+        os.environ["ANTHROPIC_BASE_URL"] = server.anthropic_base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-standin")
+        os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-standin")
+
+        from agents.proposal import generate_proposal
+        from pricing import calculate_cost
+        from products import search_products
+        from utils.spec_parser import parse_spec
+
+        specs = [parse_spec(text) for text in synthetic_specs(args.specs, seed=11)]
+        rows = []
+        for model in MODELS:
+            totals = {"input": 0, "read": 0, "write": 0, "cost": 0.0, "full_cost": 0.0}
+            for features in specs:
+                result = generate_proposal(features, model, search_products(features, k=5), demo_mode=False)
+                totals["input"] += result["input_tokens"]
+                totals["read"] += result["cache_read_tokens"]
+                totals["write"] += result["cache_write_tokens"]
+                totals["cost"] += calculate_cost(model, result["input_tokens"], 0,
+                                                 cache_read_tokens=result["cache_read_tokens"],
+                                                 cache_write_tokens=result["cache_write_tokens"])
+                totals["full_cost"] += calculate_cost(model, result["input_tokens"], 0)
+            rows.append((model, totals))
+
+    print(f"specs: {args.specs} per model, cache minimum {args.min_tokens} tokens")
+    print(f"{'model':<26} {'prompt':>7} {'read':>6} {'write':>6} {'input $':>9} {'uncached $':>11}")
+    for model, t in rows:
+        print(f"{model:<26} {t['input'] / args.specs:>7.0f} {t['read'] / t['input']:>6.0%} "
+              f"{t['write'] / t['input']:>6.0%} {t['cost']:>9.4f} {t['full_cost']:>11.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Benchmark the BM25 ranking mode against the rule scorer.
+
+Usage:
+    python benchmarks/bench_ranking_modes.py [--specs 5000] [--k 5]
+
+Reports per-spec latency of search_products in both modes and how far the
+rankings agree: top-1 agreement, mean overlap of the top k, and how often
+the best two products tie on the displayed score (the saturation problem
+BM25 is meant to address).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import synthetic_specs
+from products import search_products
+from utils.spec_parser import parse_spec
+
+
+def _timed(features, k, mode):
+    start = time.perf_counter()
+    results = [search_products(f, k=k, mode=mode) for f in features]
+    return results, time.perf_counter() - start
+
+
+def _top_tie(result):
+    return len(result) >= 2 and result[0]["score"] == result[1]["score"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--specs", type=int, default=5_000)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    features = [parse_spec(s) for s in synthetic_specs(args.specs, seed=1)]
+    for mode in ("rules", "bm25"):
+        search_products("warm-up", k=args.k, mode=mode)
+
+    rules, rules_s = _timed(features, args.k, "rules")
+    bm25, bm25_s = _timed(features, args.k, "bm25")
+
+    both = [(r, b) for r, b in zip(rules, bm25) if r and b]
+    top1 = sum(r[0]["product"]["id"] == b[0]["product"]["id"] for r, b in both)
+    overlap = sum(
+        len({x["product"]["id"] for x in r} & {x["product"]["id"] for x in b}) / max(len(r), len(b))
+        for r, b in both
+    )
+
+    n = len(features)
+    print(f"specs: {n}, k={args.k}")
+    print(f"{'mode':<6} {'total s':>9} {'us/spec':>9} {'top-1 ties':>11}")
+    for mode, results, seconds in (("rules", rules, rules_s), ("bm25", bm25, bm25_s)):
+        ties = sum(_top_tie(r) for r in results)
+        print(f"{mode:<6} {seconds:>9.3f} {seconds / n * 1e6:>9.1f} {ties / n:>10.1%}")
+    print(f"specs ranked by both: {len(both)}")
+    print(f"top-1 agreement:      {top1 / max(len(both), 1):.1%}")
+    print(f"mean top-{args.k} overlap:   {overlap / max(len(both), 1):.1%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Check deadlines, hedged requests and circuit breakers against injected faults.
+
+Usage:
+    python benchmarks/bench_resilience.py [--calls 200]
+
+Runs live-mode proposal calls against the local stand-in server
+(benchmarks/fake_llm_server.py) in three scenarios:
+
+- tail latency: 5% of responses take 1 s extra. Compares p50/p95/p99
+  latency without hedging and with a hedge after the p95 delay.
+- failing model: every gpt-5-mini request fails. Shows the breaker opening
+  and MEDIUM requests being rerouted instead of erroring.
+- deadline: every response takes 2 s and the deadline is 0.3 s. Shows calls
+  returning on time.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm_server import FakeLLMServer
+
+
+def _percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+
+def _run_calls(n, model, health, deadline_s=None):
+    from agents import classifier, proposal
+    from utils.llm_clients import LLM_CLIENTS
+    from utils.resilience import Deadline
+
+    classifier.PROVIDER_HEALTH = proposal.PROVIDER_HEALTH = health
+    latencies, results = [], []
+    for i in range(n):
+        spec = f"{405 + i % 500} nm diode laser, {10 + i % 90} mW"
+        deadline = Deadline(deadline_s) if deadline_s else None
+        start = time.perf_counter()
+        results.append(LLM_CLIENTS.run(
+            proposal.generate_proposal_async(spec, model, [], demo_mode=False, deadline=deadline)
+        ))
+        latencies.append(time.perf_counter() - start)
+    return latencies, results
+
+
+def _serve(**settings):
+    server = FakeLLMServer(**settings).start()
+    os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+    os.environ["ANTHROPIC_BASE_URL"] = server.anthropic_base_url
+    return server
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    args = parser.parse_args()
+
+    os.environ.setdefault("OPENAI_API_KEY", "sk-standin")
+    os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-standin")
+    from utils.llm_clients import LLM_CLIENTS
+    from utils.resilience import ProviderHealth
+
+    # One server for the whole run: the registry's clients keep their base URL.
+    server = _serve(latency_s=0.02, slow_rate=0.05, slow_latency_s=1.0, seed=1)
+    LLM_CLIENTS.warm_up(background=False)
+
+    print(f"tail latency: {args.calls} gpt-5-nano calls, 20 ms base, 5% of responses +1 s")
+    print(f"{'':<12} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'hedges':>7} {'requests':>9}")
+    for label, health in (("no hedging", ProviderHealth(hedge_percentile=None)),
+                          ("hedged", ProviderHealth())):
+        _run_calls(25, "gpt-5-nano", health)  # latency history for the p95 delay
+        before = server.stats()["requests"]
+        latencies, _ = _run_calls(args.calls, "gpt-5-nano", health)
+        hedges = health.stats()["gpt-5-nano"]["hedges"]
+        print(f"{label:<12} {_percentile(latencies, 50) * 1000:>8.0f} {_percentile(latencies, 95) * 1000:>8.0f} "
+              f"{_percentile(latencies, 99) * 1000:>8.0f} {hedges:>7} {server.stats()['requests'] - before:>9}")
+
+    server.latency_s, server.slow_rate = 0.02, 0.0
+    server.faults = {"gpt-5-mini": {"error_rate": 1.0}}
+    health = ProviderHealth()
+    _, results = _run_calls(20, "gpt-5-mini", health)
+    mini = health.stats()["gpt-5-mini"]
+    print("\nfailing model: 20 gpt-5-mini calls, every gpt-5-mini request fails")
+    print(f"answered by: {sorted({r['model'] for r in results})}, errors: {sum('error' in r for r in results)}")
+    print(f"gpt-5-mini breaker: {mini['state']}, attempted {mini['calls'] - mini['rejected']}, "
+          f"failed fast {mini['rejected']}")
+
+    server.faults = {}
+    server.latency_s = 2.0
+    latencies, results = _run_calls(5, "gpt-5-nano", ProviderHealth(), deadline_s=0.3)
+    print("\ndeadline: 5 calls, 2 s responses, 0.3 s deadline")
+    print(f"max latency: {max(latencies) * 1000:.0f} ms, errors: {sum('error' in r for r in results)}")
+    server.latency_s = 0.0
+    server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark speculative proposal generation against sequential classify-then-generate.
+
+Usage:
+    python benchmarks/bench_speculation.py [--specs 60] [--latency 0.3] [--token-delay 0.002]
+
+Runs synthetic specs through the live pipeline against the local stand-in
+server (benchmarks/fake_llm_server.py), once normally and once with
+speculate=True, with an empty classification cache each time. Specs the
+local classifier answers never wait for the LLM classifier, so only the
+others are speculated on. Reports the speculation hit rate, median
+end-to-end latency of the speculated specs in both runs, latency saved,
+and tokens and cost wasted on misses.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_batch_scoring import synthetic_specs
+from fake_llm_server import FakeLLMServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--specs", type=int, default=60)
+    parser.add_argument("--latency", type=float, default=0.3)
+    parser.add_argument("--token-delay", type=float, default=0.002)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    os.environ["CLASSIFICATION_CACHE_PATH"] = os.path.join(workdir, "classification_cache.sqlite")
+    os.environ["PROPOSAL_INDEX_PATH"] = os.path.join(workdir, "proposal_index.sqlite")
+    with FakeLLMServer(latency_s=args.latency, token_delay_s=args.token_delay) as server:
+        os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+        os.environ["ANTHROPIC_BASE_URL"] = server.anthropic_base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-standin")
+        os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-standin")
+
+        from agents.classifier import CLASSIFICATION_CACHE
+        from agents.pipeline import run_pipeline
+        from utils.llm_clients import LLM_CLIENTS
+        from utils.spec_parser import parse_spec
+
+        LLM_CLIENTS.warm_up(background=False)
+        specs = [parse_spec(text) for text in synthetic_specs(args.specs, seed=17)]
+        runs = {}
+        for speculate in (False, True):
+            CLASSIFICATION_CACHE.clear()
+            runs[speculate] = [run_pipeline(features, demo_mode=False, speculate=speculate) for features in specs]
+
+    speculated = [i for i, result in enumerate(runs[True]) if "speculation" in result["proposal"]]
+    records = [runs[True][i]["proposal"]["speculation"] for i in speculated]
+    hits = sum(r["hit"] for r in records)
+    print(f"specs: {args.specs}, server latency {args.latency * 1000:.0f} ms, "
+          f"{args.token_delay * 1000:.0f} ms per token")
+    print(f"speculated: {len(records)} (the rest answered by the local classifier)")
+    if not records:
+        return
+    print(f"hits: {hits} ({hits / len(records):.0%})")
+    for speculate in (False, True):
+        totals = [runs[speculate][i]["timings"]["total"] for i in speculated]
+        print(f"median total, {'speculative' if speculate else 'sequential':<11}: {statistics.median(totals):>7.0f} ms")
+    print(f"latency saved: {sum(r['latency_saved_ms'] for r in records) / len(records):.0f} ms per speculated spec")
+    wasted_tokens = sum(r["wasted_input_tokens"] + r["wasted_output_tokens"] for r in records)
+    print(f"wasted: {wasted_tokens:,} tokens, ${sum(r['wasted_cost'] for r in records):.4f}")
+
+
+if __name__ == "__main__":
+    main()
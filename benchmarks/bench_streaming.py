@@ -0,0 +1,69 @@
+"""Benchmark streamed against blocking proposal generation.
+
+Usage:
+    python benchmarks/bench_streaming.py [--runs 10] [--latency 0.2] [--token-delay 0.01]
+
+Generates proposals with every routed model against the local stand-in
+server (benchmarks/fake_llm_server.py), once with generate_proposal and
+once with stream_proposal. Reports the time until the user sees the first
+text (the full latency when blocking, TTFT when streaming), total latency
+and tokens/s.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm_server import FakeLLMServer
+
+MODELS = ("gpt-5-nano", "gpt-5-mini", "claude-sonnet-4-20250514")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--latency", type=float, default=0.2)
+    parser.add_argument("--token-delay", type=float, default=0.01)
+    args = parser.parse_args()
+
+    with FakeLLMServer(latency_s=args.latency, token_delay_s=args.token_delay) as server:
+        os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+        os.environ["ANTHROPIC_BASE_URL"] = server.anthropic_base_url
+        os.environ.setdefault("OPENAI_API_KEY", "sk-standin")
+        os.environ.setdefault("ANTHROPIC_API_KEY", "sk-ant-standin")
+
+        from agents.proposal import generate_proposal, stream_proposal
+        from utils.llm_clients import LLM_CLIENTS
+
+        LLM_CLIENTS.warm_up(background=False)
+        spec = "532 nm laser, 100 mW, for fluorescence microscopy"
+        rows = []
+        for model in MODELS:
+            blocking, first_text, streamed, rates = [], [], [], []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                generate_proposal(spec, model, [], demo_mode=False)
+                blocking.append(time.perf_counter() - start)
+
+                for event in stream_proposal(spec, model, [], demo_mode=False):
+                    if event["type"] == "done":
+                        result = event["proposal"]
+                first_text.append(result["ttft_ms"] / 1000)
+                streamed.append(result["latency_ms"] / 1000)
+                rates.append(result["tokens_per_s"])
+            rows.append((model, statistics.median(blocking), statistics.median(first_text),
+                         statistics.median(streamed), statistics.median(rates)))
+
+    print(f"runs: {args.runs} per model, server latency {args.latency * 1000:.0f} ms, "
+          f"{args.token_delay * 1000:.0f} ms between chunks (medians)")
+    print(f"{'model':<26} {'blocking ms':>12} {'TTFT ms':>8} {'stream ms':>10} {'tokens/s':>9}")
+    for model, block, ttft, total, rate in rows:
+        print(f"{model:<26} {block * 1000:>12.0f} {ttft * 1000:>8.0f} {total * 1000:>10.0f} {rate:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
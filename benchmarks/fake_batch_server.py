@@ -0,0 +1,173 @@
+"""Offline stand-in for the OpenAI and Anthropic batch APIs (file based).
+
+Watches the directory used by agents.batch.LocalBatchBackend. Every batch
+whose status is "in_progress" and that was submitted at least turnaround_s
+ago is answered line by line with the canned responses of
+fake_llm_server.py, in the provider's result format:
+
+- OpenAI:    {"custom_id", "response": {"status_code", "body"}, "error"}
+- Anthropic: {"custom_id", "result": {"type": "succeeded", "message"}}
+
+error_rate makes a share of the lines fail instead.
+
+Usage:
+    with FakeBatchServer("data/batch_standin", turnaround_s=2.0):
+        process_backlog(specs, LocalBatchBackend("data/batch_standin"), workdir)
+
+    python benchmarks/fake_batch_server.py [--dir data/batch_standin] [--turnaround 5]
+
+Run the whole flow offline (the stand-in in a background thread):
+    python benchmarks/fake_batch_server.py --demo 40
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm_server import anthropic_message, openai_completion
+from agents.batch import write_status
+
+
+def _answer_line(request, fail):
+    custom_id = request["custom_id"]
+    if "params" in request:
+        if fail:
+            return {"custom_id": custom_id, "result": {
+                "type": "errored", "error": {"type": "api_error", "message": "Injected failure"},
+            }}
+        return {"custom_id": custom_id, "result": {"type": "succeeded", "message": anthropic_message(request["params"])}}
+    if fail:
+        return {"custom_id": custom_id, "response": {"status_code": 500, "body": {
+            "error": {"message": "Injected failure"},
+        }}, "error": None}
+    return {
+        "custom_id": custom_id,
+        "response": {"status_code": 200, "body": openai_completion(request["body"])},
+        "error": None,
+    }
+
+
+class FakeBatchServer:
+    """Polls a directory and completes submitted batches.
+
+    Args:
+        directory: Directory shared with LocalBatchBackend.
+        turnaround_s: Minimum time between submission and completion.
+        error_rate: Share of request lines answered with an error.
+        poll_interval_s: How often the directory is scanned.
+        seed: Seed for the error draws.
+    """
+
+    def __init__(self, directory, turnaround_s=0.0, error_rate=0.0, poll_interval_s=0.2, seed=0):
+        self.directory = directory
+        self.turnaround_s = turnaround_s
+        self.error_rate = error_rate
+        self.poll_interval_s = poll_interval_s
+        self._rng = random.Random(seed)
+        self._stop = threading.Event()
+        self._thread = None
+        self.batches_completed = 0
+        self.requests_answered = 0
+
+    def process_once(self):
+        """Complete every due batch; return how many were completed."""
+        completed = 0
+        os.makedirs(self.directory, exist_ok=True)
+        for batch_id in sorted(os.listdir(self.directory)):
+            batch_dir = os.path.join(self.directory, batch_id)
+            status_path = os.path.join(batch_dir, "status.json")
+            if not os.path.exists(status_path):
+                continue
+            with open(status_path, encoding="utf-8") as f:
+                status = json.load(f)
+            if status["status"] != "in_progress" or time.time() - status["submitted_at"] < self.turnaround_s:
+                continue
+
+            with open(os.path.join(batch_dir, "input.jsonl"), encoding="utf-8") as f:
+                requests = [json.loads(line) for line in f if line.strip()]
+            with open(os.path.join(batch_dir, "output.jsonl"), "w", encoding="utf-8") as f:
+                for request in requests:
+                    f.write(json.dumps(_answer_line(request, self._rng.random() < self.error_rate)) + "\n")
+            write_status(batch_dir, {**status, "status": "completed", "completed_at": time.time(),
+                                     "request_count": len(requests)})
+            completed += 1
+            self.requests_answered += len(requests)
+        self.batches_completed += completed
+        return completed
+
+    def _run(self):
+        while not self._stop.wait(self.poll_interval_s):
+            self.process_once()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fake-batch-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _demo(n_specs, turnaround_s):
+    from agents.batch import LocalBatchBackend, process_backlog
+    from bench_batch_scoring import synthetic_specs
+
+    with tempfile.TemporaryDirectory() as tmp:
+        shared = os.path.join(tmp, "standin")
+        specs = {f"spec-{i}": s for i, s in enumerate(synthetic_specs(n_specs, seed=7))}
+        with FakeBatchServer(shared, turnaround_s=turnaround_s) as server:
+            start = time.perf_counter()
+            merged = process_backlog(specs, LocalBatchBackend(shared), os.path.join(tmp, "jobs"),
+                                     poll_interval_s=0.2)
+            elapsed = time.perf_counter() - start
+
+    models = {}
+    for result in merged.values():
+        model = result["routing"]["selected_model"]
+        models[model] = models.get(model, 0) + 1
+    cost = sum(r["savings"]["actual_total_cost"] for r in merged.values())
+    saved = sum(r["savings"]["batch_savings"] for r in merged.values())
+    print(f"{len(merged)} specs in {elapsed:.1f}s, {server.batches_completed} batches, "
+          f"{server.requests_answered} requests")
+    print(f"proposal models: {models}")
+    print(f"cost at batch rates ${cost:.4f}, interactive ${cost + saved:.4f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dir", default=os.path.join("data", "batch_standin"))
+    parser.add_argument("--turnaround", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--demo", type=int, metavar="N_SPECS",
+                        help="Run an offline end-to-end backlog of N synthetic specs and exit")
+    args = parser.parse_args()
+
+    if args.demo:
+        _demo(args.demo, args.turnaround)
+        return
+    server = FakeBatchServer(args.dir, turnaround_s=args.turnaround, error_rate=args.error_rate)
+    print(f"Serving batches in {args.dir} (Ctrl+C to stop)")
+    try:
+        while True:
+            server.process_once()
+            time.sleep(server.poll_interval_s)
+    except KeyboardInterrupt:
+        print(f"{server.batches_completed} batches, {server.requests_answered} requests answered")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,497 @@
+"""Local HTTP stand-in for the OpenAI and Anthropic APIs.
+
+Serves POST /v1/chat/completions (OpenAI) and POST /v1/messages (Anthropic)
+with canned JSON answers in the shape the agents parse, over HTTP/1.1
+keep-alive. It counts accepted TCP connections and requests, so client
+pooling can be checked without network access or API keys.
+
+Faults can be injected globally or per model: a share of requests answered
+with HTTP 500 (error_rate) and a share delayed by slow_latency_s
+(slow_rate), on top of the base latency_s.
+
+Prompt caching is simulated like the providers do it: OpenAI reports the
+longest prefix shared with an earlier prompt as cached_tokens (in steps of
+128 tokens), Anthropic caches the prefix up to each cache_control block
+(cache_creation_input_tokens on first use, cache_read_input_tokens after).
+Prefixes shorter than prompt_cache_min_tokens are never cached.
+
+Proposal answers recommend the products listed in the prompt (best three)
+and mark each requested wavelength met if a listed product covers it. A
+share of proposals (flaw_rate, per model through faults) carries one of
+FLAWS, the mistakes agents.cascade's local validation catches: an invented
+product ID, a wavelength claimed met by a product that does not cover it,
+or an empty proposal text.
+
+Requests with "stream": true are answered as server-sent events in each
+provider's streaming format, one chunk of about 4 characters (one token)
+every token_delay_s, after the base latency (time to first token).
+
+Usage:
+    with FakeLLMServer(latency_s=0.05, faults={"gpt-5-mini": {"error_rate": 1.0}}) as server:
+        os.environ["OPENAI_BASE_URL"] = server.openai_base_url
+        os.environ["ANTHROPIC_BASE_URL"] = server.anthropic_base_url
+        ...
+        print(server.stats())
+
+    python benchmarks/fake_llm_server.py [--port 8765] [--latency 0.05]
+        [--error-rate 0.1] [--slow-rate 0.05] [--slow-latency 2.0]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Keyword rule mirroring the classifier's demo mode (whole words, so the
+# "Customer specification" header does not count as "custom").
+_COMPLEX_WORDS = re.compile(r"\b(terahertz|thz|integration|system|custom|production line)\b")
+_MEDIUM_WORDS = re.compile(r"\b(multiple|multiline|noise|rms|combination|combiner)\b")
+
+# Product header lines of the proposal prompt (agents.proposal._product_facts).
+_PRODUCT_LINE = re.compile(r"^- (?P<name>.+?) \[(?P<id>[^\]]+)\] \(.*?\): Match (?P<score>\d+)%"
+                           r"(?: \| Covers: (?P<covers>[^|]*))?", re.M)
+_WAVELENGTH = re.compile(r"(\d+(?:\.\d+)?)\s*nm\b", re.I)
+
+FLAWS = ("unknown_product", "unsupported_claim", "empty_text")
+
+
+def _classify(text):
+    text = text.lower()
+    if _COMPLEX_WORDS.search(text):
+        return "COMPLEX"
+    if _MEDIUM_WORDS.search(text):
+        return "MEDIUM"
+    return "SIMPLE"
+
+
+def _answer(system, user, flaw=None):
+    """Return (JSON answer text, input tokens, output tokens) for one request.
+
+    flaw, one of FLAWS, spoils a proposal answer.
+    """
+    if "classifier" in system.lower():
+        answer = {"complexity": _classify(user), "reasoning": "Stand-in classification.", "key_parameters": []}
+    else:
+        answer = _proposal_answer(user, flaw)
+    text = json.dumps(answer)
+    return text, (len(system) + len(user)) // 4, len(text) // 4
+
+
+def _proposal_answer(user, flaw=None):
+    """Proposal JSON for the products and wavelengths in the prompt, optionally with a flaw."""
+    products = [m.groupdict() for m in _PRODUCT_LINE.finditer(user)]
+    spec = user.split("Customer specification:")[-1]
+    wavelengths = list(dict.fromkeys(f"{float(v):g} nm" for v in _WAVELENGTH.findall(spec)))
+    recommended = products[:3]
+    if flaw == "unsupported_claim" and products:
+        recommended = [products[-1]]
+    matches = [
+        {"product_id": p["id"], "product_name": p["name"], "match_score": int(p["score"]),
+         "reasoning": f"Covers {p['covers'].strip()}." if p["covers"] else "Closest catalog match."}
+        for p in recommended
+    ]
+    covered = {c.strip() for p in recommended if p["covers"] for c in p["covers"].split(",")}
+    matrix = {
+        f"Wavelength {wl}": {
+            "status": "met" if wl in covered or flaw == "unsupported_claim" else "not met",
+            "note": f"{wl} {'covered' if wl in covered else 'requested'}",
+        }
+        for wl in wavelengths
+    }
+    if flaw == "unknown_product" and matches:
+        matches[0]["product_id"] += "-x"
+    return {
+        "product_matches": matches,
+        "feasibility_matrix": matrix,
+        "proposal_text": "" if flaw == "empty_text" else _STANDIN_PROPOSAL,
+        "next_steps": ["Review the stand-in proposal."],
+    }
+
+
+_STANDIN_PROPOSAL = (
+    "## Stand-in Proposal\n\n"
+    "Thank you for your inquiry. Based on the specification we recommend the matched "
+    "products listed below, which cover the requested wavelengths and output powers.\n\n"
+    "### Technical Assessment\n\n"
+    "All key parameters are within the specified operating ranges. Integration with the "
+    "existing setup is straightforward; the standard control interface and mounting "
+    "options apply.\n\n"
+    "### Recommendation\n\n"
+    "We propose a short technical call to confirm the operating conditions before "
+    "preparing the formal quotation."
+)
+
+
+def _text(content):
+    """Plain text of a message or system content (string or list of blocks)."""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content)
+
+
+class PromptCache:
+    """Provider-side prompt cache stand-in (token counts are characters / 4).
+
+    Args:
+        min_tokens: Shortest prefix the providers cache.
+        max_prompts: Prompts kept for OpenAI prefix matching.
+    """
+
+    def __init__(self, min_tokens=1024, max_prompts=1000):
+        self.min_tokens = min_tokens
+        self._openai_prompts = deque(maxlen=max_prompts)
+        self._anthropic_prefixes = set()
+        self._lock = threading.Lock()
+        self.read_tokens = 0
+        self.write_tokens = 0
+
+    def openai(self, prompt):
+        """Return the cached prompt tokens of an OpenAI prompt (automatic prefix caching)."""
+        with self._lock:
+            shared = max((len(os.path.commonprefix([prompt, seen])) for seen in self._openai_prompts), default=0)
+            self._openai_prompts.append(prompt)
+            cached = (shared // 4) // 128 * 128
+            cached = cached if cached >= self.min_tokens else 0
+            self.read_tokens += cached
+            return cached
+
+    def anthropic(self, blocks):
+        """Return (cache read, cache write) tokens for [(text, has cache_control)] blocks."""
+        prefix, breakpoints = "", []
+        for text, cache_control in blocks:
+            prefix += text
+            if cache_control and len(prefix) // 4 >= self.min_tokens:
+                breakpoints.append(prefix)
+        if not breakpoints:
+            return 0, 0
+        with self._lock:
+            hits = [p for p in breakpoints if p in self._anthropic_prefixes]
+            read = len(hits[-1]) // 4 if hits else 0
+            write = 0 if breakpoints[-1] in self._anthropic_prefixes else len(breakpoints[-1]) // 4 - read
+            self._anthropic_prefixes.update(breakpoints)
+            self.read_tokens += read
+            self.write_tokens += write
+            return read, write
+
+
+def _token_chunks(text):
+    """Split text into ~4-character chunks, one per simulated token."""
+    return [text[i:i + 4] for i in range(0, len(text), 4)]
+
+
+def openai_stream_events(request, prompt_cache=None, flaw=None):
+    """SSE data payloads for a streamed OpenAI chat request (usage chunk last)."""
+    completion = openai_completion(request, prompt_cache, flaw)
+    base = {"id": completion["id"], "object": "chat.completion.chunk",
+            "created": completion["created"], "model": completion["model"]}
+    events = [{**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": ""},
+                                    "finish_reason": None}]}]
+    for chunk in _token_chunks(completion["choices"][0]["message"]["content"]):
+        events.append({**base, "choices": [{"index": 0, "delta": {"content": chunk}, "finish_reason": None}]})
+    events.append({**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]})
+    if request.get("stream_options", {}).get("include_usage"):
+        events.append({**base, "choices": [], "usage": completion["usage"]})
+    return [(None, event) for event in events] + [(None, "[DONE]")]
+
+
+def anthropic_stream_events(request, prompt_cache=None, flaw=None):
+    """(event name, data) pairs for a streamed Anthropic messages request."""
+    message = anthropic_message(request, prompt_cache, flaw)
+    usage = message["usage"]
+    events = [
+        ("message_start", {"type": "message_start", "message": {
+            **message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1},
+        }}),
+        ("content_block_start", {"type": "content_block_start", "index": 0,
+                                 "content_block": {"type": "text", "text": ""}}),
+    ]
+    for chunk in _token_chunks(message["content"][0]["text"]):
+        events.append(("content_block_delta", {"type": "content_block_delta", "index": 0,
+                                               "delta": {"type": "text_delta", "text": chunk}}))
+    events += [
+        ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+        ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+                           "usage": {"output_tokens": usage["output_tokens"]}}),
+        ("message_stop", {"type": "message_stop"}),
+    ]
+    return events
+
+
+def openai_completion(request, prompt_cache=None, flaw=None):
+    """Chat completion response body for an OpenAI chat request body."""
+    messages = request.get("messages", [])
+    system = " ".join(_text(m["content"]) for m in messages if m["role"] == "system")
+    user = " ".join(_text(m["content"]) for m in messages if m["role"] == "user")
+    text, input_tokens, output_tokens = _answer(system, user, flaw)
+    cached_tokens = prompt_cache.openai("".join(_text(m["content"]) for m in messages)) if prompt_cache else 0
+    return {
+        "id": "chatcmpl-standin",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": request.get("model", ""),
+        "choices": [{
+            "index": 0,
+            "message": {"role": "assistant", "content": text},
+            "finish_reason": "stop",
+        }],
+        "usage": {
+            "prompt_tokens": input_tokens,
+            "completion_tokens": output_tokens,
+            "total_tokens": input_tokens + output_tokens,
+            "prompt_tokens_details": {"cached_tokens": min(cached_tokens, input_tokens)},
+        },
+    }
+
+
+def anthropic_message(request, prompt_cache=None, flaw=None):
+    """Messages API response body for an Anthropic messages request body."""
+    user = " ".join(_text(m["content"]) for m in request.get("messages", []))
+    system = _text(request.get("system", ""))
+    text, input_tokens, output_tokens = _answer(system, user, flaw)
+    cache_read = cache_write = 0
+    if prompt_cache:
+        blocks = []
+        for content in [request.get("system", "")] + [m["content"] for m in request.get("messages", [])]:
+            if isinstance(content, str):
+                blocks.append((content, False))
+            else:
+                blocks += [(block.get("text", ""), "cache_control" in block) for block in content]
+        cache_read, cache_write = prompt_cache.anthropic(blocks)
+        cache_write = min(cache_write, input_tokens - cache_read)
+    return {
+        "id": "msg_standin",
+        "type": "message",
+        "role": "assistant",
+        "model": request.get("model", ""),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {
+            "input_tokens": input_tokens - cache_read - cache_write,
+            "output_tokens": output_tokens,
+            "cache_read_input_tokens": cache_read,
+            "cache_creation_input_tokens": cache_write,
+        },
+    }
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        self.server.count("connections")
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (deadline or losing hedge) and closed the socket.
+            self.close_connection = True
+
+    def _send_events(self, events):
+        """Stream (event name, data) pairs as chunked server-sent events."""
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Transfer-Encoding", "chunked")
+            self.end_headers()
+            for i, (name, data) in enumerate(events):
+                if i > 1 and self.server.token_delay_s:
+                    time.sleep(self.server.token_delay_s)
+                payload = data if isinstance(data, str) else json.dumps(data)
+                frame = (f"event: {name}\n" if name else "") + f"data: {payload}\n\n"
+                body = frame.encode("utf-8")
+                self.wfile.write(f"{len(body):x}\r\n".encode() + body + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+            self.server.count("streams")
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _generate(self, output_tokens):
+        """Blocking answers take as long to generate as the streamed ones."""
+        if self.server.token_delay_s:
+            time.sleep(self.server.token_delay_s * output_tokens)
+
+    def do_HEAD(self):
+        self.server.count("head_requests")
+        self.send_response(200)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def do_POST(self):
+        self.server.count("requests")
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        model = request.get("model", "")
+
+        delay_s, fail = self.server.draw_fault(model)
+        flaw = self.server.draw_flaw(model)
+        if delay_s:
+            time.sleep(delay_s)
+        if fail:
+            self._send_json(500, {"type": "error", "error": {"type": "api_error", "message": "Injected failure"}})
+            return
+
+        prompt_cache = self.server.prompt_cache
+        if request.get("stream") and self.path.endswith("/chat/completions"):
+            self._send_events(openai_stream_events(request, prompt_cache, flaw))
+        elif request.get("stream") and self.path.endswith("/messages"):
+            self._send_events(anthropic_stream_events(request, prompt_cache, flaw))
+        elif self.path.endswith("/chat/completions"):
+            completion = openai_completion(request, prompt_cache, flaw)
+            self._generate(completion["usage"]["completion_tokens"])
+            self._send_json(200, completion)
+        elif self.path.endswith("/messages"):
+            message = anthropic_message(request, prompt_cache, flaw)
+            self._generate(message["usage"]["output_tokens"])
+            self._send_json(200, message)
+        else:
+            self._send_json(404, {"error": {"message": f"Unknown path {self.path}"}})
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    """Threaded stand-in server; use as a context manager or start()/stop().
+
+    Args:
+        host: Bind address.
+        port: Port; 0 picks a free one.
+        latency_s: Artificial delay before each POST answer.
+        error_rate: Share of POST requests answered with HTTP 500.
+        slow_rate: Share of POST requests delayed by slow_latency_s extra.
+        slow_latency_s: Extra delay of slow requests.
+        flaw_rate: Share of proposal answers spoiled with one of FLAWS.
+        faults: Optional {model: {setting: value}} overriding the five
+            settings above for requests to that model.
+        seed: Seed for the fault draws.
+        token_delay_s: Generation time per output token (the delay between
+            streamed chunks; blocking answers wait for all of them).
+        prompt_cache_min_tokens: Shortest prompt prefix that is cached.
+    """
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, latency_s=0.0, error_rate=0.0, slow_rate=0.0,
+                 slow_latency_s=2.0, flaw_rate=0.0, faults=None, seed=0, token_delay_s=0.0, prompt_cache_min_tokens=1024):
+        super().__init__((host, port), _Handler)
+        self.prompt_cache = PromptCache(prompt_cache_min_tokens)
+        self.latency_s = latency_s
+        self.token_delay_s = token_delay_s
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_latency_s = slow_latency_s
+        self.flaw_rate = flaw_rate
+        self.faults = dict(faults or {})
+        self._rng = random.Random(seed)
+        self._flaw_rng = random.Random(seed + 1)
+        self._counts_lock = threading.Lock()
+        self._counts = {"connections": 0, "requests": 0, "head_requests": 0, "errors": 0, "slow": 0, "streams": 0}
+        self._thread = None
+
+    def draw_fault(self, model):
+        """Return (delay in seconds, fail?) for one request to model."""
+        settings = {
+            "latency_s": self.latency_s, "error_rate": self.error_rate,
+            "slow_rate": self.slow_rate, "slow_latency_s": self.slow_latency_s,
+            **self.faults.get(model, {}),
+        }
+        with self._counts_lock:
+            slow = self._rng.random() < settings["slow_rate"]
+            fail = self._rng.random() < settings["error_rate"]
+            self._counts["slow"] += slow
+            self._counts["errors"] += fail
+        return settings["latency_s"] + (settings["slow_latency_s"] if slow else 0.0), fail
+
+    def draw_flaw(self, model):
+        """Return the flaw (one of FLAWS) for a proposal answer from model, or None."""
+        rate = self.faults.get(model, {}).get("flaw_rate", self.flaw_rate)
+        with self._counts_lock:
+            return self._flaw_rng.choice(FLAWS) if self._flaw_rng.random() < rate else None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def openai_base_url(self):
+        return f"{self.url}/v1"
+
+    @property
+    def anthropic_base_url(self):
+        return self.url
+
+    def handle_error(self, request, client_address):
+        # Clients drop idle keep-alive connections (e.g. after a stream); not an error.
+        if isinstance(sys.exc_info()[1], ConnectionResetError):
+            return
+        super().handle_error(request, client_address)
+
+    def count(self, name):
+        with self._counts_lock:
+            self._counts[name] += 1
+
+    def stats(self):
+        """Return accepted connections, request counts and prompt cache tokens."""
+        with self._counts_lock:
+            counts = dict(self._counts)
+        return {**counts, "cache_read_tokens": self.prompt_cache.read_tokens,
+                "cache_write_tokens": self.prompt_cache.write_tokens}
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, name="fake-llm-server", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--slow-rate", type=float, default=0.0)
+    parser.add_argument("--slow-latency", type=float, default=2.0)
+    args = parser.parse_args()
+
+    server = FakeLLMServer(
+        port=args.port, latency_s=args.latency, error_rate=args.error_rate,
+        slow_rate=args.slow_rate, slow_latency_s=args.slow_latency,
+    )
+    print(f"OPENAI_BASE_URL={server.openai_base_url}")
+    print(f"ANTHROPIC_BASE_URL={server.anthropic_base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(server.stats())
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,12 @@
 """Token pricing models for all LLMs (February 2026)."""
 
+import re
+
 MODEL_PRICING = {
     "gpt-5-nano": {
         "input_per_1m": 0.05,
         "output_per_1m": 0.40,
+        "cached_input_per_1m": 0.005,
         "label": "GPT-5 Nano (Classifier)",
         "color": "#059669",
         "provider": "openai",
@@ -11,6 +14,7 @@ MODEL_PRICING = {
     "gpt-5-mini": {
         "input_per_1m": 0.25,
         "output_per_1m": 2.00,
+        "cached_input_per_1m": 0.025,
         "label": "GPT-5 Mini (Medium)",
         "color": "#D97706",
         "provider": "openai",
@@ -18,6 +22,8 @@ MODEL_PRICING = {
     "claude-sonnet-4": {
         "input_per_1m": 3.00,
         "output_per_1m": 15.00,
+        "cached_input_per_1m": 0.30,
+        "cache_write_per_1m": 3.75,
         "label": "Claude Sonnet 4 (Complex)",
         "color": "#7C3AED",
         "provider": "anthropic",
@@ -25,6 +31,7 @@ MODEL_PRICING = {
     "gpt-5": {
         "input_per_1m": 1.25,
         "output_per_1m": 10.00,
+        "cached_input_per_1m": 0.125,
         "label": "GPT-5 (Reference)",
         "color": "#009de2",
         "provider": "openai",
@@ -32,24 +39,54 @@ MODEL_PRICING = {
     "gpt-5.2": {
         "input_per_1m": 1.75,
         "output_per_1m": 14.00,
+        "cached_input_per_1m": 0.175,
         "label": "GPT-5.2 Thinking (Flagship)",
         "color": "#EF4444",
         "provider": "openai",
     },
 }
 
+# Prompt caching: cached_input_per_1m is the price of input tokens read from
+# the provider's prompt cache (OpenAI caches prefixes automatically, Anthropic
+# at cache_control breakpoints). Anthropic also bills tokens written to the
+# cache at cache_write_per_1m; models without it write at the input price.
+
+# OpenAI's Batch API and Anthropic's Message Batches API both bill
+# asynchronous (up to 24 h) requests at 50% of the standard token rates.
+BATCH_DISCOUNT = 0.50
+
 ROUTING_MODELS = ["gpt-5-nano", "gpt-5-mini", "claude-sonnet-4"]
 REFERENCE_MODELS = ["gpt-5", "gpt-5.2"]
 ALL_MODELS_ORDERED = ["gpt-5-nano", "gpt-5-mini", "gpt-5", "gpt-5.2", "claude-sonnet-4"]
 
 
-def calculate_cost(model, input_tokens, output_tokens):
-    """Calculate USD cost for a single model call."""
-    pricing = MODEL_PRICING.get(model)
+def _pricing_for(model):
+    """Look up pricing, accepting dated snapshot IDs like claude-sonnet-4-20250514."""
+    return MODEL_PRICING.get(model) or MODEL_PRICING.get(re.sub(r"-\d{8}$", "", model))
+
+
+def calculate_cost(model, input_tokens, output_tokens, batch=False, cache_read_tokens=0, cache_write_tokens=0):
+    """Calculate USD cost for a single model call.
+
+    Args:
+        input_tokens: All prompt tokens, including those read from or
+            written to the prompt cache.
+        batch: Price the call at batch API rates (BATCH_DISCOUNT off).
+        cache_read_tokens: Prompt tokens served from the prompt cache.
+        cache_write_tokens: Prompt tokens written to the prompt cache.
+    """
+    pricing = _pricing_for(model)
     if not pricing:
         return 0.0
-    input_cost = (input_tokens / 1_000_000) * pricing["input_per_1m"]
+    uncached_tokens = input_tokens - cache_read_tokens - cache_write_tokens
+    input_cost = (
+        uncached_tokens * pricing["input_per_1m"]
+        + cache_read_tokens * pricing.get("cached_input_per_1m", pricing["input_per_1m"])
+        + cache_write_tokens * pricing.get("cache_write_per_1m", pricing["input_per_1m"])
+    ) / 1_000_000
     output_cost = (output_tokens / 1_000_000) * pricing["output_per_1m"]
+    if batch:
+        return (input_cost + output_cost) * (1 - BATCH_DISCOUNT)
     return input_cost + output_cost
 
 
@@ -69,13 +106,19 @@ def get_most_expensive_model():
     )
 
 
-def calculate_savings(actual_cost, input_tokens, output_tokens):
+def calculate_savings(actual_cost, input_tokens, output_tokens, batch=False, cache_read_tokens=0,
+                      cache_write_tokens=0):
     """Calculate savings vs. most expensive model.
 
+    With batch=True or cached prompt tokens the reference model is priced
+    at batch rates and with the same cache reads and writes, so the savings
+    reflect routing alone.
+
     Returns dict with savings_pct, savings_abs, max_cost, max_model.
     """
     max_model = get_most_expensive_model()
-    max_cost = calculate_cost(max_model, input_tokens, output_tokens)
+    max_cost = calculate_cost(max_model, input_tokens, output_tokens, batch=batch,
+                              cache_read_tokens=cache_read_tokens, cache_write_tokens=cache_write_tokens)
 
     if max_cost == 0:
         return {
@@ -1,504 +1,522 @@
-"""Industrial photonics product catalog — laser and terahertz systems."""
-
-PHOTONICS_CATALOG = [
-    # =========================================================================
-    # LASER TECHNOLOGY
-    # =========================================================================
-    # --- Single Frequency Lasers ---
-    {
-        "id": "cobolt-04-01",
-        "name": "Cobolt 04-01 Series",
-        "category": "Single Frequency CW DPSS Lasers",
-        "type": "laser",
-        "wavelengths": [457, 473, 491, 514, 532, 561, 594, 660, 1064],
-        "power_range_mw": [25, 450],
-        "noise_rms_percent": 0.3,
-        "linewidth": "Ultra-narrow (SLM)",
-        "named_models": [
-            "Cobolt Twist (457 nm)", "Cobolt Blues (473 nm)", "Cobolt Calypso (491 nm)",
-            "Cobolt Fandango (514 nm)", "Cobolt Samba (532 nm)", "Cobolt Jive (561 nm)",
-            "Cobolt Mambo (594 nm)", "Cobolt Flamenco (660 nm)", "Cobolt Rumba (1064 nm)",
-        ],
-        "applications": [
-            "Fluorescence Microscopy", "Raman Spectroscopy", "Holography",
-            "Interferometry", "Flow Cytometry",
-        ],
-        "key_features": [
-            "Single longitudinal mode (SLM)", "HTCure hermetically sealed",
-            "Long coherence length", "Ultra-robust package",
-        ],
-        "keywords": ["dpss", "cw", "continuous wave", "single frequency", "cobolt"],
-    },
-    {
-        "id": "cobolt-05-01",
-        "name": "Cobolt 05-01 Series",
-        "category": "High-Power Single Frequency CW DPSS Lasers",
-        "type": "laser",
-        "wavelengths": [320, 349, 355, 457, 473, 491, 515, 532, 561, 640, 660, 1064],
-        "power_range_mw": [20, 3000],
-        "noise_rms_percent": 0.1,
-        "linewidth": "< 1 MHz",
-        "beam_quality_m2": 1.1,
-        "named_models": [
-            "Cobolt Kizomba (349 nm)", "Cobolt Zydeco (355 nm)",
-            "Cobolt Samba (532 nm, up to 1.5 W)", "Cobolt Jive (561 nm, up to 1 W)",
-            "Cobolt Bolero (640 nm)", "Cobolt Rumba (1064 nm, up to 3 W)",
-        ],
-        "applications": [
-            "Raman Spectroscopy", "Interferometry", "Holography",
-            "Super-Resolution Microscopy", "Optical Tweezers", "Flow Cytometry",
-            "DNA Sequencing", "Fluorescence Microscopy",
-        ],
-        "key_features": [
-            "Up to 3 W output power", "Spectral purity > 60 dB",
-            "Perfect TEM00 beam", "HTCure sealed design", "UV to NIR coverage",
-        ],
-        "keywords": ["dpss", "high power", "single frequency", "cw", "uv", "cobolt"],
-    },
-    # --- Diode Lasers ---
-    {
-        "id": "cobolt-06-01",
-        "name": "Cobolt 06-01 Series",
-        "category": "Modulated CW Diode Lasers",
-        "type": "laser",
-        "wavelengths": [
-            375, 395, 405, 415, 425, 445, 457, 473, 488, 505, 515, 520,
-            532, 553, 561, 633, 638, 647, 660, 685, 690, 705, 730, 760,
-            785, 808, 830, 940, 975,
-        ],
-        "power_range_mw": [25, 400],
-        "noise_rms_percent": 0.2,
-        "modulation_mhz": 150,
-        "rise_time_ns": 300,
-        "applications": [
-            "Confocal Microscopy", "Flow Cytometry", "DNA Sequencing",
-            "Spinning Disc Microscopy", "TIRF Microscopy", "Optogenetics",
-        ],
-        "key_features": [
-            "25+ wavelengths available", "Digital modulation DC to 150 MHz",
-            "True OFF capability", "Plug-and-play with USB/RS-232",
-            "Integrated clean-up filters",
-        ],
-        "keywords": ["diode", "modulated", "fast switching", "mld", "dpl", "06-01", "multi-color"],
-    },
-    # --- Narrow Linewidth Lasers ---
-    {
-        "id": "cobolt-08-01",
-        "name": "Cobolt 08-01 Series",
-        "category": "Narrow Linewidth CW Lasers",
-        "type": "laser",
-        "wavelengths": [405, 457, 473, 488, 515, 532, 561, 633, 660, 785, 1064],
-        "power_range_mw": [40, 500],
-        "noise_rms_percent": 0.1,
-        "linewidth": "< 100 kHz",
-        "spectral_purity_db": 70,
-        "named_models": [
-            "Cobolt Disco (785 nm, < 100 kHz)", "08-DPL (488/532 nm, > 80 dB purity)",
-            "08-NLD (633 nm, integrated isolator)",
-        ],
-        "applications": [
-            "Raman Spectroscopy", "Interferometry", "Metrology",
-            "Semiconductor Inspection",
-        ],
-        "key_features": [
-            "Linewidth < 100 kHz", "Spectral purity > 70 dB",
-            "No ASE background", "Integrated isolator (NLD models)",
-            "Immune to optical feedback",
-        ],
-        "keywords": ["narrow linewidth", "08-dpl", "08-nld", "disco", "raman", "high purity"],
-    },
-    # --- Nanosecond / Pulsed Lasers ---
-    {
-        "id": "cobolt-tor",
-        "name": "Cobolt Tor Series",
-        "category": "Q-Switched Nanosecond Pulsed Lasers",
-        "type": "laser",
-        "wavelengths": [355, 532, 1064],
-        "power_range_mw": [100, 1000],
-        "pulse_energy_uj": [50, 500],
-        "pulse_length_ns": [1, 5],
-        "repetition_rate_khz": 7,
-        "applications": [
-            "Photoacoustic Microscopy", "Marking", "LIDAR",
-            "LIBS (Laser-Induced Breakdown Spectroscopy)",
-        ],
-        "key_features": [
-            "Passively Q-switched", "1-5 ns pulse length",
-            "Up to 500 uJ/pulse", "Compact ring-cavity design",
-            "Low jitter, high stability",
-        ],
-        "keywords": ["pulsed", "nanosecond", "q-switched", "ns", "lidar", "libs", "marking"],
-    },
-    # --- Tunable Lasers ---
-    {
-        "id": "c-wave",
-        "name": "C-WAVE Series",
-        "category": "Widely Tunable CW OPO Lasers",
-        "type": "laser",
-        "wavelengths_range": [450, 3400],
-        "tunable": True,
-        "linewidth": "< 1 MHz (< 500 kHz GTR)",
-        "power_range_mw": [80, 4000],
-        "noise_rms_percent": 1.0,
-        "variants": [
-            "C-WAVE VIS LP/HP (450-650 nm + 900-1300 nm)",
-            "C-WAVE IR LP/HP (infrared)",
-            "C-WAVE NIR (near-infrared, 780 nm pump)",
-            "C-WAVE GTR (500-750 nm + 1000-3400 nm, simultaneous outputs)",
-            "C-WAVE BTS (700-1000 nm, up to 4 W, Ti:Sapphire pump)",
-        ],
-        "applications": [
-            "Quantum Optics", "Atomic Physics", "Spectroscopy",
-            "Nanophotonics", "Holography", "Interferometry", "Metrology",
-        ],
-        "key_features": [
-            "450 nm to 3.4 um continuous tuning", "Mode-hop-free operation",
-            "Narrow linewidth < 1 MHz", "Multiple pump laser options",
-            "AbsoluteLambda wavelength stabilization",
-        ],
-        "keywords": ["tunable", "opo", "quantum", "atom", "c-wave"],
-    },
-    {
-        "id": "cobolt-qu-t",
-        "name": "Cobolt Qu-T Series",
-        "category": "Tunable & Lockable CW Lasers",
-        "type": "laser",
-        "wavelengths_range": [530, 850],
-        "tunable": True,
-        "power_range_mw": [100, 500],
-        "applications": [
-            "Quantum Optics", "Atomic Physics", "Spectroscopy",
-        ],
-        "key_features": [
-            "Tunable AND lockable", "530-850 nm range",
-            "Perfect TEM00 beam", "Mode-hop-free tuning",
-        ],
-        "keywords": ["tunable", "lockable", "quantum", "atom trapping", "qu-t"],
-    },
-    {
-        "id": "cobolt-odin",
-        "name": "Cobolt Odin Series",
-        "category": "Mid-IR Tunable Pulsed Lasers",
-        "type": "laser",
-        "wavelengths_range": [3000, 4600],
-        "tunable": True,
-        "power_range_mw": [1, 80],
-        "repetition_rate_khz": 7,
-        "applications": [
-            "Gas Analysis", "Mid-IR Spectroscopy", "Environmental Monitoring",
-        ],
-        "key_features": [
-            "3-4.6 um mid-infrared", "Wavelength-selectable",
-            "Compact design", "High repetition rate",
-        ],
-        "keywords": ["mid-ir", "infrared", "gas analysis", "odin"],
-    },
-    # --- Laser Combiners ---
-    {
-        "id": "c-flex",
-        "name": "C-FLEX Laser Combiner",
-        "category": "Multi-Wavelength Laser Combiners",
-        "type": "laser",
-        "wavelengths": "Custom (up to 8 lines from 375-1064 nm)",
-        "platforms": ["C4 (up to 4 lasers)", "C6 (up to 6 lasers)", "C8 (up to 8 lasers)"],
-        "power_range_mw": [25, 1000],
-        "applications": [
-            "Confocal Microscopy", "Super-Resolution Imaging",
-            "Flow Cytometry", "Optogenetics",
-        ],
-        "key_features": [
-            "Up to 8 laser lines combined", "Single collinear output",
-            "Mix diode + DPSS technology", "32 wavelengths available",
-            "Fully customizable",
-        ],
-        "keywords": ["combiner", "multi-line", "multi-color", "c-flex", "multiline"],
-    },
-    # --- Femtosecond Lasers ---
-    {
-        "id": "valo",
-        "name": "VALO Femtosecond Series",
-        "category": "Ultrafast Fiber Lasers",
-        "type": "laser",
-        "wavelengths_range": [1000, 1100],
-        "power_range_mw": [500, 3000],
-        "pulse_duration_fs": 40,
-        "peak_power_mw": 2000000,
-        "applications": [
-            "Multiphoton Microscopy", "Nonlinear Imaging",
-            "Two-Photon Excitation", "SHG Imaging",
-        ],
-        "key_features": [
-            "< 40 fs pulse duration", "Peak power > 2 MW",
-            "Turn-key operation", "Compact fiber laser design",
-        ],
-        "keywords": ["femtosecond", "ultrafast", "fs", "multiphoton", "two-photon", "valo"],
-    },
-    # --- Fiber Lasers / Amplifiers ---
-    {
-        "id": "ampheia",
-        "name": "Ampheia Fiber Laser Systems",
-        "category": "High-Power CW Fiber Amplifiers",
-        "type": "laser",
-        "wavelengths": [488, 515, 532, 976, 1015, 1030, 1064],
-        "power_range_mw": [5000, 50000],
-        "noise_rms_percent": 0.05,
-        "linewidth": "< 100 kHz",
-        "applications": [
-            "Quantum Optics", "Atomic Physics", "Atom Cooling & Trapping",
-            "Laser Doppler Velocimetry", "Holography", "Metrology",
-            "Semiconductor Inspection",
-        ],
-        "key_features": [
-            "Up to 50 W output power", "Ultra-low RIN",
-            "Single-frequency single-mode", "Integrated seed laser",
-            "Outstanding pointing stability",
-        ],
-        "keywords": ["fiber", "amplifier", "high power", "ampheia", "watt"],
-    },
-    # =========================================================================
-    # TERAHERTZ TECHNOLOGY
-    # =========================================================================
-    {
-        "id": "t-spectralyzer",
-        "name": "T-SPECTRALYZER",
-        "category": "THz Time-Domain Spectrometers",
-        "type": "terahertz",
-        "frequency_range_thz": [0.1, 4.0],
-        "dynamic_range_db": 70,
-        "spectral_resolution_ghz": 5,
-        "measurement_time_s": [2, 8],
-        "geometries": ["Transmission (T)", "Reflection (R)", "Fiber-coupled (F)"],
-        "applications": [
-            "THz Spectroscopy", "Non-Destructive Testing",
-            "Chemical Identification", "Material Characterization",
-            "Quality Control", "Layer Thickness Measurement",
-        ],
-        "key_features": [
-            "0.1-4 THz range", "Dynamic range > 70 dB",
-            "Plug & play fiber-based", "T/R/F measurement geometries",
-            "Fully automated", "Contact-free, non-destructive",
-        ],
-        "keywords": ["terahertz", "thz", "spectrometer", "spectroscopy", "ndt"],
-    },
-    {
-        "id": "t-spectralyzer-f",
-        "name": "T-SPECTRALYZER F",
-        "category": "Compact Fiber-Based THz Spectrometers",
-        "type": "terahertz",
-        "frequency_range_thz": [0.1, 2.5],
-        "dynamic_range_db": 54,
-        "spectral_resolution_ghz": 10,
-        "form_factor": "19-inch rack module",
-        "applications": [
-            "THz Spectroscopy", "Non-Destructive Testing",
-            "In-Line Process Monitoring", "Quality Control",
-        ],
-        "key_features": [
-            "Compact 19-inch rack format", "0.1-2.5 THz range",
-            "Fast scan (0.05-5 s)", "Fiber-coupled modules",
-            "Industrial integration ready",
-        ],
-        "keywords": ["terahertz", "thz", "compact", "inline", "process monitoring", "rack"],
-    },
-    {
-        "id": "t-cognition",
-        "name": "T-COGNITION",
-        "category": "Security THz Spectrometers",
-        "type": "terahertz",
-        "frequency_range_thz": [0.1, 4.0],
-        "applications": [
-            "Security Screening", "Drug Detection", "Explosives Detection",
-            "Mail & Package Inspection", "Customs Inspection",
-        ],
-        "key_features": [
-            "Spectroscopic fingerprint identification", "Internal substance database",
-            "Non-invasive (no opening required)", "Instant identification",
-            "DIN C4 envelope capacity",
-        ],
-        "keywords": ["security", "screening", "detection"],
-    },
-    {
-        "id": "t-sense",
-        "name": "T-SENSE",
-        "category": "THz Mail & Package Imagers",
-        "type": "terahertz",
-        "throughput": "Up to 3,000 envelopes/hour",
-        "applications": [
-            "Mail Screening", "Security Scanning", "Package Inspection",
-        ],
-        "key_features": [
-            "Radiation-free (no X-rays)", "Up to 3,000 envelopes/hour",
-            "Dual-filter display", "Mobile and flexible",
-            "Scalable from office to postal center",
-        ],
-        "keywords": ["security", "mail", "screening", "xray-free"],
-    },
-    {
-        "id": "t-sense-fmi",
-        "name": "T-SENSE FMI",
-        "category": "THz Industrial Imaging Systems",
-        "type": "terahertz",
-        "applications": [
-            "Industrial Quality Control", "Foreign Body Detection",
-            "Flaw & Defect Detection", "Zero-Defect Production",
-            "Non-Destructive Testing",
-        ],
-        "key_features": [
-            "Non-destructive imaging", "Amplitude AND phase analysis",
-            "No ionizing radiation", "Touchscreen control",
-            "Adaptable for zero-defect production",
-        ],
-        "keywords": ["quality control", "ndt", "imaging", "defect", "production"],
-    },
-]
+"""Industrial photonics product catalog — laser and terahertz systems.
+
+Product records live in an external catalog file (data/catalog.jsonl by
+default, or the CATALOG_PATH environment variable; see
+utils.catalog_store) and are loaded lazily. The catalog can be reloaded
+while the app runs (see utils.catalog_manager); searches always run against
+one consistent catalog version and report it as catalog_version.
+"""
+
+import heapq
+
+from utils.catalog_manager import CatalogManager, CurrentCatalogView
+from utils.search_cache import SearchCache
+from utils.spec_parser import (
+    SpecFeatures,
+    as_spec_features,
+    normalize_spec_text,
+    parse_spec,
+    spec_fingerprint,
+)
+from utils.phrase_matcher import build_phrase_matcher, match_phrases
+from utils.spectral_index import (
+    build_spectral_index,
+    update_spectral_index,
+    spectral_points,
+    exact_wavelength_ids,
+    product_numeric_points,
+    range_points_bound,
+)
 
 
 def get_all_products():
-    """Return all products in the catalog."""
+    """Return all products in the catalog (a lazily loaded sequence)."""
     return PHOTONICS_CATALOG
 
 
 def get_product_by_id(product_id):
     """Return a single product by its ID."""
-    for product in PHOTONICS_CATALOG:
-        if product["id"] == product_id:
-            return product
-    return None
+    return PHOTONICS_CATALOG.get(product_id)
 
 
 def get_products_by_type(product_type):
     """Return products filtered by type ('laser' or 'terahertz')."""
-    return [p for p in PHOTONICS_CATALOG if p.get("type") == product_type]
+    return [PHOTONICS_CATALOG.get(i) for i in PHOTONICS_CATALOG.ids_by_type(product_type)]
+
+
+def get_products_by_category(category):
+    """Return products in the given catalog category."""
+    return [PHOTONICS_CATALOG.get(i) for i in PHOTONICS_CATALOG.ids_by_category(category)]
+
+
+# --- Scoring weights ---
+APPLICATION_POINTS = 20        # full application phrase in spec
+APPLICATION_WORDS_POINTS = 12  # >= 2 application words in spec
+APPLICATION_WORD_POINTS = 6    # 1 word of a short (<= 2 word) application
+CATEGORY_POINTS = 15           # full category phrase in spec
+CATEGORY_WORDS_POINTS = 8      # >= 2 category words in spec
+
+# Phrase rules that add their weight on every hit.
+PHRASE_RULE_POINTS = {
+    "feature_word": 4,
+    "keyword": 10,
+    "named_model": 30,
+    "name": 35,
+}
+
+# Capability rules keyed by the SpecFeatures flag that triggers them:
+# (points, predicate selecting the products the rule rewards).
+FLAG_RULES = {
+    "terahertz": (30, lambda p: bool(p.get("frequency_range_thz"))),
+    "tunable": (25, lambda p: bool(p.get("tunable"))),
+    "pulsed": (20, lambda p: bool(p.get("pulse_length_ns") or p.get("pulse_duration_fs"))),
+    "femtosecond": (25, lambda p: bool(p.get("pulse_duration_fs"))),
+    "modulation": (20, lambda p: bool(p.get("modulation_mhz"))),
+    "security": (15, lambda p: p.get("type") == "terahertz"),
+}
+
+
+def _product_phrases(product):
+    """Yield (phrase, rule, slot) for every phrase that can score a product.
+
+    Grouped rules ("application", "category") emit the full phrase and its
+    words (> 3 chars) under the same slot so they can be resolved together.
+    """
+    for slot, app in enumerate(product.get("applications", [])):
+        yield app.lower(), "application", slot
+        for word in app.lower().split():
+            if len(word) > 3:
+                yield word, "application_word", slot
+
+    for feature in product.get("key_features", []):
+        for word in feature.lower().split():
+            if len(word) > 3:
+                yield word, "feature_word", 0
+
+    category = product["category"].lower()
+    yield category, "category", 0
+    for word in category.split():
+        if len(word) > 3:
+            yield word, "category_word", 0
+
+    for kw in product.get("keywords", []):
+        yield kw.lower(), "keyword", 0
+
+    for model_name in product.get("named_models", []):
+        yield model_name.split("(")[0].strip().lower(), "named_model", 0
+
+    yield product["name"].lower(), "name", 0
+
+
+def _index_product(product, phrase_ids, postings, word_counts, posting_list, flag_set):
+    """Add one product's phrases, word counts and flags to the index parts.
+
+    posting_list(phrase_id) and flag_set(flag) return the containers to
+    append to, which lets update_search_index copy them on first write.
+
+    Returns:
+        Set of IDs of the phrases posting to the product.
+    """
+    product_id = product["id"]
+    for flag, (_, applies) in FLAG_RULES.items():
+        if applies(product):
+            flag_set(flag).add(product_id)
+
+    posted = set()
+    for phrase, rule, slot in _product_phrases(product):
+        if not phrase:
+            continue
+        if phrase not in phrase_ids:
+            phrase_ids[phrase] = len(postings)
+            postings.append([])
+        phrase_id = phrase_ids[phrase]
+        posting_list(phrase_id).append((product_id, rule, slot))
+        posted.add(phrase_id)
+        if rule == "application_word":
+            word_counts[(product_id, slot)] = word_counts.get((product_id, slot), 0) + 1
+    return posted
+
+
+def build_search_index(catalog):
+    """Build the search index used by search_products.
+
+    All catalog phrases are compiled into one Aho-Corasick automaton
+    (utils.phrase_matcher) with postings mapping each phrase to the
+    (product ID, rule, slot) entries it scores, so a spec is scanned once
+    and only products with a hit are touched. Capability flags map to the
+    products they reward, and wavelength and power rules are served by the
+    numeric index in utils.spectral_index.
+
+    Args:
+        catalog: Catalog store (see utils.catalog_store). Records are
+            streamed once; the index keeps IDs, not records.
+
+    Returns:
+        Dict with matcher, postings (phrase ID -> list of (ID, rule, slot)),
+        word_counts ((ID, slot) -> number of words of that application),
+        flags (SpecFeatures flag -> set of IDs), spectral (see
+        build_spectral_index), lookup (ID -> product, loads lazily),
+        order (ID -> position), and phrase_ids / product_phrases (phrase
+        -> phrase ID, ID -> posted phrase IDs) for update_search_index.
+    """
+    phrase_ids = {}
+    postings = []
+    word_counts = {}
+    flags = {flag: set() for flag in FLAG_RULES}
+    order = {}
+    product_phrases = {}
+
+    for product in catalog:
+        order[product["id"]] = len(order)
+        product_phrases[product["id"]] = _index_product(
+            product, phrase_ids, postings, word_counts, postings.__getitem__, flags.__getitem__
+        )
+
+    return {
+        "matcher": build_phrase_matcher(list(phrase_ids)),
+        "postings": postings,
+        "word_counts": word_counts,
+        "flags": flags,
+        "spectral": build_spectral_index(catalog),
+        "lookup": catalog.get,
+        "order": order,
+        "phrase_ids": phrase_ids,
+        "product_phrases": product_phrases,
+    }
+
+
+def update_search_index(index, catalog, changed_ids, removed_ids=()):
+    """Return a new search index with only some products re-indexed.
+
+    Used for hot catalog reloads: the records of changed (or added) products
+    are read from the new catalog, everything else is carried over from
+    index. Postings and flag sets are copied before they are modified, so
+    searches still running against the old index are unaffected. The phrase
+    automaton is recompiled only if new phrases appear.
+
+    Args:
+        index: Dict from build_search_index (or an earlier update).
+        catalog: New catalog store.
+        changed_ids: IDs of products that were added or modified.
+        removed_ids: IDs of products no longer in the catalog.
+    """
+    touched = set(changed_ids) | set(removed_ids)
+    phrase_ids = dict(index["phrase_ids"])
+    postings = list(index["postings"])
+    word_counts = dict(index["word_counts"])
+    flags = dict(index["flags"])
+    product_phrases = dict(index["product_phrases"])
+    copied_postings, copied_flags = set(), set()
+
+    def posting_list(phrase_id):
+        if phrase_id not in copied_postings:
+            postings[phrase_id] = list(postings[phrase_id])
+            copied_postings.add(phrase_id)
+        return postings[phrase_id]
+
+    def flag_set(flag):
+        if flag not in copied_flags:
+            flags[flag] = set(flags[flag])
+            copied_flags.add(flag)
+        return flags[flag]
+
+    for product_id in touched:
+        for phrase_id in product_phrases.pop(product_id, ()):
+            entries = posting_list(phrase_id)
+            for entry in entries:
+                if entry[0] == product_id and entry[1] == "application_word":
+                    word_counts.pop((product_id, entry[2]), None)
+            entries[:] = [entry for entry in entries if entry[0] != product_id]
+        for flag, ids in index["flags"].items():
+            if product_id in ids:
+                flag_set(flag).discard(product_id)
+
+    n_phrases = len(postings)
+    changed_products = [catalog.get(product_id) for product_id in changed_ids]
+    for product in changed_products:
+        product_phrases[product["id"]] = _index_product(
+            product, phrase_ids, postings, word_counts, posting_list, flag_set
+        )
+
+    if len(postings) > n_phrases:
+        matcher = build_phrase_matcher(list(phrase_ids))
+    else:
+        matcher = index["matcher"]
+
+    return {
+        "matcher": matcher,
+        "postings": postings,
+        "word_counts": word_counts,
+        "flags": flags,
+        "spectral": update_spectral_index(index["spectral"], changed_products, removed_ids),
+        "lookup": catalog.get,
+        "order": {product_id: i for i, product_id in enumerate(catalog.ids())},
+        "phrase_ids": phrase_ids,
+        "product_phrases": product_phrases,
+    }
+
+
+# Current catalog snapshot (store + search index), reloaded when the catalog
+# file changes once CATALOG_MANAGER.start_watching() or refresh() is called.
+CATALOG_MANAGER = CatalogManager(build_search_index, update_search_index)
+
+# List-like, lazily loaded view of the current catalog (iterates in catalog order).
+PHOTONICS_CATALOG = CurrentCatalogView(CATALOG_MANAGER)
+
+
+def get_search_index():
+    """Return the search index of the current catalog snapshot."""
+    return CATALOG_MANAGER.current().index
+
+
+def _phrase_points(features, index):
+    """Accumulate phrase-rule points from one automaton scan of the spec.
 
+    Returns:
+        Dict mapping product ID to points (only products with a hit).
+    """
+    points = {}
+    app_phrases = set()
+    app_words = {}
+    cat_phrases = set()
+    cat_words = {}
+
+    for phrase_id in match_phrases(index["matcher"], features.text):
+        for product_id, rule, slot in index["postings"][phrase_id]:
+            points.setdefault(product_id, 0)
+            if rule in PHRASE_RULE_POINTS:
+                points[product_id] += PHRASE_RULE_POINTS[rule]
+            elif rule == "application":
+                app_phrases.add((product_id, slot))
+            elif rule == "application_word":
+                app_words[(product_id, slot)] = app_words.get((product_id, slot), 0) + 1
+            elif rule == "category":
+                cat_phrases.add(product_id)
+            elif rule == "category_word":
+                cat_words[product_id] = cat_words.get(product_id, 0) + 1
+
+    for key in app_phrases:
+        points[key[0]] += APPLICATION_POINTS
+    for key, hits in app_words.items():
+        if key in app_phrases:
+            continue
+        if hits >= 2:
+            points[key[0]] += APPLICATION_WORDS_POINTS
+        elif hits == 1 and index["word_counts"][key] <= 2:
+            points[key[0]] += APPLICATION_WORD_POINTS
+
+    for product_id in cat_phrases:
+        points[product_id] += CATEGORY_POINTS
+    for product_id, hits in cat_words.items():
+        if product_id not in cat_phrases and hits >= 2:
+            points[product_id] += CATEGORY_WORDS_POINTS
+
+    return points
+
+
+def _flag_points(features, index):
+    """Return capability-rule points per product for the spec's raised flags."""
+    points = {}
+    for flag in features.flags:
+        if flag not in FLAG_RULES:
+            continue
+        weight = FLAG_RULES[flag][0]
+        for product_id in index["flags"][flag]:
+            points[product_id] = points.get(product_id, 0) + weight
+    return points
+
+
+def _normalize(score):
+    """Map a raw score to the 0-99 match percentage shown to users."""
+    max_possible = 120
+    return min(round((score / max_possible) * 100), 99)
+
+
+def _all_scores(features, index):
+    """Return raw scores for every product with at least one hit."""
+    scores = _phrase_points(features, index)
+    for partial in (_flag_points(features, index), spectral_points(index["spectral"], features)):
+        for product_id, points in partial.items():
+            scores[product_id] = scores.get(product_id, 0) + points
+    return scores
+
+
+def _top_k_pruned(features, index, k):
+    """Try to find the top k using only selectively matched products.
+
+    Products hit by a catalog phrase or an exact wavelength are scored fully
+    from their records. Every other product can only earn points from
+    capability flags and wavelength/power ranges, which are bounded per spec.
+    If that bound cannot beat the current k-th best, the (potentially large)
+    flag and range product sets are never enumerated.
+
+    Returns:
+        List of (raw score, product ID) for the top k, or None if the bound
+        does not allow pruning.
+    """
+    scores = _phrase_points(features, index)
+    for product_id in exact_wavelength_ids(index["spectral"], features):
+        scores.setdefault(product_id, 0)
+
+    raised = [flag for flag in features.flags if flag in FLAG_RULES]
+    for product_id in scores:
+        product = index["lookup"](product_id)
+        scores[product_id] += product_numeric_points(product, features)
+        for flag in raised:
+            if product_id in index["flags"][flag]:
+                scores[product_id] += FLAG_RULES[flag][0]
+
+    top = _select_top_k(scores, index, k)
+    unseen_bound = sum(FLAG_RULES[flag][0] for flag in raised) + range_points_bound(index["spectral"], features)
+    if unseen_bound == 0:
+        return top
+    # Ties are broken by catalog order, so an unseen product must not reach
+    # the k-th best percentage at all.
+    if len(top) == k and _normalize(unseen_bound) < _normalize(top[-1][0]):
+        return top
+    return None
+
+
+def _select_top_k(scores, index, k):
+    """Return the k best (raw score, ID) pairs, ranked like search_products."""
+    order = index["order"]
+    best = heapq.nlargest(
+        k,
+        ((score, product_id) for product_id, score in scores.items() if score > 0),
+        key=lambda item: (_normalize(item[0]), -order[item[1]]),
+    )
+    return best
+
+
+# "rules": hand-weighted phrase, capability and numeric rules (default).
+# "bm25": BM25 text relevance combined with the numeric rules (utils.text_ranking).
+RANKING_MODES = ("rules", "bm25")
+
+
+def _search_bm25(features, snapshot, k):
+    """Rank with BM25 + numeric rules; scores are the combined score in percent."""
+    from utils.text_ranking import build_text_index, rank_products
+
+    text_index = snapshot.derived("bm25", lambda: build_text_index(snapshot.store))
+    ranked = rank_products(text_index, snapshot.index["spectral"], features, k=k)
+    lookup = snapshot.index["lookup"]
+    return [
+        {"product": lookup(product_id), "score": min(round(score * 100), 99),
+         "catalog_version": snapshot.version}
+        for score, product_id in ranked
+    ]
 
-def search_products(spec_text):
+
+def search_products(spec, k=None, mode="rules"):
     """Search products by matching keywords from spec against catalog fields.
 
-    Returns list of dicts with 'product' and 'score' keys, sorted by score desc.
+    The spec is scanned once for all catalog phrases and only products with
+    at least one phrase, capability or numeric hit are scored; see
+    build_search_index.
+
+    Args:
+        spec: Spec text or SpecFeatures from utils.spec_parser.parse_spec.
+        k: If given, return only the k best matches, selected with a bounded
+            heap and score upper-bound pruning. None returns every product
+            with a non-zero score (e.g. for analytics).
+        mode: One of RANKING_MODES. "bm25" ranks by BM25 text relevance
+            combined with the numeric rules, which separates products the
+            rules score alike; its term matrix is built once per catalog
+            snapshot.
+
+    Returns list of dicts with 'product', 'score' and 'catalog_version' keys,
+    sorted by score desc.
     """
-    import re
+    if mode not in RANKING_MODES:
+        raise ValueError(f"Unknown ranking mode: {mode!r} (expected one of {RANKING_MODES})")
+    return _search_snapshot(as_spec_features(spec), CATALOG_MANAGER.current(), k, mode)
 
-    spec_lower = spec_text.lower()
-    results = []
 
-    for product in PHOTONICS_CATALOG:
-        score = 0
-
-        # --- Application matching (high value) ---
-        for app in product.get("applications", []):
-            if app.lower() in spec_lower:
-                score += 20
-            else:
-                app_words = [w for w in app.lower().split() if len(w) > 3]
-                matching_words = sum(1 for w in app_words if w in spec_lower)
-                if matching_words >= 2:
-                    score += 12
-                elif matching_words == 1 and len(app_words) <= 2:
-                    score += 6
-
-        # --- Feature keyword matching ---
-        for feature in product.get("key_features", []):
-            for word in feature.lower().split():
-                if len(word) > 3 and word in spec_lower:
-                    score += 4
-
-        # --- Category matching ---
-        if product["category"].lower() in spec_lower:
-            score += 15
-        else:
-            cat_words = [w for w in product["category"].lower().split() if len(w) > 3]
-            if sum(1 for w in cat_words if w in spec_lower) >= 2:
-                score += 8
-
-        # --- Product-specific keyword matching ---
-        for kw in product.get("keywords", []):
-            if kw.lower() in spec_lower:
-                score += 10
-
-        # --- Named model matching ---
-        for model_name in product.get("named_models", []):
-            name_part = model_name.split("(")[0].strip().lower()
-            if name_part in spec_lower:
-                score += 30
-
-        # --- Wavelength matching (numeric, nm) ---
-        wavelengths = product.get("wavelengths", [])
-        if isinstance(wavelengths, list):
-            for wl in wavelengths:
-                if str(wl) in spec_lower:
-                    score += 25
-
-        # --- Wavelength range matching ---
-        wl_range = product.get("wavelengths_range", [])
-        if wl_range:
-            numbers = re.findall(r"\d+", spec_lower)
-            for num_str in numbers:
-                num = int(num_str)
-                if wl_range[0] <= num <= wl_range[1]:
-                    score += 20
-
-        # --- THz frequency matching ---
-        freq_range = product.get("frequency_range_thz", [])
-        if freq_range:
-            thz_keywords = ["terahertz", "thz"]
-            if any(kw in spec_lower for kw in thz_keywords):
-                score += 30
-
-        # --- Power matching (mW and W) ---
-        power_range = product.get("power_range_mw", [])
-        if power_range:
-            power_matches = re.findall(r"(\d+)\s*(?:mw|milliwatt)", spec_lower)
-            for pm in power_matches:
-                power_val = int(pm)
-                if power_range[0] <= power_val <= power_range[1]:
-                    score += 20
-                elif power_val < power_range[0] * 2:
-                    score += 5
-
-            watt_matches = re.findall(r"(\d+(?:\.\d+)?)\s*(?:w|watt)\b", spec_lower)
-            for wm in watt_matches:
-                power_mw = float(wm) * 1000
-                if power_range[0] <= power_mw <= power_range[1]:
-                    score += 20
-
-        # --- Tunable keyword matching ---
-        if product.get("tunable") and any(
-            kw in spec_lower for kw in ["tunable", "tuning"]
-        ):
-            score += 25
-
-        # --- Pulsed / femtosecond matching ---
-        if product.get("pulse_length_ns") or product.get("pulse_duration_fs"):
-            pulsed_kw = ["pulsed", "nanosecond", "ns-", "q-switch"]
-            if any(kw in spec_lower for kw in pulsed_kw):
-                score += 20
-
-        if product.get("pulse_duration_fs"):
-            fs_kw = ["femtosecond", "ultrafast", "multiphoton"]
-            if any(kw in spec_lower for kw in fs_kw):
-                score += 25
-
-        # --- Modulation matching ---
-        if product.get("modulation_mhz"):
-            mod_kw = ["modulation", "modulated", "fast switching"]
-            if any(kw in spec_lower for kw in mod_kw):
-                score += 20
-
-        # --- Security / screening matching ---
-        security_kw = ["security", "screening", "mail"]
-        if any(kw in spec_lower for kw in security_kw):
-            if product.get("type") == "terahertz":
-                score += 15
-
-        # --- Product name direct matching ---
-        product_name_lower = product["name"].lower()
-        if product_name_lower in spec_lower:
-            score += 35
+def _search_snapshot(features, snapshot, k, mode):
+    """Run search_products against one catalog snapshot."""
+    index = snapshot.index
+    version = snapshot.version
 
+    if mode == "bm25":
+        return _search_bm25(features, snapshot, k)
+
+    if k is not None:
+        top = _top_k_pruned(features, index, k)
+        if top is None:
+            top = _select_top_k(_all_scores(features, index), index, k)
+        return [
+            {"product": index["lookup"](product_id), "score": _normalize(score),
+             "catalog_version": version}
+            for score, product_id in top
+        ]
+
+    scores = _all_scores(features, index)
+    results = []
+    for product_id in sorted(scores, key=index["order"].get):
+        score = scores[product_id]
         if score > 0:
-            max_possible = 120
-            normalized_score = min(round((score / max_possible) * 100), 99)
-            results.append({"product": product, "score": normalized_score})
+            results.append({"product": index["lookup"](product_id), "score": _normalize(score),
+                            "catalog_version": version})
 
     results.sort(key=lambda x: x["score"], reverse=True)
     return results
+
+
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL_S = 600
+
+_SEARCH_CACHE = SearchCache(max_size=SEARCH_CACHE_SIZE, ttl_seconds=SEARCH_CACHE_TTL_S)
+
+
+def search_products_cached(spec, k=None, mode="rules"):
+    """search_products with memoization for repeated and near-identical specs.
+
+    Results are keyed on the normalized spec fingerprint (case, whitespace
+    and unit spelling folded; see utils.spec_parser.normalize_spec_text),
+    k, mode and the catalog version, and the search itself runs on the
+    normalized text so every spec with the same key gets the same result.
+    A catalog reload empties the cache. Callers get their own copies of
+    the result dicts, so changing one does not alter the cached results.
+
+    Args and return value as for search_products.
+    """
+    if mode not in RANKING_MODES:
+        raise ValueError(f"Unknown ranking mode: {mode!r} (expected one of {RANKING_MODES})")
+    raw = spec.raw if isinstance(spec, SpecFeatures) else spec
+    snapshot = CATALOG_MANAGER.current()
+    _SEARCH_CACHE.set_version(snapshot.version)
+
+    key = (spec_fingerprint(raw), k, mode, snapshot.version)
+    results = _SEARCH_CACHE.get(key)
+    if results is None:
+        results = _search_snapshot(parse_spec(normalize_spec_text(raw)), snapshot, k, mode)
+        _SEARCH_CACHE.put(key, results)
+    return [dict(result) for result in results]
+
+
+def search_cache_stats():
+    """Return hit/miss counters, size and hit rate of the search cache."""
+    return _SEARCH_CACHE.stats()
+
+
+def search_products_batch(specs, chunk_size=10_000):
+    """Score many specs at once with the vectorized NumPy engine.
+
+    Results match calling search_products on each spec. Each catalog
+    snapshot is compiled into columnar arrays on first use (see
+    utils.batch_scoring).
+
+    Args:
+        specs: Iterable of spec texts or SpecFeatures.
+        chunk_size: Specs per vectorized block (bounds memory).
+
+    Returns:
+        List with one search_products-style result list per spec.
+    """
+    from utils.batch_scoring import compile_search_index, search_batch
+
+    snapshot = CATALOG_MANAGER.current()
+    compiled = snapshot.derived(
+        "batch", lambda: compile_search_index(snapshot.index, catalog_version=snapshot.version)
+    )
+    return search_batch(compiled, specs, chunk_size=chunk_size)
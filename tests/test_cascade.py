@@ -0,0 +1,92 @@
+"""Tests for cascade draft validation in agents/cascade.py and escalation in agents/pipeline.py."""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agents.cascade import cascade_record, validate_proposal
+from agents.pipeline import _cascade_stop, _next_cascade_model
+from products import get_product_by_id
+from utils.resilience import Deadline
+from utils.spec_parser import parse_spec
+
+FEATURES = parse_spec("We need a 532 nm laser with 100 mW output power for Raman spectroscopy.")
+MATCHED = [{"product": get_product_by_id("cobolt-05-01"), "score": 9.0}]
+CASCADE = ["gpt-5-nano", "gpt-5-mini", "claude-sonnet-4-20250514"]
+
+
+def draft(**overrides):
+    proposal = {
+        "proposal_text": "## Proposal\n\nThe Cobolt 05-01 Series meets the spec.",
+        "product_matches": [{"product_id": "cobolt-05-01", "match_score": 95, "reasoning": "532 nm, 100 mW"}],
+        "feasibility_matrix": {"Wavelength 532 nm": {"status": "met", "note": "Cobolt 05-01 at 532 nm"}},
+        "next_steps": ["Send a quote"],
+        "model": "gpt-5-nano",
+    }
+    proposal.update(overrides)
+    return proposal
+
+
+def attempt(model, valid, cost, tokens=(1000, 500)):
+    return {"model": model, "valid": valid, "errors": [], "checks": [], "cost": cost,
+            "input_tokens": tokens[0], "output_tokens": tokens[1], "latency_ms": 0}
+
+
+def test_valid_draft_passes():
+    assert validate_proposal(FEATURES, draft(), MATCHED) == {"valid": True, "errors": [], "checks": []}
+
+
+def test_failed_call_fails_generation():
+    result = validate_proposal(FEATURES, {"error": "timeout", "model": "gpt-5-nano"}, MATCHED)
+    assert result["checks"] == ["generation"]
+
+
+def test_schema_errors():
+    bad_score = draft(product_matches=[{"product_id": "cobolt-05-01", "match_score": 140}])
+    assert validate_proposal(FEATURES, bad_score, MATCHED)["checks"] == ["schema"]
+    bad_status = draft(feasibility_matrix={"Wavelength": {"status": "probably"}})
+    assert validate_proposal(FEATURES, bad_status, MATCHED)["checks"] == ["schema"]
+    assert validate_proposal(FEATURES, draft(repaired=True), MATCHED)["checks"] == ["schema"]
+
+
+def test_unknown_product_fails_catalog():
+    unknown = draft(product_matches=[{"product_id": "cobolt-99", "match_score": 90}])
+    result = validate_proposal(FEATURES, unknown, MATCHED)
+    assert "catalog" in result["checks"]
+    assert "'cobolt-99' is not in the catalog" in result["errors"][0]
+
+
+def test_met_claim_not_covered_fails_feasibility():
+    # C-FLEX covers 100 mW but not 532 nm, which the matched Cobolt 05-01 does.
+    wrong = draft(product_matches=[{"product_id": "c-flex", "match_score": 80}])
+    result = validate_proposal(FEATURES, wrong, MATCHED)
+    assert result["checks"] == ["feasibility"]
+    assert len(result["errors"]) == 2
+
+
+def test_cascade_record_splits_escalation_from_the_kept_draft():
+    attempts = [attempt("gpt-5-nano", False, 0.001), attempt("gpt-5-mini", True, 0.004)]
+    record = cascade_record(CASCADE[:2], attempts, {"model": "gpt-5-mini", "cost": 0.005}, "accepted")
+    assert record["escalations"] == 1 and record["accepted"]
+    assert record["escalation_tokens"] == 1500
+    assert record["escalation_cost"] == 0.001
+    assert record["cascade_cost"] == pytest.approx(0.005)
+    assert record["direct_cost"] == 0.004
+
+
+def test_escalation_skips_tiers_a_fallback_already_used():
+    assert _next_cascade_model(CASCADE, "gpt-5-nano", draft()) == "gpt-5-mini"
+    assert _next_cascade_model(CASCADE, "gpt-5-nano", draft(model="gpt-5-mini")) == CASCADE[2]
+    assert _next_cascade_model(CASCADE, "gpt-5-nano", {"error": "x", "model": "gpt-5-mini"}) == "gpt-5-mini"
+    assert _next_cascade_model(CASCADE, CASCADE[2], draft(model=CASCADE[2])) is None
+
+
+def test_cascade_stop_reasons():
+    valid, invalid = {"valid": True}, {"valid": False}
+    assert _cascade_stop(valid, "gpt-5-mini", Deadline(60)) == "accepted"
+    assert _cascade_stop(invalid, None, Deadline(60)) == "exhausted"
+    assert _cascade_stop(invalid, "gpt-5-mini", Deadline(0)) == "deadline"
+    assert _cascade_stop(invalid, "gpt-5-mini", Deadline(60)) is None
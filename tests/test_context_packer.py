@@ -0,0 +1,60 @@
+"""Tests for the token-budgeted context packing in utils/context_packer.py."""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.context_packer import GAP_MARKER, pack_context, pack_products, pack_spec
+from utils.token_estimator import count_tokens
+
+KEY_SENTENCE = "We need a 532 nm laser with 100 mW output power."
+FILLER = "Our laboratory was founded many years ago and has grown steadily since then."
+
+
+def test_short_spec_is_sent_unchanged():
+    assert pack_spec(KEY_SENTENCE, 500) == (KEY_SENTENCE, 0)
+
+
+def test_long_spec_keeps_the_value_sentence_and_marks_gaps():
+    spec = " ".join([FILLER] * 3 + [KEY_SENTENCE] + [f"Footer line {i} of the document." for i in range(20)])
+    packed, dropped = pack_spec(spec, 40)
+    assert KEY_SENTENCE in packed
+    assert GAP_MARKER in packed
+    assert dropped > 0
+    assert count_tokens(packed) <= 40
+
+
+def test_repeated_sentences_are_dropped():
+    spec = " ".join([KEY_SENTENCE] + ["Confidential page header."] * 30)
+    packed, _ = pack_spec(spec, 30)
+    assert packed.count("Confidential page header.") == 1
+
+
+def test_sentence_longer_than_the_budget_is_cut():
+    spec = "laser " * 5000
+    packed, dropped = pack_spec(spec, 200)
+    assert packed.endswith(GAP_MARKER)
+    assert 150 < count_tokens(packed) <= 200
+    assert dropped == 0
+
+
+def test_product_headers_are_always_kept():
+    headers = ["A (a-1) Lasers 90%", "B (b-1) Lasers 80%"]
+    attributes = [[("applications", "Raman spectroscopy", 2.0)], [("features", "Fiber coupled", 1.0)]]
+    lines, dropped = pack_products(headers, attributes, sum(count_tokens(h) for h in headers))
+    assert lines == headers and dropped == 2
+    lines, dropped = pack_products(headers, attributes, 500)
+    assert lines == [headers[0] + " | applications: Raman spectroscopy", headers[1] + " | features: Fiber coupled"]
+    assert dropped == 0
+
+
+def test_packed_context_fits_the_budget():
+    spec = " ".join([FILLER] * 40 + [KEY_SENTENCE])
+    headers = ["A (a-1) Lasers 90%"]
+    attributes = [[("applications", f"Application number {i}", 1.0) for i in range(30)]]
+    packed = pack_context(spec, headers, attributes, 150)
+    assert packed["tokens"] <= 150
+    assert KEY_SENTENCE in packed["spec"]
+    assert packed["product_lines"][0].startswith(headers[0])
+    assert packed["dropped_sentences"] > 0 and packed["dropped_attributes"] > 0
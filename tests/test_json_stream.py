@@ -0,0 +1,66 @@
+"""Tests for the incremental JSON parser in utils/json_stream.py."""
+
+import sys
+import os
+import json
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_stream import IncrementalJSONParser, parse_json_object
+
+PROPOSAL = {
+    "product_matches": [{"product_id": "c-flex", "match_score": 92, "reasoning": "8 lines, \"compact\""}],
+    "feasibility_matrix": {"Wavelength 488 nm": {"status": "met", "note": "06-01 at 488 nm"}},
+    "proposal_text": "## Proposal\n\nUnicode µm and escapes \\ / are kept.",
+    "next_steps": ["Quote", "Demo"],
+}
+
+
+def _feed(text, chunk_size):
+    parser = IncrementalJSONParser()
+    completed = []
+    for i in range(0, len(text), chunk_size):
+        completed += [name for name, _ in parser.feed(text[i:i + chunk_size])]
+    return parser, completed
+
+
+def test_chunked_feed_matches_json_loads_for_any_chunk_size():
+    text = json.dumps(PROPOSAL)
+    for chunk_size in (1, 3, 7, 64, len(text)):
+        parser, completed = _feed(text, chunk_size)
+        assert parser.complete
+        assert completed == list(PROPOSAL)
+        assert parser.finish() == PROPOSAL
+        assert not parser.repaired
+
+
+def test_fields_complete_before_the_rest_arrives():
+    text = json.dumps(PROPOSAL)
+    cut = text.index('"proposal_text"') + len('"proposal_text": "## Prop')
+    parser, completed = _feed(text[:cut], 5)
+    assert completed == ["product_matches", "feasibility_matrix"]
+    assert parser.partial("proposal_text") == "## Prop"
+
+
+def test_truncated_output_is_repaired():
+    text = json.dumps(PROPOSAL)
+    cut = text.index('"Demo"') + 3
+    fields, repaired = parse_json_object(text[:cut])
+    assert repaired
+    assert fields["next_steps"] == ["Quote", "De"]
+    assert fields["product_matches"] == PROPOSAL["product_matches"]
+
+
+def test_incomplete_array_item_is_dropped():
+    fields, repaired = parse_json_object('{"next_steps": ["Quote", {"a": ')
+    assert repaired and fields == {"next_steps": ["Quote"]}
+
+
+def test_prose_fences_and_missing_comma_are_tolerated():
+    text = 'Here you go:\n```json\n{"a": 1 "b": [true, null]}\n```\nThanks'
+    fields, _ = parse_json_object(text)
+    assert fields == {"a": 1, "b": [True, None]}
+
+
+def test_output_without_an_object_yields_no_fields():
+    assert parse_json_object("No JSON here.") == ({}, True)
@@ -0,0 +1,53 @@
+"""Tests for the product search index in products.py."""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from products import _all_scores, build_search_index
+from utils.spec_parser import parse_spec
+
+CATALOG = [
+    {"id": "green", "name": "Green Line", "category": "CW DPSS Lasers", "type": "laser",
+     "wavelengths": [532], "power_range_mw": [50, 500], "applications": ["Raman Spectroscopy"]},
+    {"id": "tunable", "name": "Tuna Source", "category": "Tunable Lasers", "type": "laser",
+     "wavelengths_range": [450, 650], "power_range_mw": [1, 20], "tunable": True},
+    {"id": "infrared", "name": "IR Source", "category": "Fiber Lasers", "type": "laser",
+     "wavelengths_range": [1000, 1100], "applications": ["Materials Processing"]},
+]
+
+
+class ListCatalog(list):
+    """Minimal in-memory catalog store for build_search_index."""
+
+    def get(self, product_id):
+        return next((p for p in self if p["id"] == product_id), None)
+
+
+def scored(spec):
+    return set(_all_scores(parse_spec(spec), build_search_index(ListCatalog(CATALOG))))
+
+
+def test_spec_without_shared_term_or_value_touches_no_product():
+    assert scored("Please quote 3 units by 2026") == set()
+
+
+def test_numbers_select_only_products_whose_values_cover_them():
+    assert scored("wavelength 532 nm") == {"green", "tunable"}
+    assert scored("wavelength 1064 nm") == {"infrared"}
+
+
+def test_phrases_select_only_products_posting_them():
+    assert scored("for raman spectroscopy") == {"green"}
+    assert scored("we need tuning over the visible") == {"tunable"}
+
+
+def test_cached_search_results_are_not_shared_between_callers():
+    from products import search_products_cached
+
+    first = search_products_cached("532 nm laser for Raman spectroscopy", k=3)
+    first[0]["score"] = -1
+    first[0]["rendered"] = True
+    again = search_products_cached("532 nm laser for Raman spectroscopy", k=3)
+    assert again[0]["score"] >= 0 and "rendered" not in again[0]
@@ -0,0 +1,64 @@
+"""Tests for the MinHash proposal index in utils/proposal_index.py."""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.proposal_index import ProposalIndex
+
+SPEC = (
+    "We need a 532 nm CW laser with at least 100 mW output power for Raman spectroscopy, "
+    "single longitudinal mode, linewidth below 1 MHz, fiber coupled, delivery within 8 weeks."
+)
+NEAR_DUPLICATE = SPEC.replace("8 weeks", "6 weeks")
+UNRELATED = "Looking for a femtosecond fiber laser at 1030 nm for multiphoton imaging in neuroscience labs."
+PROPOSAL = {"proposal_text": "## Proposal", "product_matches": [], "model": "m",
+            "input_tokens": 1000, "output_tokens": 500}
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = ProposalIndex(path=str(tmp_path / "index.sqlite"))
+    yield index
+    index.close()
+
+
+def test_near_duplicate_spec_finds_the_stored_proposal(index):
+    row_id = index.add(SPEC, PROPOSAL)
+    match = index.find(NEAR_DUPLICATE)
+    assert match["id"] == row_id
+    assert match["similarity"] >= index.threshold
+    assert match["proposal"]["proposal_text"] == "## Proposal"
+    assert (match["input_tokens"], match["output_tokens"]) == (1000, 500)
+
+
+def test_unrelated_spec_finds_nothing(index):
+    index.add(SPEC, PROPOSAL)
+    assert index.find(UNRELATED) is None
+
+
+def test_evicted_rows_leave_memory_and_are_never_returned(tmp_path):
+    index = ProposalIndex(path=str(tmp_path / "index.sqlite"), max_entries=1)
+    index.add(SPEC, PROPOSAL)
+    assert index.find(SPEC)["id"] == 1
+    index.add(NEAR_DUPLICATE, PROPOSAL)
+    assert index.find(SPEC)["id"] == 2
+    assert list(index._signatures) == [2]
+    assert all(bucket == [2] for bucket in index._buckets.values())
+    index.close()
+
+
+def test_stats_count_lookups_hits_and_savings(index):
+    index.add(SPEC, PROPOSAL)
+    index.find(NEAR_DUPLICATE)
+    index.find(UNRELATED)
+    index.record_savings(1500)
+    stats = index.stats()
+    assert (stats["entries"], stats["lookups"], stats["hits"]) == (1, 2, 1)
+    assert stats["hit_rate"] == 0.5
+    assert stats["tokens_saved"] == 1500
+    index.clear()
+    assert index.stats()["entries"] == 0 and index.find(SPEC) is None
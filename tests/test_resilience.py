@@ -0,0 +1,127 @@
+"""Tests for the circuit breaker, deadlines and hedging in utils/resilience.py."""
+
+import sys
+import os
+import asyncio
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.resilience import CircuitBreaker, CircuitOpenError, Deadline, ProviderHealth, hedged
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def _fail():
+    raise RuntimeError("provider error")
+
+
+async def _ok():
+    return "ok"
+
+
+def _fail_sync():
+    raise RuntimeError("provider error")
+
+
+def test_breaker_opens_after_threshold_and_half_opens_for_one_trial():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=2, open_interval_s=10, clock=clock)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    clock.now = 10
+    assert breaker.state == "half_open"
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow()
+
+
+def test_failed_trial_reopens_the_breaker():
+    clock = FakeClock()
+    breaker = CircuitBreaker(failure_threshold=1, open_interval_s=10, clock=clock)
+    breaker.record_failure()
+    clock.now = 10
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    assert breaker.times_opened == 2
+
+
+def test_cancelled_trial_releases_the_breaker_without_a_failure():
+    clock = FakeClock()
+    health = ProviderHealth(failure_threshold=1, open_interval_s=10, hedge_percentile=None, clock=clock)
+
+    async def scenario():
+        with pytest.raises(RuntimeError):
+            await health.call("m", _fail)
+        clock.now = 10
+        task = asyncio.ensure_future(health.call("m", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(scenario())
+    assert health.breaker("m").state == "half_open"
+    assert health.breaker("m").allow()
+    assert health.stats()["m"]["failures"] == 1
+
+
+def test_open_breaker_fails_fast():
+    health = ProviderHealth(failure_threshold=1, hedge_percentile=None)
+    with pytest.raises(RuntimeError):
+        health.call_sync("m", _fail_sync)
+    with pytest.raises(CircuitOpenError):
+        health.call_sync("m", lambda: "never called")
+    assert health.stats()["m"]["rejected"] == 1
+
+
+def test_expired_deadline_is_not_attempted():
+    clock = FakeClock()
+    deadline = Deadline(1.0, clock)
+    clock.now = 2.0
+    assert deadline.expired()
+    with pytest.raises(TimeoutError):
+        ProviderHealth().call_sync("m", lambda: "never called", deadline)
+
+
+def test_child_deadline_never_outlives_its_parent():
+    clock = FakeClock()
+    parent = Deadline(5.0, clock)
+    assert parent.within(60.0).remaining() == 5.0
+    assert parent.within(1.0).remaining() == 1.0
+
+
+def test_hedge_delay_is_kept_per_model_and_kind():
+    health = ProviderHealth(hedge_min_samples=3)
+    for _ in range(5):
+        health.call_sync("m", lambda: None, kind="classify")
+        health.call_sync("m", lambda: None, kind=None)
+    assert health.hedge_delay("m", "proposal") == health.hedge_default_delay_s
+    assert health.hedge_delay("m", "classify") < health.hedge_default_delay_s
+    assert set(health.stats()["m"]["hedge_delay_s"]) == {"classify"}
+
+
+def test_hedge_wins_when_the_first_call_is_slow():
+    delays = iter([1.0, 0.0])
+
+    async def call():
+        await asyncio.sleep(next(delays))
+        return "done"
+
+    result, fired, won = asyncio.run(hedged(call, 0.01))
+    assert (result, fired, won) == ("done", True, True)
+
+
+def test_no_hedge_for_a_fast_call():
+    assert asyncio.run(hedged(_ok, 1.0)) == ("ok", False, False)
@@ -0,0 +1,417 @@
+"""Vectorized batch scoring of many specs against the catalog with NumPy.
+
+The search index from products.build_search_index is compiled into
+columnar arrays once:
+
+- the phrase automaton as a dense DFA transition table, so all specs of a
+  batch are stepped through it together, one character column at a time
+- phrase -> product weight matrix for the additive phrase rules
+- phrase -> application-group / category matrices for the grouped rules
+- flag -> product weight matrix for the capability rules
+- wavelength / power range columns and an exact-wavelength matrix
+
+A batch of parsed specs becomes a sparse (spec, phrase) hit list that is
+multiplied through these matrices, giving a specs x products raw score
+matrix identical to what search_products computes one spec at a time.
+Sparse matrices are kept as plain CSR arrays (indptr, indices, data).
+"""
+
+import numpy as np
+
+import products
+from utils.spec_parser import as_spec_features
+from utils.spectral_index import (
+    WAVELENGTH_EXACT_POINTS,
+    WAVELENGTH_RANGE_POINTS,
+    POWER_RANGE_POINTS,
+    POWER_NEAR_POINTS,
+)
+
+# Upper bound on elements of a (values x products) comparison block.
+_BLOCK_ELEMENTS = 4_000_000
+
+
+def _csr(rows, n_cols):
+    """Build CSR arrays from a list of per-row {column: value} dicts."""
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indices, data = [], []
+    for i, row in enumerate(rows):
+        indptr[i + 1] = indptr[i] + len(row)
+        for col in sorted(row):
+            indices.append(col)
+            data.append(row[col])
+    return {
+        "indptr": indptr,
+        "indices": np.asarray(indices, dtype=np.int64),
+        "data": np.asarray(data, dtype=np.int64),
+        "shape": (len(rows), n_cols),
+    }
+
+
+def _spmm_coo(rows, cols, matrix):
+    """Multiply a sparse 0/1 matrix given as (rows, cols) pairs by a CSR matrix.
+
+    Returns the product as unaggregated COO triplets (rows, cols, data).
+    """
+    starts = matrix["indptr"][cols]
+    lengths = matrix["indptr"][cols + 1] - starts
+    total = int(lengths.sum())
+    if total == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty
+    offsets = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+    positions = offsets + np.arange(total)
+    return (
+        np.repeat(rows, lengths),
+        matrix["indices"][positions],
+        matrix["data"][positions],
+    )
+
+
+def _aggregate(rows, cols, data, n_cols):
+    """Sum duplicate COO entries. Returns (rows, cols, summed data)."""
+    if len(rows) == 0:
+        return rows, cols, data
+    keys, inverse = np.unique(rows * n_cols + cols, return_inverse=True)
+    sums = np.bincount(inverse, weights=data).astype(np.int64)
+    return keys // n_cols, keys % n_cols, sums
+
+
+def _dense_automaton(matcher):
+    """Expand an Aho-Corasick automaton into a dense DFA transition table.
+
+    Characters that occur in no phrase share symbol 0, which always leads
+    back to the root state.
+
+    Returns:
+        Dict with alphabet (sorted code points), delta (states x symbols),
+        outputs (CSR of state -> phrase IDs) and has_output (bool per state).
+    """
+    goto, fail, outputs = matcher["goto"], matcher["fail"], matcher["outputs"]
+    alphabet = sorted({ch for edges in goto for ch in edges})
+    symbol = {ch: i + 1 for i, ch in enumerate(alphabet)}
+
+    delta = np.zeros((len(goto), len(alphabet) + 1), dtype=np.int32)
+    order = [0]
+    for state in order:
+        for ch, nxt in goto[state].items():
+            order.append(nxt)
+    for state in order:
+        if state:
+            delta[state] = delta[fail[state]]
+        for ch, nxt in goto[state].items():
+            delta[state, symbol[ch]] = nxt
+
+    return {
+        "alphabet": np.asarray([ord(ch) for ch in alphabet], dtype=np.uint32),
+        "delta": delta,
+        "outputs": _csr([{pid: 1 for pid in out} for out in outputs], len(outputs)),
+        "has_output": np.asarray([bool(out) for out in outputs]),
+    }
+
+
+def _phrase_hits(dfa, texts):
+    """Return (spec rows, phrase IDs) for every phrase occurring in each text.
+
+    All texts are stepped through the DFA in lockstep: one vectorized
+    transition per character position instead of one per character.
+    """
+    empty = np.zeros(0, dtype=np.int64)
+    lengths = np.fromiter((len(t) for t in texts), dtype=np.int64, count=len(texts))
+    if not len(texts) or not lengths.max(initial=0):
+        return empty, empty
+
+    codes = np.frombuffer("".join(texts).encode("utf-32-le"), dtype=np.uint32)
+    alphabet = dfa["alphabet"]
+    slot = np.clip(np.searchsorted(alphabet, codes), 0, len(alphabet) - 1)
+    symbols = np.where(alphabet[slot] == codes, slot + 1, 0).astype(np.int32)
+
+    rows = np.repeat(np.arange(len(texts)), lengths)
+    cols = np.arange(len(codes)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    grid = np.zeros((len(texts), int(lengths.max())), dtype=np.int32)
+    grid[rows, cols] = symbols
+
+    delta, has_output = dfa["delta"], dfa["has_output"]
+    state = np.zeros(len(texts), dtype=np.int32)
+    hit_rows, hit_states = [], []
+    for column in grid.T:
+        state = delta[state, column]
+        emitting = np.flatnonzero(has_output[state])
+        if len(emitting):
+            hit_rows.append(emitting)
+            hit_states.append(state[emitting])
+    if not hit_rows:
+        return empty, empty
+
+    n_states = len(has_output)
+    rows, states, _ = _aggregate(
+        np.concatenate(hit_rows).astype(np.int64),
+        np.concatenate(hit_states).astype(np.int64),
+        np.ones(sum(len(r) for r in hit_rows), dtype=np.int64),
+        n_states,
+    )
+    rows, phrases, _ = _spmm_coo(rows, states, dfa["outputs"])
+    rows, phrases, _ = _aggregate(rows, phrases, np.ones(len(rows), dtype=np.int64),
+                                  dfa["outputs"]["shape"][1])
+    return rows, phrases
+
+
+def _range_columns(catalog, field):
+    """Return (product positions, lows, highs) for products with a range field."""
+    positions, lows, highs = [], [], []
+    for i, product in enumerate(catalog):
+        value = product.get(field)
+        if value:
+            positions.append(i)
+            lows.append(value[0])
+            highs.append(value[1])
+    return (
+        np.asarray(positions, dtype=np.int64),
+        np.asarray(lows, dtype=np.float64),
+        np.asarray(highs, dtype=np.float64),
+    )
+
+
+def compile_search_index(index, catalog_version=None):
+    """Compile a products.build_search_index result into columnar arrays."""
+    catalog = [index["lookup"](product_id)
+               for product_id in sorted(index["order"], key=index["order"].get)]
+    position = {p["id"]: i for i, p in enumerate(catalog)}
+    n_products = len(catalog)
+
+    add_rows, app_phrase_rows, app_word_rows, cat_phrase_rows, cat_word_rows = (
+        [] for _ in range(5)
+    )
+    groups = {}
+    for entries in index["postings"]:
+        rows = {name: {} for name in ("add", "app", "app_word", "cat", "cat_word")}
+        for product_id, rule, slot in entries:
+            col = position[product_id]
+            if rule in products.PHRASE_RULE_POINTS:
+                target, value = "add", products.PHRASE_RULE_POINTS[rule]
+            elif rule in ("application", "application_word"):
+                col = groups.setdefault((product_id, slot), len(groups))
+                target, value = ("app", 1) if rule == "application" else ("app_word", 1)
+            else:
+                target, value = ("cat", 1) if rule == "category" else ("cat_word", 1)
+            rows[target][col] = rows[target].get(col, 0) + value
+        add_rows.append(rows["add"])
+        app_phrase_rows.append(rows["app"])
+        app_word_rows.append(rows["app_word"])
+        cat_phrase_rows.append(rows["cat"])
+        cat_word_rows.append(rows["cat_word"])
+
+    n_groups = len(groups)
+    group_product = np.zeros(n_groups, dtype=np.int64)
+    group_words = np.zeros(n_groups, dtype=np.int64)
+    for (product_id, slot), group in groups.items():
+        group_product[group] = position[product_id]
+        group_words[group] = index["word_counts"].get((product_id, slot), 0)
+
+    flag_names = list(products.FLAG_RULES)
+    flag_weights = np.zeros((len(flag_names), n_products), dtype=np.int64)
+    for f, flag in enumerate(flag_names):
+        for product_id in index["flags"][flag]:
+            flag_weights[f, position[product_id]] = products.FLAG_RULES[flag][0]
+
+    exact = index["spectral"]["wavelength_exact"]
+    exact_values = np.asarray(sorted(exact), dtype=np.int64)
+    exact_rows = [
+        {position[pid]: WAVELENGTH_EXACT_POINTS for pid in exact[int(v)]}
+        for v in exact_values
+    ]
+
+    return {
+        "dfa": _dense_automaton(index["matcher"]),
+        "catalog": catalog,
+        "n_products": n_products,
+        "add": _csr(add_rows, n_products),
+        "app_phrase": _csr(app_phrase_rows, n_groups),
+        "app_word": _csr(app_word_rows, n_groups),
+        "group_product": group_product,
+        "group_words": group_words,
+        "cat_phrase": _csr(cat_phrase_rows, n_products),
+        "cat_word": _csr(cat_word_rows, n_products),
+        "flag_index": {flag: f for f, flag in enumerate(flag_names)},
+        "flag_weights": flag_weights,
+        "exact_values": exact_values,
+        "exact": _csr(exact_rows, n_products),
+        "wavelength_ranges": _range_columns(catalog, "wavelengths_range"),
+        "power_ranges": _range_columns(catalog, "power_range_mw"),
+        "catalog_version": catalog_version,
+    }
+
+
+def _flatten(values_per_spec):
+    """Flatten per-spec value tuples into (spec indices, float values)."""
+    lengths = np.fromiter((len(v) for v in values_per_spec), dtype=np.int64,
+                          count=len(values_per_spec))
+    rows = np.repeat(np.arange(len(values_per_spec)), lengths)
+    values = np.fromiter(
+        (x for v in values_per_spec for x in v), dtype=np.float64, count=int(lengths.sum())
+    )
+    return rows, values
+
+
+def _range_hits(rows, values, ranges, scale=1.0):
+    """Yield (spec rows, product positions, in-range mask, lows) blockwise."""
+    positions, lows, highs = ranges
+    if len(rows) == 0 or len(positions) == 0:
+        return
+    step = max(1, _BLOCK_ELEMENTS // len(positions))
+    for start in range(0, len(rows), step):
+        block = values[start:start + step, None] * scale
+        yield rows[start:start + step], positions, (lows <= block) & (block <= highs), lows, block
+
+
+def score_matrix(compiled, features_list):
+    """Return the specs x products raw score matrix for parsed specs.
+
+    Args:
+        compiled: Dict from compile_search_index.
+        features_list: List of SpecFeatures.
+
+    Returns:
+        int64 array of shape (len(features_list), n_products), in catalog order.
+    """
+    n_specs = len(features_list)
+    n_products = compiled["n_products"]
+    scores = np.zeros(n_specs * n_products, dtype=np.int64)
+
+    def accumulate(rows, cols, data):
+        if len(rows):
+            scores[:] += np.bincount(
+                rows * n_products + cols, weights=data, minlength=n_specs * n_products
+            ).astype(np.int64)
+
+    # --- Sparse (spec, phrase) hit matrix from one lockstep DFA scan ---
+    hit_rows, hit_cols = _phrase_hits(compiled["dfa"], [f.text for f in features_list])
+
+    # --- Additive phrase rules ---
+    accumulate(*_spmm_coo(hit_rows, hit_cols, compiled["add"]))
+
+    # --- Application groups: full phrase, else word-count thresholds ---
+    n_groups = len(compiled["group_product"])
+    if n_groups:
+        p_rows, p_cols, _ = _aggregate(
+            *_spmm_coo(hit_rows, hit_cols, compiled["app_phrase"]), n_groups
+        )
+        w_rows, w_cols, w_hits = _aggregate(
+            *_spmm_coo(hit_rows, hit_cols, compiled["app_word"]), n_groups
+        )
+        phrase_keys = p_rows * n_groups + p_cols
+        word_keys = w_rows * n_groups + w_cols
+        word_points = np.where(
+            w_hits >= 2,
+            products.APPLICATION_WORDS_POINTS,
+            np.where(
+                (w_hits == 1) & (compiled["group_words"][w_cols] <= 2),
+                products.APPLICATION_WORD_POINTS,
+                0,
+            ),
+        )
+        word_points[np.isin(word_keys, phrase_keys)] = 0
+        group_product = compiled["group_product"]
+        accumulate(
+            p_rows, group_product[p_cols],
+            np.full(len(p_rows), products.APPLICATION_POINTS, dtype=np.int64),
+        )
+        accumulate(w_rows, group_product[w_cols], word_points)
+
+    # --- Category: full phrase, else >= 2 words ---
+    c_rows, c_cols, _ = _aggregate(
+        *_spmm_coo(hit_rows, hit_cols, compiled["cat_phrase"]), n_products
+    )
+    cw_rows, cw_cols, cw_hits = _aggregate(
+        *_spmm_coo(hit_rows, hit_cols, compiled["cat_word"]), n_products
+    )
+    accumulate(
+        c_rows, c_cols, np.full(len(c_rows), products.CATEGORY_POINTS, dtype=np.int64)
+    )
+    cat_words_points = np.where(cw_hits >= 2, products.CATEGORY_WORDS_POINTS, 0)
+    cat_words_points[np.isin(cw_rows * n_products + cw_cols, c_rows * n_products + c_cols)] = 0
+    accumulate(cw_rows, cw_cols, cat_words_points)
+
+    scores = scores.reshape(n_specs, n_products)
+
+    # --- Capability flags: boolean spec x flag columns times flag weights ---
+    flag_index = compiled["flag_index"]
+    flag_matrix = np.zeros((n_specs, len(flag_index)), dtype=np.int64)
+    for i, features in enumerate(features_list):
+        for flag in features.flags:
+            if flag in flag_index:
+                flag_matrix[i, flag_index[flag]] = 1
+    scores += flag_matrix @ compiled["flag_weights"]
+
+    # --- Exact wavelengths (distinct values per spec) ---
+    exact_values = compiled["exact_values"]
+    e_rows, e_values = _flatten([tuple(set(f.wavelength_numbers)) for f in features_list])
+    if len(exact_values) and len(e_rows):
+        slot = np.clip(np.searchsorted(exact_values, e_values), 0, len(exact_values) - 1)
+        found = exact_values[slot] == e_values
+        rows, cols, data = _spmm_coo(e_rows[found], slot[found], compiled["exact"])
+        np.add.at(scores, (rows, cols), data)
+
+    # --- Wavelength ranges (every mention) ---
+    w_rows, w_values = _flatten([f.wavelength_numbers for f in features_list])
+    for rows, positions, inside, _, _ in _range_hits(
+        w_rows, w_values, compiled["wavelength_ranges"]
+    ):
+        r, c = np.nonzero(inside)
+        np.add.at(scores, (rows[r], positions[c]), WAVELENGTH_RANGE_POINTS)
+
+    # --- Power in mW: in range, else below twice the minimum ---
+    m_rows, m_values = _flatten([f.power_mw for f in features_list])
+    for rows, positions, inside, lows, block in _range_hits(
+        m_rows, m_values, compiled["power_ranges"]
+    ):
+        points = np.where(inside, POWER_RANGE_POINTS, np.where(block < lows * 2, POWER_NEAR_POINTS, 0))
+        r, c = np.nonzero(points)
+        np.add.at(scores, (rows[r], positions[c]), points[r, c])
+
+    # --- Power in W ---
+    pw_rows, pw_values = _flatten([f.power_w for f in features_list])
+    for rows, positions, inside, _, _ in _range_hits(
+        pw_rows, pw_values, compiled["power_ranges"], scale=1000.0
+    ):
+        r, c = np.nonzero(inside)
+        np.add.at(scores, (rows[r], positions[c]), POWER_RANGE_POINTS)
+
+    return scores
+
+
+def rank_scores(compiled, scores):
+    """Turn a raw score matrix into search_products-style result lists."""
+    catalog = compiled["catalog"]
+    version = compiled["catalog_version"]
+    normalized = np.minimum(np.rint(scores / 120 * 100), 99).astype(np.int64)
+    # Stable descending sort: ties keep catalog order, like search_products.
+    ranked = np.argsort(np.where(scores > 0, -normalized, 1), axis=1, kind="stable")
+    counts = (scores > 0).sum(axis=1)
+    results = []
+    for row, count, norm_row in zip(ranked.tolist(), counts.tolist(), normalized.tolist()):
+        results.append([
+            {"product": catalog[i], "score": norm_row[i], "catalog_version": version}
+            for i in row[:count]
+        ])
+    return results
+
+
+def search_batch(compiled, specs, chunk_size=10_000):
+    """Score and rank many specs; returns one search_products result per spec.
+
+    Args:
+        compiled: Dict from compile_search_index.
+        specs: Iterable of spec texts or SpecFeatures.
+        chunk_size: Specs per vectorized block (bounds memory).
+    """
+    features_list = [as_spec_features(spec) for spec in specs]
+    # Chunk specs of similar length together to keep DFA padding small.
+    by_length = sorted(range(len(features_list)), key=lambda i: len(features_list[i].text))
+    results = [None] * len(features_list)
+    for start in range(0, len(by_length), chunk_size):
+        chunk = by_length[start:start + chunk_size]
+        ranked = rank_scores(compiled, score_matrix(compiled, [features_list[i] for i in chunk]))
+        for i, result in zip(chunk, ranked):
+            results[i] = result
+    return results
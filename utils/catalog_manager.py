@@ -0,0 +1,206 @@
+"""Hot-reloadable catalog with immutable, versioned snapshots.
+
+A CatalogSnapshot bundles one catalog store, the search index built from it
+and a content version. CatalogManager holds the current snapshot and replaces
+it when the catalog file changes:
+
+- change detection: file stat (mtime, size) first, then per-record digests
+- small edits re-index only the changed products (update_index); larger
+  ones rebuild the index from scratch (build_index)
+- the new snapshot is swapped in with a single reference assignment, so a
+  search that took a snapshot keeps a consistent catalog and index until it
+  finishes, while new searches see the new version
+
+A malformed catalog file (e.g. caught mid-edit) leaves the current snapshot
+in place; the error is reported by stats().
+"""
+
+import hashlib
+import os
+import threading
+import time
+
+from utils.catalog_store import DEFAULT_CATALOG_PATH, open_catalog
+
+
+def catalog_version(store):
+    """Return a short content version: a digest over IDs and record digests in order."""
+    digests = store.digests()
+    h = hashlib.blake2b(digest_size=6)
+    for product_id in store.ids():
+        h.update(f"{product_id}:{digests[product_id]}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+class CatalogSnapshot:
+    """One immutable catalog version. Treat all attributes as read-only."""
+
+    def __init__(self, version, store, index):
+        self.version = version
+        self.store = store
+        self.index = index
+        self.loaded_at = time.time()
+        self._derived = {}
+        self._derived_lock = threading.Lock()
+
+    def derived(self, name, build):
+        """Return a value computed from this snapshot once (e.g. a compiled index).
+
+        Args:
+            name: Cache key.
+            build: Zero-argument callable producing the value.
+        """
+        if name not in self._derived:
+            with self._derived_lock:
+                if name not in self._derived:
+                    self._derived[name] = build()
+        return self._derived[name]
+
+
+class CatalogManager:
+    """Owns the current catalog snapshot and reloads it when the file changes.
+
+    Args:
+        build_index: Callable(store) -> search index, for full builds.
+        update_index: Callable(index, store, changed_ids, removed_ids) ->
+            new search index, for incremental builds. Optional.
+        path: Catalog file. Defaults to the CATALOG_PATH environment
+            variable, then data/catalog.jsonl.
+        cache_size: Parsed records kept in memory per store.
+        incremental_fraction: Largest share of changed products that is
+            still re-indexed incrementally.
+    """
+
+    def __init__(self, build_index, update_index=None, path=None, cache_size=256,
+                 incremental_fraction=0.1):
+        self.path = path or os.environ.get("CATALOG_PATH") or DEFAULT_CATALOG_PATH
+        self.cache_size = cache_size
+        self.incremental_fraction = incremental_fraction
+        self._build_index = build_index
+        self._update_index = update_index
+        self._snapshot = None
+        self._file_stat = None
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._stop = threading.Event()
+        self._stats = {"full_builds": 0, "incremental_builds": 0, "last_error": None}
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size
+
+    def _load(self):
+        """Build a snapshot from the catalog file. Caller holds the lock."""
+        file_stat = self._stat()
+        store = open_catalog(self.path, cache_size=self.cache_size)
+        version = catalog_version(store)
+
+        old = self._snapshot
+        if old is not None and version == old.version:
+            self._file_stat = file_stat
+            return False
+
+        index = None
+        if old is not None and self._update_index is not None:
+            old_digests = old.store.digests()
+            new_digests = store.digests()
+            changed = [pid for pid, d in new_digests.items() if old_digests.get(pid) != d]
+            removed = [pid for pid in old_digests if pid not in new_digests]
+            if len(changed) + len(removed) <= self.incremental_fraction * len(new_digests):
+                index = self._update_index(old.index, store, changed, removed)
+                self._stats["incremental_builds"] += 1
+        if index is None:
+            index = self._build_index(store)
+            self._stats["full_builds"] += 1
+
+        # Stores of replaced snapshots are not closed here: searches may still
+        # hold them. Their files are released once the last reference is gone.
+        self._snapshot = CatalogSnapshot(version, store, index)
+        self._file_stat = file_stat
+        return True
+
+    def current(self):
+        """Return the current snapshot, loading the catalog on first use."""
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._load()
+                snapshot = self._snapshot
+        return snapshot
+
+    def refresh(self):
+        """Reload the catalog if its file changed. Returns True if a new snapshot was swapped in."""
+        with self._lock:
+            if self._snapshot is not None and self._stat() == self._file_stat:
+                return False
+            return self._load()
+
+    def start_watching(self, interval=2.0):
+        """Poll the catalog file every interval seconds in a daemon thread.
+
+        Calling it again while the watcher runs has no effect.
+        """
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(
+            target=self._watch, args=(interval,), name="catalog-watcher", daemon=True
+        )
+        self._watcher.start()
+
+    def stop_watching(self):
+        """Stop the watcher thread, if running."""
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join()
+            self._watcher = None
+
+    def _watch(self, interval):
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+                self._stats["last_error"] = None
+            except Exception as e:
+                self._stats["last_error"] = str(e)
+
+    def stats(self):
+        """Return current version, product count, build counters and last reload error."""
+        snapshot = self.current()
+        return {
+            "version": snapshot.version,
+            "products": len(snapshot.store),
+            "loaded_at": snapshot.loaded_at,
+            **self._stats,
+        }
+
+
+class CurrentCatalogView:
+    """List-like catalog view that always reads the manager's current snapshot."""
+
+    def __init__(self, manager):
+        self._manager = manager
+
+    def _store(self):
+        return self._manager.current().store
+
+    def get(self, product_id):
+        return self._store().get(product_id)
+
+    def ids(self):
+        return self._store().ids()
+
+    def ids_by_type(self, product_type):
+        return self._store().ids_by_type(product_type)
+
+    def ids_by_category(self, category):
+        return self._store().ids_by_category(category)
+
+    def __len__(self):
+        return len(self._store())
+
+    def __iter__(self):
+        return iter(self._store())
+
+    def __getitem__(self, position):
+        return self._store()[position]
@@ -0,0 +1,298 @@
+"""External product catalog storage with lazy record loading.
+
+The catalog lives outside the code, either as JSON Lines (one product per
+line, the editable source) or as SQLite (compact form for large catalogs,
+built from the JSONL file). Both stores expose the same interface:
+
+- ID, type and category indexes built once (or served by SQLite indexes)
+- get(product_id) in O(1) / indexed time
+- product records parsed only when requested and kept in a bounded LRU
+  cache, so memory does not grow with full catalog size
+- list-like iteration in catalog order, streaming records from disk
+- a per-record digest for change detection (see utils.catalog_manager)
+
+A store stays bound to the file it opened: replace catalog files atomically
+(write a new file, then rename it over the old one) so stores still in use
+keep reading the version they indexed.
+
+Usage:
+    python -m utils.catalog_store build-sqlite data/catalog.jsonl data/catalog.sqlite
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "catalog.jsonl"
+)
+
+
+def record_digest(raw):
+    """Return a short content digest of a serialized product record."""
+    if isinstance(raw, str):
+        raw = raw.encode("utf-8")
+    return hashlib.blake2b(raw.strip(), digest_size=8).hexdigest()
+
+
+class _LRUCache:
+    """Small thread-safe LRU cache for parsed product records."""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+
+class _CatalogStoreBase:
+    """Shared list-like behavior; subclasses provide ids() and _load()."""
+
+    def __init__(self, path, cache_size):
+        self.path = path
+        self._cache = _LRUCache(cache_size)
+
+    def get(self, product_id):
+        """Return the product record for an ID, or None."""
+        product = self._cache.get(product_id)
+        if product is None:
+            product = self._load(product_id)
+            if product is not None:
+                self._cache.put(product_id, product)
+        return product
+
+    def __len__(self):
+        return len(self.ids())
+
+    def __iter__(self):
+        for product_id in self.ids():
+            yield self.get(product_id)
+
+    def __getitem__(self, position):
+        if isinstance(position, slice):
+            return [self.get(product_id) for product_id in self.ids()[position]]
+        return self.get(self.ids()[position])
+
+
+class JsonlCatalogStore(_CatalogStoreBase):
+    """Catalog backed by a JSON Lines file, indexed by byte offset."""
+
+    def __init__(self, path, cache_size=256):
+        super().__init__(path, cache_size)
+        self._index = None
+        self._index_lock = threading.Lock()
+        self._file_lock = threading.Lock()
+        self._file = None
+
+    def _ensure_index(self):
+        """Scan the file once, keeping only offsets, types and categories.
+
+        The file handle opened here is kept for all later reads, so the
+        store keeps serving this version of the file.
+        """
+        if self._index is not None:
+            return self._index
+        with self._index_lock:
+            if self._index is None:
+                spans, ids, by_type, by_category, digests = {}, [], {}, {}, {}
+                self._file = open(self.path, "rb")
+                offset = 0
+                for line in self._file:
+                    if line.strip():
+                        record = json.loads(line)
+                        product_id = record["id"]
+                        spans[product_id] = (offset, len(line))
+                        ids.append(product_id)
+                        by_type.setdefault(record.get("type"), []).append(product_id)
+                        by_category.setdefault(record.get("category"), []).append(product_id)
+                        digests[product_id] = record_digest(line)
+                    offset += len(line)
+                self._index = {
+                    "spans": spans,
+                    "ids": ids,
+                    "by_type": by_type,
+                    "by_category": by_category,
+                    "digests": digests,
+                }
+        return self._index
+
+    def _read_at(self, offset, size):
+        with self._file_lock:
+            self._file.seek(offset)
+            return self._file.read(size)
+
+    def _load(self, product_id):
+        span = self._ensure_index()["spans"].get(product_id)
+        if span is None:
+            return None
+        return json.loads(self._read_at(*span))
+
+    def ids(self):
+        """Return all product IDs in catalog order."""
+        return self._ensure_index()["ids"]
+
+    def ids_by_type(self, product_type):
+        """Return IDs of products of the given type, in catalog order."""
+        return self._ensure_index()["by_type"].get(product_type, [])
+
+    def ids_by_category(self, category):
+        """Return IDs of products in the given category, in catalog order."""
+        return self._ensure_index()["by_category"].get(category, [])
+
+    def digests(self):
+        """Return {product ID: record digest}."""
+        return self._ensure_index()["digests"]
+
+    def __iter__(self):
+        # Stream the indexed file in large chunks instead of one seek per record.
+        self._ensure_index()
+        offset, pending = 0, b""
+        while True:
+            chunk = self._read_at(offset, 1 << 16)
+            if not chunk:
+                break
+            offset += len(chunk)
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            for line in lines:
+                if line.strip():
+                    yield json.loads(line)
+        if pending.strip():
+            yield json.loads(pending)
+
+    def close(self):
+        with self._file_lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+class SqliteCatalogStore(_CatalogStoreBase):
+    """Catalog backed by a SQLite file built with convert_to_sqlite."""
+
+    def __init__(self, path, cache_size=256):
+        super().__init__(path, cache_size)
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._ids = None
+
+    def _query(self, sql, params=()):
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def _load(self, product_id):
+        rows = self._query("SELECT record FROM products WHERE id = ?", (product_id,))
+        return json.loads(rows[0][0]) if rows else None
+
+    def ids(self):
+        """Return all product IDs in catalog order."""
+        if self._ids is None:
+            self._ids = [row[0] for row in self._query("SELECT id FROM products ORDER BY position")]
+        return self._ids
+
+    def ids_by_type(self, product_type):
+        """Return IDs of products of the given type, in catalog order."""
+        return [row[0] for row in self._query(
+            "SELECT id FROM products WHERE type = ? ORDER BY position", (product_type,)
+        )]
+
+    def ids_by_category(self, category):
+        """Return IDs of products in the given category, in catalog order."""
+        return [row[0] for row in self._query(
+            "SELECT id FROM products WHERE category = ? ORDER BY position", (category,)
+        )]
+
+    def digests(self):
+        """Return {product ID: record digest}."""
+        return dict(self._query("SELECT id, digest FROM products"))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def convert_to_sqlite(jsonl_path, sqlite_path):
+    """Build the SQLite form of a JSON Lines catalog. Returns product count.
+
+    The database is written next to sqlite_path and renamed into place, so
+    stores that have the old file open are unaffected.
+    """
+    tmp_path = sqlite_path + ".tmp"
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    conn = sqlite3.connect(tmp_path)
+    try:
+        conn.execute(
+            "CREATE TABLE products ("
+            "id TEXT PRIMARY KEY, position INTEGER NOT NULL, type TEXT, "
+            "category TEXT, digest TEXT NOT NULL, record TEXT NOT NULL)"
+        )
+        count = 0
+        with open(jsonl_path, encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                conn.execute(
+                    "INSERT INTO products VALUES (?, ?, ?, ?, ?, ?)",
+                    (record["id"], count, record.get("type"), record.get("category"),
+                     record_digest(line),
+                     json.dumps(record, ensure_ascii=False, separators=(",", ":"))),
+                )
+                count += 1
+        conn.execute("CREATE INDEX idx_products_position ON products (position)")
+        conn.execute("CREATE INDEX idx_products_type ON products (type, position)")
+        conn.execute("CREATE INDEX idx_products_category ON products (category, position)")
+        conn.commit()
+    finally:
+        conn.close()
+    os.replace(tmp_path, sqlite_path)
+    return count
+
+
+def open_catalog(path=None, cache_size=256):
+    """Open a catalog store, picking the backend by file extension.
+
+    Args:
+        path: Catalog file (.jsonl, .sqlite or .db). Defaults to the
+            CATALOG_PATH environment variable, then data/catalog.jsonl.
+        cache_size: Maximum number of parsed records kept in memory.
+    """
+    path = path or os.environ.get("CATALOG_PATH") or DEFAULT_CATALOG_PATH
+    if path.endswith((".sqlite", ".db")):
+        return SqliteCatalogStore(path, cache_size=cache_size)
+    return JsonlCatalogStore(path, cache_size=cache_size)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Catalog store utilities.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build-sqlite", help="Convert a JSONL catalog to SQLite.")
+    build.add_argument("jsonl_path")
+    build.add_argument("sqlite_path")
+    args = parser.parse_args()
+
+    if args.command == "build-sqlite":
+        count = convert_to_sqlite(args.jsonl_path, args.sqlite_path)
+        print(f"Wrote {count} products to {args.sqlite_path}")
+
+
+if __name__ == "__main__":
+    main()
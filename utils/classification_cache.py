@@ -0,0 +1,152 @@
+"""Persistent classification cache shared by all app workers.
+
+Classification results are stored in SQLite (WAL mode, so several worker
+processes can read while one writes), keyed by a hash of the normalized spec
+(utils.spec_parser.spec_fingerprint), the classifier prompt and the model.
+Editing CLASSIFIER_SYSTEM_PROMPT or switching models therefore never serves
+stale results.
+
+Eviction: entries older than max_age_days are dropped, and once the cache
+holds more than max_entries the least recently used ones go. Hit and miss
+counters are stored in the database too, so stats() covers all workers.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from utils.spec_parser import spec_fingerprint
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "classification_cache.sqlite"
+)
+
+
+def prompt_version(prompt):
+    """Return a short hash identifying a prompt text."""
+    return hashlib.blake2b(prompt.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def classification_key(spec_text, prompt, model):
+    """Return the cache key for classifying spec_text with prompt and model."""
+    return f"{spec_fingerprint(spec_text)}:{prompt_version(prompt)}:{model}"
+
+
+class ClassificationCache:
+    """SQLite-backed cache of classification result dicts.
+
+    Args:
+        path: Database file. Defaults to the CLASSIFICATION_CACHE_PATH
+            environment variable, then data/classification_cache.sqlite.
+        max_entries: Entries kept before least recently used ones are evicted.
+        max_age_days: Entries older than this are treated as misses and
+            removed. None keeps entries until evicted by size.
+    """
+
+    def __init__(self, path=None, max_entries=10_000, max_age_days=30):
+        self.path = path or os.environ.get("CLASSIFICATION_CACHE_PATH") or DEFAULT_CACHE_PATH
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """Open the database on first use. Caller holds the lock."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS classifications ("
+                "key TEXT PRIMARY KEY, result TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_classifications_last_used "
+                "ON classifications (last_used)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO counters VALUES ('hits', 0), ('misses', 0), ('evictions', 0)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _count(self, conn, name, n=1):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (n, name))
+
+    def get(self, key):
+        """Return the cached result dict for key, or None."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                row = conn.execute(
+                    "SELECT result, created_at FROM classifications WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and self._expired(row[1], now):
+                    conn.execute("DELETE FROM classifications WHERE key = ?", (key,))
+                    self._count(conn, "evictions")
+                    row = None
+                if row is None:
+                    self._count(conn, "misses")
+                    return None
+                conn.execute("UPDATE classifications SET last_used = ? WHERE key = ?", (now, key))
+                self._count(conn, "hits")
+        return json.loads(row[0])
+
+    def put(self, key, result):
+        """Store a result dict under key and evict beyond max_entries."""
+        now = time.time()
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO classifications VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(result), now, now),
+                )
+                excess = conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0] - self.max_entries
+                if excess > 0:
+                    conn.execute(
+                        "DELETE FROM classifications WHERE key IN ("
+                        "SELECT key FROM classifications ORDER BY last_used LIMIT ?)",
+                        (excess,),
+                    )
+                    self._count(conn, "evictions", excess)
+
+    def _expired(self, created_at, now):
+        return self.max_age_days is not None and now - created_at > self.max_age_days * 86400
+
+    def clear(self):
+        """Remove all entries and reset the counters."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM classifications")
+                conn.execute("UPDATE counters SET value = 0")
+
+    def stats(self):
+        """Return hits, misses, evictions, entries and hit rate (all workers)."""
+        with self._lock:
+            conn = self._connection()
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+            entries = conn.execute("SELECT COUNT(*) FROM classifications").fetchone()[0]
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "entries": entries,
+            "hit_rate": counters["hits"] / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
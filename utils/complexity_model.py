@@ -0,0 +1,333 @@
+"""Linear complexity classifier trained on logged LLM decisions (NumPy only).
+
+Features per spec:
+
+- hashed word unigrams and bigrams, and character 3-/4-grams of words
+  (feature hashing, no vocabulary to store), sublinear TF, L2-normalized
+- the parsed numeric features from utils.spec_parser (counts of
+  wavelengths, powers, THz values and noise limits, capability flags,
+  spec length) in a few dedicated columns
+
+The model is a multinomial logistic regression fitted with mini-batch
+Adagrad and L2 regularization, saved as a small compressed .npz file.
+Inference touches only the weight rows of the spec's features and runs
+well under a millisecond.
+
+Training data is a JSON Lines log of past decisions, one object per line
+with "spec" and "complexity" (see CLASSIFICATION_LOG_PATH in
+agents/classifier.py).
+
+Usage:
+    python -m utils.complexity_model train logs/classifications.jsonl models/complexity_model.npz
+    python -m utils.complexity_model eval logs/classifications.jsonl models/complexity_model.npz
+"""
+
+import argparse
+import json
+import math
+import os
+import random
+import time
+import zlib
+from functools import lru_cache
+
+import numpy as np
+
+from utils.spec_parser import FLAG_KEYWORDS, as_spec_features
+
+LABELS = ("SIMPLE", "MEDIUM", "COMPLEX")
+DEFAULT_MODEL_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models", "complexity_model.npz"
+)
+HASH_BITS = 16
+CHAR_NGRAMS = (3, 4)
+
+_FLAGS = tuple(FLAG_KEYWORDS)
+NUMERIC_FEATURES = ("wavelengths", "powers", "thz_values", "noise_limits", "length") + tuple(
+    f"flag_{flag}" for flag in _FLAGS
+)
+
+
+def _hash(token, n_buckets):
+    return zlib.crc32(token.encode("utf-8")) % n_buckets
+
+
+@lru_cache(maxsize=65536)
+def _word_columns(word, n_buckets):
+    """Hashed columns of a word and its character n-grams (cached: spec vocabulary repeats)."""
+    padded = f"<{word}>"
+    tokens = [f"w:{word}"]
+    for n in CHAR_NGRAMS:
+        tokens += [f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1)]
+    return tuple(_hash(token, n_buckets) for token in tokens)
+
+
+def featurize(spec, hash_bits=HASH_BITS):
+    """Return (column indices, values) of one spec's sparse feature vector.
+
+    Args:
+        spec: Spec text or SpecFeatures.
+        hash_bits: log2 of the number of hashed text columns. Numeric
+            features follow in len(NUMERIC_FEATURES) extra columns.
+    """
+    features = as_spec_features(spec)
+    n_buckets = 1 << hash_bits
+    words = features.text.split()
+
+    counts = {}
+    hashed = [_hash(f"b:{a} {b}", n_buckets) for a, b in zip(words, words[1:])]
+    for word in words:
+        hashed.extend(_word_columns(word, n_buckets))
+    for column in hashed:
+        counts[column] = counts.get(column, 0) + 1
+
+    columns = np.fromiter(counts, dtype=np.int64, count=len(counts))
+    values = 1.0 + np.log(np.fromiter(counts.values(), dtype=np.float64, count=len(counts)))
+    norm = np.linalg.norm(values)
+    if norm:
+        values /= norm
+
+    numeric = [
+        len(set(features.wavelength_numbers)) / 4,
+        (len(features.power_mw) + len(features.power_w)) / 4,
+        len(features.thz_values) / 2,
+        len(features.noise_limits_percent) / 2,
+        math.log1p(len(features.text)) / 8,
+    ] + [1.0 if flag in features.flags else 0.0 for flag in _FLAGS]
+    numeric_columns = n_buckets + np.flatnonzero(numeric)
+    numeric_values = np.asarray(numeric)[numeric_columns - n_buckets]
+
+    return (
+        np.concatenate([columns, numeric_columns]),
+        np.concatenate([values, numeric_values]),
+    )
+
+
+def _design_matrix(specs, hash_bits):
+    """Featurize specs into CSR arrays (indptr, columns, values)."""
+    rows = [featurize(spec, hash_bits) for spec in specs]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(columns) for columns, _ in rows])
+    columns = np.concatenate([c for c, _ in rows]) if rows else np.zeros(0, dtype=np.int64)
+    values = np.concatenate([v for _, v in rows]) if rows else np.zeros(0)
+    return indptr, columns, values
+
+
+def _softmax(logits):
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+def _logits(weights, bias, indptr, columns, values):
+    n_rows = len(indptr) - 1
+    contributions = weights[columns] * values[:, None]
+    row_ids = np.repeat(np.arange(n_rows), np.diff(indptr))
+    logits = np.tile(bias, (n_rows, 1))
+    np.add.at(logits, row_ids, contributions)
+    return logits
+
+
+def train(specs, labels, hash_bits=HASH_BITS, epochs=15, batch_size=64,
+          learning_rate=0.5, l2=1e-5, seed=0):
+    """Fit the linear model.
+
+    Args:
+        specs: Spec texts or SpecFeatures.
+        labels: Complexity labels (one of LABELS) per spec.
+        hash_bits, epochs, batch_size, learning_rate, l2: Model and
+            optimizer settings.
+        seed: Shuffling seed.
+
+    Returns:
+        Model dict with weights, bias, labels and hash_bits.
+    """
+    indptr, columns, values = _design_matrix(specs, hash_bits)
+    y = np.asarray([LABELS.index(label) for label in labels])
+    n_features = (1 << hash_bits) + len(NUMERIC_FEATURES)
+    weights = np.zeros((n_features, len(LABELS)))
+    bias = np.zeros(len(LABELS))
+    grad_sq = np.full_like(weights, 1e-8)
+    bias_sq = np.full_like(bias, 1e-8)
+
+    rng = np.random.default_rng(seed)
+    order = np.arange(len(y))
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for start in range(0, len(order), batch_size):
+            batch = order[start:start + batch_size]
+            starts, ends = indptr[batch], indptr[batch + 1]
+            spans = np.concatenate([np.arange(s, e) for s, e in zip(starts, ends)])
+            batch_indptr = np.concatenate([[0], np.cumsum(ends - starts)])
+            batch_columns, batch_values = columns[spans], values[spans]
+
+            probs = _softmax(_logits(weights, bias, batch_indptr, batch_columns, batch_values))
+            probs[np.arange(len(batch)), y[batch]] -= 1.0
+            probs /= len(batch)
+
+            row_ids = np.repeat(np.arange(len(batch)), ends - starts)
+            touched, inverse = np.unique(batch_columns, return_inverse=True)
+            grad = np.zeros((len(touched), len(LABELS)))
+            np.add.at(grad, inverse, probs[row_ids] * batch_values[:, None])
+            grad += l2 * weights[touched]
+
+            grad_sq[touched] += grad ** 2
+            weights[touched] -= learning_rate * grad / np.sqrt(grad_sq[touched])
+            bias_grad = probs.sum(axis=0)
+            bias_sq += bias_grad ** 2
+            bias -= learning_rate * bias_grad / np.sqrt(bias_sq)
+
+    return {"weights": weights, "bias": bias, "labels": LABELS, "hash_bits": hash_bits}
+
+
+def predict_proba(model, spec):
+    """Return {label: probability} for one spec."""
+    columns, values = featurize(spec, model["hash_bits"])
+    logits = model["bias"] + values @ model["weights"][columns]
+    probs = _softmax(logits[None, :])[0]
+    return {label: float(p) for label, p in zip(model["labels"], probs)}
+
+
+def predict(model, specs):
+    """Return the predicted label for each spec (vectorized over the batch)."""
+    indptr, columns, values = _design_matrix(specs, model["hash_bits"])
+    logits = _logits(model["weights"], model["bias"], indptr, columns, values)
+    return [model["labels"][i] for i in logits.argmax(axis=1)]
+
+
+def save_model(model, path):
+    """Write the model as compressed .npz (weights stored as float16)."""
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "wb") as f:
+        np.savez_compressed(
+            f,
+            weights=model["weights"].astype(np.float16),
+            bias=model["bias"],
+            labels=np.asarray(model["labels"]),
+            hash_bits=np.asarray(model["hash_bits"]),
+        )
+
+
+def load_model(path=None):
+    """Load a model written by save_model.
+
+    Args:
+        path: Model file. Defaults to the COMPLEXITY_MODEL_PATH environment
+            variable, then models/complexity_model.npz.
+    """
+    path = path or os.environ.get("COMPLEXITY_MODEL_PATH") or DEFAULT_MODEL_PATH
+    with np.load(path) as data:
+        return {
+            "weights": data["weights"].astype(np.float64),
+            "bias": data["bias"],
+            "labels": tuple(str(label) for label in data["labels"]),
+            "hash_bits": int(data["hash_bits"]),
+        }
+
+
+def read_log(path):
+    """Read (spec, complexity) pairs from a JSON Lines decision log.
+
+    Lines without a spec or with an unknown label are skipped.
+    """
+    specs, labels = [], []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            spec = record.get("spec")
+            label = str(record.get("complexity", "")).upper()
+            if spec and label in LABELS:
+                specs.append(spec)
+                labels.append(label)
+    return specs, labels
+
+
+def evaluate(model, specs, labels):
+    """Compare predictions with the logged LLM labels.
+
+    Returns:
+        Dict with accuracy, confusion (rows: LLM label, columns: predicted,
+        in LABELS order), per-label precision/recall and mean inference
+        time per spec in ms.
+    """
+    start = time.perf_counter()
+    predicted = [max(p, key=p.get) for p in (predict_proba(model, spec) for spec in specs)]
+    per_spec_ms = (time.perf_counter() - start) * 1000 / max(len(specs), 1)
+
+    confusion = np.zeros((len(LABELS), len(LABELS)), dtype=np.int64)
+    for truth, guess in zip(labels, predicted):
+        confusion[LABELS.index(truth), LABELS.index(guess)] += 1
+
+    per_label = {}
+    for i, label in enumerate(LABELS):
+        predicted_as = confusion[:, i].sum()
+        actual = confusion[i].sum()
+        per_label[label] = {
+            "precision": confusion[i, i] / predicted_as if predicted_as else 0.0,
+            "recall": confusion[i, i] / actual if actual else 0.0,
+        }
+    return {
+        "accuracy": np.trace(confusion) / max(len(labels), 1),
+        "confusion": confusion,
+        "per_label": per_label,
+        "inference_ms": per_spec_ms,
+    }
+
+
+def format_report(report):
+    """Render an evaluate() result as text."""
+    width = max(len(label) for label in LABELS) + 2
+    lines = [
+        f"Accuracy: {report['accuracy']:.1%}  |  inference: {report['inference_ms']:.3f} ms/spec",
+        "",
+        "Confusion matrix (rows: LLM label, columns: predicted)",
+        " " * width + "".join(f"{label:>{width}}" for label in LABELS),
+    ]
+    for label, row in zip(LABELS, report["confusion"]):
+        lines.append(f"{label:<{width}}" + "".join(f"{n:>{width}}" for n in row))
+    lines.append("")
+    for label, scores in report["per_label"].items():
+        lines.append(f"{label:<{width}} precision {scores['precision']:.1%}  recall {scores['recall']:.1%}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train or evaluate the local complexity model.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    train_cmd = sub.add_parser("train", help="Fit a model on a JSONL decision log.")
+    train_cmd.add_argument("log_path")
+    train_cmd.add_argument("model_path")
+    train_cmd.add_argument("--holdout", type=float, default=0.2,
+                           help="Share of the log held out for the evaluation report.")
+    train_cmd.add_argument("--epochs", type=int, default=15)
+    train_cmd.add_argument("--hash-bits", type=int, default=HASH_BITS)
+    eval_cmd = sub.add_parser("eval", help="Evaluate a saved model on a JSONL decision log.")
+    eval_cmd.add_argument("log_path")
+    eval_cmd.add_argument("model_path")
+    args = parser.parse_args()
+
+    specs, labels = read_log(args.log_path)
+    if args.command == "train":
+        pairs = list(zip(specs, labels))
+        random.Random(0).shuffle(pairs)
+        n_holdout = int(len(pairs) * args.holdout)
+        holdout, training = pairs[:n_holdout], pairs[n_holdout:]
+        start = time.perf_counter()
+        model = train([s for s, _ in training], [l for _, l in training],
+                      hash_bits=args.hash_bits, epochs=args.epochs)
+        save_model(model, args.model_path)
+        print(f"Trained on {len(training)} specs in {time.perf_counter() - start:.1f}s; "
+              f"wrote {args.model_path} ({os.path.getsize(args.model_path) / 1024:.0f} KB)")
+        if holdout:
+            print(f"\nHeld-out evaluation ({len(holdout)} specs)")
+            print(format_report(evaluate(model, [s for s, _ in holdout], [l for _, l in holdout])))
+    else:
+        model = load_model(args.model_path)
+        print(f"Evaluation on {len(specs)} specs")
+        print(format_report(evaluate(model, specs, labels)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""Token-budgeted packing of the spec and product facts for the proposal prompt.
+
+The proposal prompt's variable part is the customer spec plus the matched
+products' context. pack_context() fits both into a per-model token budget
+(CONTEXT_TOKEN_BUDGETS), so prefill time and input cost stay bounded for
+long uploads such as multi-page PDFs:
+
+- Every product keeps its header (name, ID, category, match score and the
+  requested values it covers); headers are never dropped.
+- The spec gets up to SPEC_SHARE of the budget, or whatever the products
+  leave. If it does not fit, its sentences are ranked (requested values and
+  capability keywords first, then words shared with the matched products'
+  applications and categories) and the lowest ranked are dropped; the rest
+  keep their order, with "[...]" marking each gap. Repeated sentences
+  (page headers and footers) are dropped first, and a best sentence longer
+  than the whole budget is cut short.
+- The products' applications and features (at most MAX_ATTRIBUTES_PER_FIELD
+  each) fill the remaining budget, best first: higher match score, words
+  shared with the spec, earlier in the catalog list.
+
+Short specs fit every budget and are sent unchanged.
+"""
+
+import re
+from functools import lru_cache
+
+from utils.spec_parser import parse_spec
+from utils.token_estimator import count_tokens
+
+# Tokens for the spec plus product context, per proposal model.
+CONTEXT_TOKEN_BUDGETS = {
+    "gpt-5-nano": 1000,
+    "gpt-5-mini": 2000,
+    "claude-sonnet-4-20250514": 4000,
+}
+DEFAULT_CONTEXT_TOKEN_BUDGET = 2000
+
+SPEC_SHARE = 0.6
+MAX_ATTRIBUTES_PER_FIELD = 3
+GAP_MARKER = "[...]"
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?;])\s+|\s*\n\s*")
+_WORD = re.compile(r"[a-z][a-z0-9-]{2,}")
+_STOPWORDS = frozenset(
+    "the and for with from that this are our your you will can should must have has not all any "
+    "per via into over under more less than use used using need needs required require".split()
+)
+
+
+def context_budget(model):
+    """Token budget for the spec and product context sent to model."""
+    return CONTEXT_TOKEN_BUDGETS.get(model, DEFAULT_CONTEXT_TOKEN_BUDGET)
+
+
+def content_words(text):
+    """Set of lowercased words of at least three letters, without stopwords."""
+    return {w for w in _WORD.findall(text.lower()) if w not in _STOPWORDS}
+
+
+def spec_sentences(text):
+    """Split spec text into sentences and lines (PDF text breaks lines mid-paragraph too)."""
+    return [s for s in _SENTENCE_SPLIT.split(text.strip()) if s]
+
+
+def _sentence_score(sentence, vocabulary):
+    """Rank key of one spec sentence: requested values, keywords, shared words."""
+    features = parse_spec(sentence)
+    values = (len(features.wavelengths_nm) + len(features.power_mw) + len(features.power_w)
+              + len(features.thz_values) + len(features.noise_limits_percent))
+    shared = len(content_words(sentence) & vocabulary)
+    return 3 * values + 2 * len(features.flags) + min(shared, 3)
+
+
+@lru_cache(maxsize=64)
+def _ranked_sentences(spec_text, vocabulary):
+    """Return (sentences, token costs, indices best first); repeats of a sentence are left out."""
+    sentences = spec_sentences(spec_text)
+    costs = [count_tokens(s) + 1 for s in sentences]
+    seen, keys = set(), []
+    for i, sentence in enumerate(sentences):
+        folded = " ".join(sentence.lower().split())
+        if folded not in seen:
+            seen.add(folded)
+            keys.append((-(_sentence_score(sentence, vocabulary) + (1 if i == 0 else 0)), i))
+    return sentences, costs, [i for _, i in sorted(keys)]
+
+
+def _truncate(text, budget_tokens):
+    """Longest prefix of text within budget_tokens, cut at a word boundary if there is one."""
+    low, high = 0, len(text)
+    while low < high:
+        mid = (low + high + 1) // 2
+        if count_tokens(text[:mid]) <= budget_tokens:
+            low = mid
+        else:
+            high = mid - 1
+    prefix = text[:low]
+    if low < len(text) and " " in prefix.strip():
+        prefix = prefix.rsplit(" ", 1)[0]
+    return prefix.rstrip()
+
+
+def pack_spec(spec_text, budget_tokens, vocabulary=frozenset()):
+    """Return (text, dropped sentences) fitting spec_text into budget_tokens.
+
+    The first sentence ranks above other sentences of equal score, so the
+    opening request line is kept. Repeats of a sentence (page headers and
+    footers of a PDF) are always dropped. If not even the best sentence
+    fits (e.g. an upload without punctuation or line breaks), it is cut
+    to the budget and ends with GAP_MARKER.
+    """
+    if count_tokens(spec_text) <= budget_tokens:
+        return spec_text, 0
+    sentences, costs, ranked = _ranked_sentences(spec_text, frozenset(vocabulary))
+    kept, used = {}, 0
+    for i in ranked:
+        if used + costs[i] <= budget_tokens:
+            kept[i] = sentences[i]
+            used += costs[i]
+    if not kept:
+        best = ranked[0]
+        cut = _truncate(sentences[best], budget_tokens - count_tokens(GAP_MARKER) - 1)
+        kept[best] = f"{cut} {GAP_MARKER}" if cut else GAP_MARKER
+    parts = []
+    for i, sentence in enumerate(sentences):
+        if i in kept:
+            parts.append(kept[i])
+        elif not parts or not parts[-1].endswith(GAP_MARKER):
+            parts.append(GAP_MARKER)
+    return " ".join(parts), len(sentences) - len(kept)
+
+
+def pack_products(headers, attributes, budget_tokens):
+    """Choose product attributes to append to the mandatory headers.
+
+    Args:
+        headers: One header line per product (always kept).
+        attributes: Per product, a list of (field, text, value) candidates.
+        budget_tokens: Tokens for headers and attributes together.
+
+    Returns:
+        (lines, dropped attributes): one line per product, its chosen
+        attributes grouped by field in their original order.
+    """
+    used = sum(count_tokens(h) for h in headers)
+    candidates = sorted(
+        ((value, p, i) for p, attrs in enumerate(attributes) for i, (_, _, value) in enumerate(attrs)),
+        key=lambda c: (-c[0], c[1], c[2]),
+    )
+    chosen, labelled = set(), set()
+    for _, p, i in candidates:
+        field, text, _ = attributes[p][i]
+        cost = count_tokens(text) + 1
+        if (p, field) not in labelled:
+            cost += count_tokens(f" | {field}:")
+        if used + cost <= budget_tokens:
+            chosen.add((p, i))
+            labelled.add((p, field))
+            used += cost
+    lines = []
+    for p, header in enumerate(headers):
+        fields = {}
+        for i, (field, text, _) in enumerate(attributes[p]):
+            if (p, i) in chosen:
+                fields.setdefault(field, []).append(text)
+        lines.append(header + "".join(f" | {field}: {', '.join(texts)}" for field, texts in fields.items()))
+    return lines, len(candidates) - len(chosen)
+
+
+def pack_context(spec_text, headers, attributes, budget_tokens, vocabulary=frozenset()):
+    """Fit the spec and the products' lines into budget_tokens.
+
+    Args:
+        spec_text: Customer spec.
+        headers, attributes: As in pack_products.
+        budget_tokens: Tokens for the spec and products together.
+        vocabulary: Words of the matched products, used to rank spec sentences.
+
+    Returns:
+        Dict with spec (packed text), product_lines, tokens (estimated
+        total), dropped_sentences and dropped_attributes.
+    """
+    header_tokens = sum(count_tokens(h) for h in headers)
+    wanted = header_tokens + sum(
+        count_tokens(text) + 1 for attrs in attributes for _, text, _ in attrs
+    )
+    spec_budget = budget_tokens - min(wanted, int(budget_tokens * (1 - SPEC_SHARE)))
+    spec, dropped_sentences = pack_spec(spec_text, max(spec_budget, 1), vocabulary)
+    spec_tokens = count_tokens(spec)
+    lines, dropped_attributes = pack_products(headers, attributes, budget_tokens - spec_tokens)
+    return {
+        "spec": spec,
+        "product_lines": lines,
+        "tokens": spec_tokens + sum(count_tokens(line) for line in lines),
+        "dropped_sentences": dropped_sentences,
+        "dropped_attributes": dropped_attributes,
+    }
@@ -37,37 +37,164 @@ def build_comparison_table(total_input_tokens, total_output_tokens):
     return rows
 
 
-def build_savings_summary(
-    classifier_model,
-    classifier_input_tokens,
-    classifier_output_tokens,
-    proposal_model,
-    proposal_input_tokens,
-    proposal_output_tokens,
-):
+def build_savings_summary(classifier_model, classification, proposal_model, proposal, batch=False):
     """Build comprehensive savings summary for the token economy dashboard.
 
+    Args:
+        classifier_model: Model the classification is priced at.
+        classification: Classifier result (tokens, cache_read_tokens, from_cache).
+        proposal_model: Model the proposal is priced at.
+        proposal: Proposal result (tokens, cache tokens and its reuse,
+            speculation and cascade records, see agents.pipeline).
+        batch: Calls were made through the batch APIs (see agents.batch).
+
     Returns dict with all cost breakdowns and savings metrics.
     """
-    classifier_cost = calculate_cost(
-        classifier_model, classifier_input_tokens, classifier_output_tokens
-    )
-    proposal_cost = calculate_cost(
-        proposal_model, proposal_input_tokens, proposal_output_tokens
-    )
-    actual_total_cost = classifier_cost + proposal_cost
+    summary = _call_costs(classifier_model, classification, proposal_model, proposal, batch)
+    summary.update(_reuse_savings(proposal))
+    summary.update(_speculation_savings(proposal))
+    summary.update(_cascade_savings(proposal, summary["proposal_cost"]))
+    summary["actual_total_cost"] += summary["speculation_wasted_cost"] + summary["cascade_escalation_cost"]
+    summary.update(calculate_savings(
+        summary["actual_total_cost"], summary["total_input_tokens"], summary["total_output_tokens"],
+        batch=batch, cache_read_tokens=summary["cache_read_tokens"],
+        cache_write_tokens=summary["cache_write_tokens"],
+    ))
+    return summary
 
-    total_input = classifier_input_tokens + proposal_input_tokens
-    total_output = classifier_output_tokens + proposal_output_tokens
 
-    savings = calculate_savings(actual_total_cost, total_input, total_output)
+def _call_costs(classifier_model, classification, proposal_model, proposal, batch):
+    """Cost and tokens of the classifier and proposal calls.
+
+    A classification served from the cache costs nothing; the cost it would
+    have had is classifier_cache_savings. batch_savings and
+    prompt_cache_savings are the differences to interactive rates and to
+    full input prices (negative when cache writes cost more than the reads
+    saved).
+    """
+    from_cache = classification.get("from_cache", False)
+    classifier_tokens = [classification.get(key, 0) for key in ("input_tokens", "output_tokens", "cache_read_tokens")]
+    classifier_cache_savings = 0.0
+    if from_cache:
+        classifier_cache_savings = calculate_cost(
+            classifier_model, classifier_tokens[0], classifier_tokens[1], cache_read_tokens=classifier_tokens[2],
+        )
+        classifier_tokens = [0, 0, 0]
+    classifier_input, classifier_output, classifier_cache_read = classifier_tokens
+    proposal_input = proposal.get("input_tokens", 0)
+    proposal_output = proposal.get("output_tokens", 0)
+    proposal_cache_read = proposal.get("cache_read_tokens", 0)
+    proposal_cache_write = proposal.get("cache_write_tokens", 0)
+
+    def costs(batch_rates, cached_rates):
+        return (
+            calculate_cost(classifier_model, classifier_input, classifier_output, batch=batch_rates,
+                           cache_read_tokens=classifier_cache_read if cached_rates else 0),
+            calculate_cost(proposal_model, proposal_input, proposal_output, batch=batch_rates,
+                           cache_read_tokens=proposal_cache_read if cached_rates else 0,
+                           cache_write_tokens=proposal_cache_write if cached_rates else 0),
+        )
 
+    classifier_cost, proposal_cost = costs(batch, True)
+    actual_total_cost = classifier_cost + proposal_cost
     return {
         "classifier_cost": classifier_cost,
+        "classifier_from_cache": from_cache,
+        "classifier_cache_savings": classifier_cache_savings,
+        "batch": batch,
+        "batch_savings": sum(costs(False, True)) - actual_total_cost if batch else 0.0,
         "proposal_cost": proposal_cost,
         "actual_total_cost": actual_total_cost,
-        "total_input_tokens": total_input,
-        "total_output_tokens": total_output,
-        "total_tokens": total_input + total_output,
-        **savings,
+        "total_input_tokens": classifier_input + proposal_input,
+        "total_output_tokens": classifier_output + proposal_output,
+        "total_tokens": classifier_input + proposal_input + classifier_output + proposal_output,
+        "cache_read_tokens": classifier_cache_read + proposal_cache_read,
+        "cache_write_tokens": proposal_cache_write,
+        "prompt_cache_savings": sum(costs(batch, False)) - actual_total_cost,
+    }
+
+
+def _reuse_savings(proposal):
+    """Cost avoided by reusing the proposal of a near-duplicate spec."""
+    return {"reuse_savings": proposal.get("reuse", {}).get("cost_saved", 0.0)}
+
+
+def _speculation_savings(proposal):
+    """Tokens and cost a speculation miss wasted, latency a hit saved."""
+    speculation = proposal.get("speculation", {})
+    return {
+        "speculation_wasted_tokens": (
+            speculation.get("wasted_input_tokens", 0) + speculation.get("wasted_output_tokens", 0)
+        ),
+        "speculation_wasted_cost": speculation.get("wasted_cost", 0.0),
+        "speculation_latency_saved_ms": speculation.get("latency_saved_ms", 0.0),
     }
+
+
+def _cascade_savings(proposal, proposal_cost):
+    """Rejected drafts' tokens and cost, and the savings against calling the routed model directly."""
+    cascade = proposal.get("cascade", {})
+    escalation_cost = cascade.get("escalation_cost", 0.0)
+    direct_cost = cascade.get("direct_cost")
+    return {
+        "cascade_escalation_tokens": cascade.get("escalation_tokens", 0),
+        "cascade_escalation_cost": escalation_cost,
+        "cascade_savings": direct_cost - proposal_cost - escalation_cost if direct_cost is not None else 0.0,
+    }
+
+
+def _proposal_spend(result):
+    """(tokens, cost) of a pipeline run's proposal, including rejected cascade drafts."""
+    proposal = result["proposal"]
+    cascade = proposal.get("cascade", {})
+    tokens = proposal.get("input_tokens", 0) + proposal.get("output_tokens", 0)
+    cost = calculate_cost(
+        proposal.get("model", result["routing"]["selected_model"]),
+        proposal.get("input_tokens", 0), proposal.get("output_tokens", 0),
+        cache_read_tokens=proposal.get("cache_read_tokens", 0),
+        cache_write_tokens=proposal.get("cache_write_tokens", 0),
+    )
+    return tokens + cascade.get("escalation_tokens", 0), cost + cascade.get("escalation_cost", 0.0)
+
+
+def build_cascade_report(direct_runs, cascade_runs):
+    """Compare proposal spend of a corpus replayed with direct routing and with the cascade.
+
+    Args:
+        direct_runs: agents.pipeline results with cascade off.
+        cascade_runs: Results for the same specs, in the same order, with
+            cascade=True.
+
+    Returns:
+        Dict with requests, cascaded (requests drafted below their routed
+        tier), first_draft_accepted, escalations, escalation_rate (of the
+        cascaded requests), direct_tokens, cascade_tokens, direct_cost,
+        cascade_cost, savings, savings_pct and by_complexity ({tier:
+        {requests, direct_cost, cascade_cost}}). Classifier calls are left
+        out; they are the same in both.
+    """
+    report = {"requests": len(cascade_runs), "cascaded": 0, "first_draft_accepted": 0, "escalations": 0,
+              "direct_tokens": 0, "cascade_tokens": 0, "direct_cost": 0.0, "cascade_cost": 0.0,
+              "by_complexity": {}}
+    for direct, cascaded in zip(direct_runs, cascade_runs):
+        direct_tokens, direct_cost = _proposal_spend(direct)
+        cascade_tokens, cascade_cost = _proposal_spend(cascaded)
+        cascade = cascaded["proposal"].get("cascade")
+        if cascade is not None:
+            report["cascaded"] += 1
+            report["escalations"] += cascade["escalations"]
+            report["first_draft_accepted"] += int(cascade["escalations"] == 0 and cascade["accepted"])
+        report["direct_tokens"] += direct_tokens
+        report["cascade_tokens"] += cascade_tokens
+        report["direct_cost"] += direct_cost
+        report["cascade_cost"] += cascade_cost
+        tier = report["by_complexity"].setdefault(
+            direct["routing"]["complexity"], {"requests": 0, "direct_cost": 0.0, "cascade_cost": 0.0}
+        )
+        tier["requests"] += 1
+        tier["direct_cost"] += direct_cost
+        tier["cascade_cost"] += cascade_cost
+    report["escalation_rate"] = report["escalations"] / report["cascaded"] if report["cascaded"] else 0.0
+    report["savings"] = report["direct_cost"] - report["cascade_cost"]
+    report["savings_pct"] = report["savings"] / report["direct_cost"] * 100 if report["direct_cost"] else 0.0
+    return report
@@ -0,0 +1,242 @@
+"""Incremental, fault-tolerant parser for a JSON object arriving in chunks.
+
+Built for streamed LLM output such as the proposal JSON. feed() scans
+only the new text and returns every top-level field whose value has just
+been completed, so callers can act on e.g. "product_matches" while the
+long "proposal_text" is still streaming. partial() decodes the field that
+is still open, and finish() returns all fields with the open one repaired.
+
+Tolerated: prose or code fences before the object, anything after its
+closing brace, a missing comma between fields, and truncation anywhere
+(open strings are closed, incomplete array items and object members are
+dropped, brackets are closed).
+"""
+
+import json
+
+_CLOSERS = {"{": "}", "[": "]"}
+
+
+class IncrementalJSONParser:
+    """Streaming parser for the top-level fields of one JSON object.
+
+    Usage:
+        parser = IncrementalJSONParser()
+        for chunk in stream:
+            for name, value in parser.feed(chunk):
+                ...
+        result = parser.finish()
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._state = "start"
+        self._key_start = 0
+        self._key = None
+        self._value_start = 0
+        self._stack = []
+        self._in_string = False
+        self._escaped = False
+        # Inside an open value: offsets of its "," characters and the open
+        # brackets at that point; truncated values are cut back to these.
+        self._cut_points = []
+        self.fields = {}
+        self.repaired = False
+
+    @property
+    def complete(self):
+        """True once the object's closing brace has been read."""
+        return self._state == "end"
+
+    def feed(self, text):
+        """Add a chunk of output; return [(name, value)] of newly completed fields."""
+        self._buffer += text
+        completed = []
+        buffer = self._buffer
+        i = self._pos
+        while i < len(buffer) and self._state != "end":
+            char = buffer[i]
+            state = self._state
+            if state == "start":
+                if char == "{":
+                    self._state = "key"
+            elif state in ("key", "after_value"):
+                if char == '"':
+                    self._key_start = i
+                    self._state = "key_string"
+                elif char == "}":
+                    self._state = "end"
+            elif state == "key_string":
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._key = _loads(buffer[self._key_start:i + 1])
+                    self._state = "colon"
+            elif state == "colon":
+                if char == ":":
+                    self._state = "value_start"
+            elif state == "value_start":
+                if not char.isspace():
+                    self._value_start = i
+                    self._stack, self._cut_points = [], []
+                    self._in_string = self._escaped = False
+                    self._state = "value"
+                    continue
+            elif state == "value":
+                ended = self._value_char(char, i)
+                if ended == "closed":
+                    self._complete_value(buffer[self._value_start:i + 1], completed)
+                    self._state = "after_value"
+                elif ended:
+                    # A scalar ended by the whitespace, "," or "}" after it.
+                    self._complete_value(buffer[self._value_start:i], completed)
+                    self._state = {"}": "end", ",": "key"}.get(char, "after_value")
+            i += 1
+        self._pos = i
+        return completed
+
+    def _value_char(self, char, i):
+        """Advance the open value by one character.
+
+        Returns "closed" when char closes a top-level string or container,
+        "after" when char is the delimiter after a scalar (true, 12, ...),
+        else None.
+        """
+        if self._in_string:
+            if self._escaped:
+                self._escaped = False
+            elif char == "\\":
+                self._escaped = True
+            elif char == '"':
+                self._in_string = False
+                if not self._stack:
+                    return "closed"
+            return None
+        if not self._stack and self._buffer[self._value_start] not in '"{[':
+            return "after" if char.isspace() or char in ",}" else None
+        if char == '"':
+            self._in_string = True
+        elif char in _CLOSERS:
+            self._stack.append(char)
+        elif char in "]}":
+            self._stack.pop()
+            if not self._stack:
+                return "closed"
+        elif char == ",":
+            self._cut_points.append((i - self._value_start, tuple(self._stack)))
+        return None
+
+    def _complete_value(self, text, completed):
+        value = _loads(text.strip())
+        if value is _INVALID:
+            value = _repair(text)
+            if value is _INVALID:
+                return
+            self.repaired = True
+        self.fields[self._key] = value
+        completed.append((self._key, value))
+
+    def partial(self, name):
+        """Return field name: its value if complete, else the repaired open value (or None)."""
+        if name in self.fields:
+            return self.fields[name]
+        if self._state != "value" or self._key != name:
+            return None
+        value = _repair(self._buffer[self._value_start:self._pos], (
+            self._in_string, self._escaped, self._stack, self._cut_points
+        ))
+        return None if value is _INVALID else value
+
+    def finish(self):
+        """Return all fields read so far, repairing a value cut off by truncation."""
+        if self._state == "value":
+            value = self.partial(self._key)
+            if value is not None:
+                self.fields[self._key] = value
+            self.repaired = True
+        elif self._state not in ("end", "start"):
+            self.repaired = True
+        return dict(self.fields)
+
+
+_INVALID = object()
+
+
+def _loads(text):
+    try:
+        return json.loads(text)
+    except ValueError:
+        return _INVALID
+
+
+def _repair(text, scan=None):
+    """Close a truncated JSON value, cutting back to earlier commas if needed.
+
+    scan is _scan(text) when the caller already tracked it.
+    """
+    in_string, escaped, stack, cut_points = scan or _scan(text)
+    if in_string:
+        if escaped:
+            text = text[:-1]
+        # Drop a \\u escape cut off before its four hex digits.
+        backslash = text.rfind("\\u", max(0, len(text) - 5))
+        if backslash != -1:
+            text = text[:backslash]
+        text += '"'
+    else:
+        text = text.rstrip()
+    value = _loads(text + "".join(_CLOSERS[b] for b in reversed(stack)))
+    if value is not _INVALID:
+        return value
+    for cut, open_brackets in reversed(cut_points):
+        value = _loads(text[:cut] + "".join(_CLOSERS[b] for b in reversed(open_brackets)))
+        if value is not _INVALID:
+            return value
+    # Nothing inside the first element survived: return the empty container.
+    if text[:1] in _CLOSERS:
+        return json.loads(text[0] + _CLOSERS[text[0]])
+    return _INVALID
+
+
+def _scan(text):
+    """Return (in_string, escaped, open brackets, cut points) at the end of text."""
+    in_string = escaped = False
+    stack, cut_points = [], []
+    for i, char in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in _CLOSERS:
+            stack.append(char)
+        elif char in "]}" and stack:
+            stack.pop()
+        elif char == "," and stack:
+            cut_points.append((i, tuple(stack)))
+    return in_string, escaped, stack, cut_points
+
+
+def parse_json_object(text):
+    """Parse a JSON object from model output, repairing it if needed.
+
+    Returns:
+        (fields, repaired): the object's top-level fields ({} if no object
+        was found) and whether anything had to be repaired or skipped.
+    """
+    try:
+        value = json.loads(text)
+        if isinstance(value, dict):
+            return value, False
+    except ValueError:
+        pass
+    parser = IncrementalJSONParser()
+    parser.feed(text)
+    return parser.finish(), True
@@ -0,0 +1,222 @@
+"""Process-wide registry of pooled OpenAI and Anthropic clients.
+
+Every agent gets its client from LLM_CLIENTS instead of constructing one per
+call, so requests reuse keep-alive connections instead of paying a fresh
+TCP/TLS handshake each time. Each client owns the SDK's default httpx
+connection pool, with configurable limits and timeouts.
+
+Async clients are bound to the event loop they are used on (httpx pools
+cannot cross loops). The registry therefore runs a persistent background
+event loop: run() executes coroutines on it, so the async pools survive
+across blocking calls such as agents.pipeline.run_pipeline.
+
+warm_up() opens pooled connections before the first user request.
+
+openai_cache_tokens() and anthropic_input_tokens() read the prompt-cache
+counters from the two SDKs' usage objects.
+
+Settings can be overridden with the LLM_POOL_MAX_CONNECTIONS,
+LLM_POOL_MAX_KEEPALIVE, LLM_REQUEST_TIMEOUT_S and LLM_CONNECT_TIMEOUT_S
+environment variables. OPENAI_BASE_URL / ANTHROPIC_BASE_URL, honoured by
+the SDKs, point the clients at a local stand-in (see
+benchmarks/fake_llm_server.py).
+"""
+
+import asyncio
+import importlib
+import os
+import threading
+import time
+import weakref
+
+POOL_MAX_CONNECTIONS = int(os.environ.get("LLM_POOL_MAX_CONNECTIONS", 20))
+POOL_MAX_KEEPALIVE = int(os.environ.get("LLM_POOL_MAX_KEEPALIVE", 10))
+KEEPALIVE_EXPIRY_S = 120.0
+REQUEST_TIMEOUT_S = float(os.environ.get("LLM_REQUEST_TIMEOUT_S", 60))
+CONNECT_TIMEOUT_S = float(os.environ.get("LLM_CONNECT_TIMEOUT_S", 5))
+MAX_RETRIES = 2
+
+PROVIDERS = ("openai", "anthropic")
+
+
+class LLMClientRegistry:
+    """Lazily created, shared SDK clients with keep-alive connection pools.
+
+    Args:
+        max_connections: Connection limit per client.
+        max_keepalive: Idle connections kept open per client.
+        keepalive_expiry: Seconds an idle connection stays open.
+        timeout: Request timeout in seconds.
+        connect_timeout: Connect timeout in seconds.
+        max_retries: SDK retry count.
+        base_urls: Optional {provider: base URL}; defaults to the SDK's own
+            (which honours OPENAI_BASE_URL / ANTHROPIC_BASE_URL).
+    """
+
+    def __init__(self, max_connections=POOL_MAX_CONNECTIONS, max_keepalive=POOL_MAX_KEEPALIVE,
+                 keepalive_expiry=KEEPALIVE_EXPIRY_S, timeout=REQUEST_TIMEOUT_S,
+                 connect_timeout=CONNECT_TIMEOUT_S, max_retries=MAX_RETRIES, base_urls=None):
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.max_retries = max_retries
+        self.base_urls = dict(base_urls or {})
+        self._lock = threading.Lock()
+        self._clients = {}
+        self._async_clients = weakref.WeakKeyDictionary()
+        self._loop = None
+        self._warm_up_started = False
+        self._counts = {"clients_created": 0, "warm_up_connections": 0, "warm_up_errors": 0}
+        self.last_warm_up_ms = None
+
+    def _create(self, provider, is_async):
+        if provider == "openai":
+            import openai as sdk
+
+            client_class = sdk.AsyncOpenAI if is_async else sdk.OpenAI
+        elif provider == "anthropic":
+            import anthropic as sdk
+
+            client_class = sdk.AsyncAnthropic if is_async else sdk.Anthropic
+        else:
+            raise ValueError(f"Unknown provider {provider!r}; expected one of {PROVIDERS}")
+
+        http_class = sdk.DefaultAsyncHttpxClient if is_async else sdk.DefaultHttpxClient
+        timeout = sdk.Timeout(self.timeout, connect=self.connect_timeout)
+        http_client = http_class(limits=self._limits(http_class), timeout=timeout)
+        kwargs = {"http_client": http_client, "timeout": timeout, "max_retries": self.max_retries}
+        if self.base_urls.get(provider):
+            kwargs["base_url"] = self.base_urls[provider]
+        self._counts["clients_created"] += 1
+        return client_class(**kwargs), http_client
+
+    def _limits(self, http_class):
+        """Pool limits from the httpx package the SDK's HTTP client is built on."""
+        httpx_module = importlib.import_module(http_class.__mro__[1].__module__.partition(".")[0])
+        return httpx_module.Limits(
+            max_connections=self.max_connections,
+            max_keepalive_connections=self.max_keepalive,
+            keepalive_expiry=self.keepalive_expiry,
+        )
+
+    def client(self, provider):
+        """Return the shared synchronous client for provider."""
+        with self._lock:
+            if provider not in self._clients:
+                self._clients[provider] = self._create(provider, is_async=False)
+            return self._clients[provider][0]
+
+    def async_client(self, provider):
+        """Return the async client for provider bound to the running event loop."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            clients = self._async_clients.setdefault(loop, {})
+            if provider not in clients:
+                clients[provider] = self._create(provider, is_async=True)
+            return clients[provider][0]
+
+    def _background_loop(self):
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="llm-clients-loop", daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coro):
+        """Run coro on the registry's event loop and return its result (blocking).
+
+        Use instead of asyncio.run so async clients and their pooled
+        connections are reused across calls.
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self._background_loop()).result()
+
+    def warm_up(self, providers=PROVIDERS, background=True):
+        """Open a pooled connection per provider before the first request.
+
+        Warms the synchronous clients and the async clients on the
+        registry loop with a cheap HEAD request to each base URL (the
+        response status does not matter, the connection stays in the pool).
+        Only the first call does anything.
+
+        Args:
+            providers: Providers to warm up.
+            background: Run in a daemon thread and return immediately.
+
+        Returns:
+            The warm-up thread when background, else None.
+        """
+        with self._lock:
+            if self._warm_up_started:
+                return None
+            self._warm_up_started = True
+        if background:
+            thread = threading.Thread(target=self._warm_up, args=(providers,), name="llm-warm-up", daemon=True)
+            thread.start()
+            return thread
+        self._warm_up(providers)
+        return None
+
+    def _warm_up(self, providers):
+        start = time.perf_counter()
+        for provider in providers:
+            try:
+                client = self.client(provider)
+                self._clients[provider][1].head(str(client.base_url))
+                self._counts["warm_up_connections"] += 1
+            except Exception:
+                self._counts["warm_up_errors"] += 1
+            try:
+                self.run(self._warm_up_async(provider))
+                self._counts["warm_up_connections"] += 1
+            except Exception:
+                self._counts["warm_up_errors"] += 1
+        self.last_warm_up_ms = round((time.perf_counter() - start) * 1000, 1)
+
+    async def _warm_up_async(self, provider):
+        client = self.async_client(provider)
+        http_client = self._async_clients[asyncio.get_running_loop()][provider][1]
+        await http_client.head(str(client.base_url))
+
+    def stats(self):
+        """Return client and warm-up counters."""
+        with self._lock:
+            return {
+                **self._counts,
+                "sync_clients": len(self._clients),
+                "async_loops": len(self._async_clients),
+                "last_warm_up_ms": self.last_warm_up_ms,
+            }
+
+    def close(self):
+        """Close the synchronous clients (async pools close with their loop)."""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+            self._warm_up_started = False
+        for _, http_client in clients.values():
+            http_client.close()
+
+
+LLM_CLIENTS = LLMClientRegistry()
+
+
+def openai_cache_tokens(usage):
+    """Return the prompt tokens an OpenAI call read from the prompt cache.
+
+    They are part of usage.prompt_tokens; OpenAI has no cache writes.
+    """
+    details = getattr(usage, "prompt_tokens_details", None)
+    return getattr(details, "cached_tokens", None) or 0
+
+
+def anthropic_input_tokens(usage):
+    """Return (input tokens, cache read tokens, cache write tokens) of an Anthropic call.
+
+    Anthropic counts cache reads and writes separately from input_tokens;
+    the returned input tokens include both, like OpenAI's prompt_tokens.
+    """
+    cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+    cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+    return usage.input_tokens + cache_read + cache_write, cache_read, cache_write
@@ -0,0 +1,68 @@
+"""Aho-Corasick automaton for matching many phrases in one pass over a text."""
+
+from collections import deque
+
+
+def build_phrase_matcher(phrases):
+    """Compile phrases into an Aho-Corasick automaton.
+
+    Args:
+        phrases: List of (already lowercased) phrases. A phrase's position in
+            the list is its ID.
+
+    Returns:
+        Dict with goto (per-state transition dicts), fail (failure links) and
+        outputs (per-state IDs of all phrases ending there, following the
+        failure chain).
+    """
+    goto = [{}]
+    outputs = [[]]
+
+    for phrase_id, phrase in enumerate(phrases):
+        state = 0
+        for ch in phrase:
+            nxt = goto[state].get(ch)
+            if nxt is None:
+                nxt = len(goto)
+                goto.append({})
+                outputs.append([])
+                goto[state][ch] = nxt
+            state = nxt
+        outputs[state].append(phrase_id)
+
+    fail = [0] * len(goto)
+    queue = deque(goto[0].values())
+    while queue:
+        state = queue.popleft()
+        for ch, nxt in goto[state].items():
+            queue.append(nxt)
+            f = fail[state]
+            while f and ch not in goto[f]:
+                f = fail[f]
+            fail[nxt] = goto[f].get(ch, 0)
+            if outputs[fail[nxt]]:
+                outputs[nxt] = outputs[nxt] + outputs[fail[nxt]]
+
+    return {"goto": goto, "fail": fail, "outputs": outputs}
+
+
+def match_phrases(matcher, text):
+    """Return the IDs of all phrases occurring in text (substring semantics).
+
+    Runs in O(len(text) + hits) regardless of how many phrases were compiled.
+    """
+    goto = matcher["goto"]
+    fail = matcher["fail"]
+    outputs = matcher["outputs"]
+
+    hits = set()
+    emitted = set()
+    state = 0
+    for ch in text:
+        while state and ch not in goto[state]:
+            state = fail[state]
+        state = goto[state].get(ch, 0)
+        if outputs[state] and state not in emitted:
+            emitted.add(state)
+            hits.update(outputs[state])
+    return hits
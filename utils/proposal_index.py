@@ -0,0 +1,242 @@
+"""Near-duplicate lookup of earlier proposals (MinHash signatures + LSH buckets).
+
+Every generated proposal is stored with its spec in SQLite (WAL mode, shared
+by all app workers). Each spec is reduced to a MinHash signature of its word
+3-gram shingles (after utils.spec_parser.normalize_spec_text), so the share
+of equal signature positions estimates the Jaccard similarity of two specs.
+Signatures are split into LSH_BANDS bands; specs that agree on a whole band
+land in the same bucket, so a lookup only compares the handful of specs
+sharing a bucket instead of the whole history. With 16 bands of 8 rows,
+a pair at 0.8 similarity is found with ~95% probability, at 0.85 with >99%.
+
+Each worker keeps the signatures and buckets in memory and, before every
+lookup, loads rows added by other workers and drops rows deleted from the
+history. Lookups, hits and the tokens saved by
+reuse are counted in the database, so stats() covers all workers.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+import numpy as np
+
+from utils.spec_parser import normalize_spec_text
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "proposal_index.sqlite"
+)
+
+NUM_PERM = 128
+LSH_BANDS = 16
+SHINGLE_WORDS = 3
+REUSE_THRESHOLD = 0.8
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_rng = np.random.default_rng(20260214)
+_PERM_A = _rng.integers(1, _MERSENNE_PRIME, NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, _MERSENNE_PRIME, NUM_PERM, dtype=np.uint64)
+_ROWS = NUM_PERM // LSH_BANDS
+
+_STORED_FIELDS = ("product_matches", "feasibility_matrix", "proposal_text", "next_steps")
+
+
+def shingles(spec_text):
+    """Return the set of word 3-grams of the normalized spec."""
+    words = normalize_spec_text(spec_text).split()
+    if len(words) <= SHINGLE_WORDS:
+        return {" ".join(words)}
+    return {" ".join(words[i:i + SHINGLE_WORDS]) for i in range(len(words) - SHINGLE_WORDS + 1)}
+
+
+def minhash_signature(spec_text):
+    """Return the spec's MinHash signature (NUM_PERM uint32 values)."""
+    hashes = np.fromiter(
+        (zlib.crc32(s.encode("utf-8")) for s in shingles(spec_text)), dtype=np.uint64
+    ) % _MERSENNE_PRIME
+    return ((hashes[:, None] * _PERM_A + _PERM_B) % _MERSENNE_PRIME).min(axis=0).astype(np.uint32)
+
+
+def _band_keys(signature):
+    return [(band, signature[band * _ROWS:(band + 1) * _ROWS].tobytes()) for band in range(LSH_BANDS)]
+
+
+class ProposalIndex:
+    """SQLite-backed history of proposals with an in-memory LSH index.
+
+    Args:
+        path: Database file. Defaults to the PROPOSAL_INDEX_PATH environment
+            variable, then data/proposal_index.sqlite.
+        threshold: Minimum estimated similarity for find() to return a match.
+        max_entries: Proposals kept; beyond that the oldest are deleted.
+    """
+
+    def __init__(self, path=None, threshold=REUSE_THRESHOLD, max_entries=50_000):
+        self.path = path or os.environ.get("PROPOSAL_INDEX_PATH") or DEFAULT_INDEX_PATH
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self._conn = None
+        self._lock = threading.Lock()
+        self._signatures = {}
+        self._buckets = {}
+        self._loaded_id = 0
+
+    def _connection(self):
+        """Open the database on first use. Caller holds the lock."""
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS proposals ("
+                "id INTEGER PRIMARY KEY AUTOINCREMENT, spec TEXT NOT NULL, signature BLOB NOT NULL, "
+                "proposal TEXT NOT NULL, model TEXT NOT NULL, input_tokens INTEGER NOT NULL, "
+                "output_tokens INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)"
+            )
+            conn.execute(
+                "INSERT OR IGNORE INTO counters VALUES ('lookups', 0), ('hits', 0), ('tokens_saved', 0)"
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _sync(self, conn):
+        """Index rows added and forget rows deleted since the last sync (by any worker).
+
+        Caller holds the lock.
+        """
+        rows = conn.execute(
+            "SELECT id, signature FROM proposals WHERE id > ? ORDER BY id", (self._loaded_id,)
+        ).fetchall()
+        for row_id, blob in rows:
+            signature = np.frombuffer(blob, dtype=np.uint32)
+            self._signatures[row_id] = signature
+            for key in _band_keys(signature):
+                self._buckets.setdefault(key, []).append(row_id)
+            self._loaded_id = row_id
+        oldest = conn.execute("SELECT MIN(id) FROM proposals").fetchone()[0]
+        self._evict_below(self._loaded_id + 1 if oldest is None else oldest)
+
+    def _evict_below(self, oldest_id):
+        """Drop rows with an id below oldest_id from memory (deleted as the oldest)."""
+        evicted = []
+        for row_id in self._signatures:
+            if row_id >= oldest_id:
+                break
+            evicted.append(row_id)
+        for row_id in evicted:
+            for key in _band_keys(self._signatures.pop(row_id)):
+                bucket = self._buckets[key]
+                bucket.remove(row_id)
+                if not bucket:
+                    del self._buckets[key]
+
+    def _count(self, conn, name, n=1):
+        conn.execute("UPDATE counters SET value = value + ? WHERE name = ?", (n, name))
+
+    def find(self, spec_text, threshold=None):
+        """Return the most similar earlier proposal at or above the threshold, or None.
+
+        Returns:
+            Dict with id, spec, proposal (the stored proposal fields),
+            model, input_tokens, output_tokens (what generating it cost)
+            and similarity (estimated Jaccard similarity of the specs).
+        """
+        threshold = self.threshold if threshold is None else threshold
+        signature = minhash_signature(spec_text)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._sync(conn)
+                candidates = {row_id for key in _band_keys(signature) for row_id in self._buckets.get(key, ())}
+                ranked = sorted(
+                    ((float(np.mean(self._signatures[row_id] == signature)), row_id) for row_id in candidates),
+                    reverse=True,
+                )
+                row = None
+                # A row may have been deleted by another worker since the sync.
+                for best, best_id in ranked:
+                    if best < threshold:
+                        break
+                    row = conn.execute(
+                        "SELECT spec, proposal, model, input_tokens, output_tokens FROM proposals WHERE id = ?",
+                        (best_id,),
+                    ).fetchone()
+                    if row is not None:
+                        break
+                self._count(conn, "lookups")
+                if row is None:
+                    return None
+                self._count(conn, "hits")
+        spec, proposal, model, input_tokens, output_tokens = row
+        return {
+            "id": best_id,
+            "spec": spec,
+            "proposal": json.loads(proposal),
+            "model": model,
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "similarity": round(best, 3),
+        }
+
+    def add(self, spec_text, proposal):
+        """Store a generated proposal dict for spec_text; return its id."""
+        stored = {key: proposal.get(key) for key in _STORED_FIELDS}
+        signature = minhash_signature(spec_text)
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                row_id = conn.execute(
+                    "INSERT INTO proposals (spec, signature, proposal, model, input_tokens, output_tokens, "
+                    "created_at) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (spec_text, signature.tobytes(), json.dumps(stored), proposal.get("model", ""),
+                     proposal.get("input_tokens", 0), proposal.get("output_tokens", 0), time.time()),
+                ).lastrowid
+                conn.execute(
+                    "DELETE FROM proposals WHERE id <= ?", (row_id - self.max_entries,)
+                )
+        return row_id
+
+    def record_savings(self, tokens):
+        """Add tokens saved by reusing a proposal to the shared counter."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                self._count(conn, "tokens_saved", int(tokens))
+
+    def clear(self):
+        """Remove all proposals and reset the counters."""
+        with self._lock:
+            conn = self._connection()
+            with conn:
+                conn.execute("DELETE FROM proposals")
+                conn.execute("UPDATE counters SET value = 0")
+            self._signatures, self._buckets = {}, {}
+
+    def stats(self):
+        """Return entries, lookups, hits, hit rate and tokens saved (all workers)."""
+        with self._lock:
+            conn = self._connection()
+            counters = dict(conn.execute("SELECT name, value FROM counters"))
+            entries = conn.execute("SELECT COUNT(*) FROM proposals").fetchone()[0]
+        return {
+            **counters,
+            "entries": entries,
+            "hit_rate": counters["hits"] / counters["lookups"] if counters["lookups"] else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+PROPOSAL_INDEX = ProposalIndex()
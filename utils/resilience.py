@@ -0,0 +1,317 @@
+"""Deadlines, hedged requests and per-model circuit breakers for provider calls.
+
+- Deadline: an absolute time budget created at the pipeline entry point and
+  handed down to every agent call; within() derives a tighter per-stage
+  deadline from it.
+- Hedging: if a call has not finished after the recent p95 latency of that
+  model and kind of call (e.g. "classify", "proposal"), an identical second
+  request is sent and whichever finishes first wins
+  (the other is cancelled). At most one hedge per call, so the worst case
+  is two billed requests for a slow call.
+- Circuit breaker: after FAILURE_THRESHOLD consecutive failures a model's
+  breaker opens and calls fail fast with CircuitOpenError for
+  OPEN_INTERVAL_S; then a single trial call is let through (half-open) and
+  its outcome closes or re-opens the breaker.
+
+PROVIDER_HEALTH holds the breaker and latency history of every model and
+wraps calls (ProviderHealth.call / call_sync).
+"""
+
+import asyncio
+import threading
+import time
+from collections import deque
+
+FAILURE_THRESHOLD = 3
+OPEN_INTERVAL_S = 30.0
+HEDGE_PERCENTILE = 95
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY_S = 8.0
+HEDGE_MIN_DELAY_S = 0.05
+
+
+class DeadlineExceeded(TimeoutError):
+    """The call's deadline passed before it could finish."""
+
+
+class CircuitOpenError(RuntimeError):
+    """The model's circuit breaker is open; the call was not attempted."""
+
+
+class Deadline:
+    """Absolute deadline on a monotonic clock.
+
+    Args:
+        seconds: Time budget from now.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self._clock = clock
+        self.expires_at = clock() + seconds
+
+    def remaining(self):
+        """Seconds left (never negative)."""
+        return max(0.0, self.expires_at - self._clock())
+
+    def expired(self):
+        return self.remaining() <= 0.0
+
+    def within(self, seconds):
+        """Return a deadline at most seconds from now and never later than this one."""
+        child = Deadline(seconds, self._clock)
+        child.expires_at = min(child.expires_at, self.expires_at)
+        return child
+
+
+class CircuitBreaker:
+    """Closed / open / half-open breaker counting consecutive failures.
+
+    Args:
+        failure_threshold: Consecutive failures that open the breaker.
+        open_interval_s: Seconds the breaker stays open before a trial call.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, open_interval_s=OPEN_INTERVAL_S,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.open_interval_s = open_interval_s
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._trial_running = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return "closed"
+        if self._clock() - self._opened_at >= self.open_interval_s:
+            return "half_open"
+        return "open"
+
+    def allow(self):
+        """Return True if a call may be attempted now.
+
+        In the half-open state only one trial call is allowed at a time.
+        """
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial_running:
+                self._trial_running = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def release_trial(self):
+        """End a trial call that neither succeeded nor failed (e.g. it was cancelled)."""
+        with self._lock:
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or self._failures >= self.failure_threshold:
+                if self._state() != "open":
+                    self.times_opened += 1
+                self._opened_at = self._clock()
+            self._trial_running = False
+
+
+async def hedged(make_call, delay_s):
+    """Await make_call(); after delay_s without a result, race a second make_call().
+
+    Args:
+        make_call: Zero-argument callable returning a new awaitable.
+        delay_s: Hedge delay in seconds; None disables hedging.
+
+    Returns:
+        (result, hedge_fired, hedge_won). The first call to succeed wins; if
+        one attempt fails the other is still awaited, and the last error is
+        raised when both fail.
+    """
+    tasks = [asyncio.ensure_future(make_call())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay_s)
+        if done:
+            return tasks[0].result(), False, False
+
+        tasks.append(asyncio.ensure_future(make_call()))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result(), True, task is tasks[1]
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+class ProviderHealth:
+    """Per-model circuit breakers and latency history; wraps provider calls.
+
+    Args:
+        failure_threshold, open_interval_s: CircuitBreaker settings.
+        hedge_percentile: Latency percentile used as the hedge delay; None
+            disables hedging.
+        hedge_min_samples: Successful calls needed before the percentile is
+            trusted; until then hedge_default_delay_s is used.
+        max_samples: Latencies kept per model and kind of call.
+    """
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, open_interval_s=OPEN_INTERVAL_S,
+                 hedge_percentile=HEDGE_PERCENTILE, hedge_min_samples=HEDGE_MIN_SAMPLES,
+                 hedge_default_delay_s=HEDGE_DEFAULT_DELAY_S, max_samples=500, clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.open_interval_s = open_interval_s
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.hedge_default_delay_s = hedge_default_delay_s
+        self.max_samples = max_samples
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._breakers = {}
+        self._latencies = {}
+        self._counts = {}
+
+    def breaker(self, model):
+        with self._lock:
+            if model not in self._breakers:
+                self._breakers[model] = CircuitBreaker(self.failure_threshold, self.open_interval_s, self._clock)
+            return self._breakers[model]
+
+    def hedge_delay(self, model, kind="call"):
+        """Seconds to wait before hedging a call of kind to model (None: never)."""
+        if self.hedge_percentile is None:
+            return None
+        with self._lock:
+            samples = sorted(self._latencies.get((model, kind), ()))
+        if len(samples) < self.hedge_min_samples:
+            return self.hedge_default_delay_s
+        index = min(len(samples) - 1, int(len(samples) * self.hedge_percentile / 100))
+        return max(HEDGE_MIN_DELAY_S, samples[index])
+
+    def _count(self, model, name):
+        with self._lock:
+            counts = self._counts.setdefault(model, {
+                "calls": 0, "failures": 0, "rejected": 0, "deadline_exceeded": 0, "hedges": 0, "hedge_wins": 0,
+            })
+            counts[name] += 1
+
+    def _record_success(self, model, kind, seconds):
+        self.breaker(model).record_success()
+        if kind is None:
+            return
+        with self._lock:
+            self._latencies.setdefault((model, kind), deque(maxlen=self.max_samples)).append(seconds)
+
+    def _admit(self, model, deadline):
+        self._count(model, "calls")
+        if deadline is not None and deadline.expired():
+            self._count(model, "deadline_exceeded")
+            raise DeadlineExceeded(f"No time left to call {model}")
+        if not self.breaker(model).allow():
+            self._count(model, "rejected")
+            raise CircuitOpenError(f"Circuit open for {model}")
+
+    async def call(self, model, make_call, deadline=None, hedge=True, kind="call"):
+        """Run an async provider call under breaker, deadline and hedging.
+
+        Args:
+            model: Model ID the call goes to.
+            make_call: Zero-argument callable returning a new awaitable of
+                the provider call (called twice when a hedge fires).
+            deadline: Optional Deadline; the call is cancelled when it passes.
+            hedge: Send a hedged duplicate after hedge_delay(model, kind).
+            kind: Kind of call ("classify", "proposal", ...); latencies
+                and hedge delays are kept per model and kind.
+
+        A cancelled call counts neither as a success nor as a failure.
+
+        Raises:
+            CircuitOpenError: Breaker open, the call was not attempted.
+            DeadlineExceeded: The deadline passed before or during the call.
+            Exception: The provider error if all attempts failed.
+        """
+        self._admit(model, deadline)
+        start = time.perf_counter()
+        delay = self.hedge_delay(model, kind) if hedge else None
+        try:
+            result, hedge_fired, hedge_won = await asyncio.wait_for(
+                hedged(make_call, delay), deadline.remaining() if deadline is not None else None
+            )
+        except asyncio.TimeoutError:
+            self.breaker(model).record_failure()
+            self._count(model, "deadline_exceeded")
+            raise DeadlineExceeded(f"{model} did not answer within the deadline") from None
+        except Exception:
+            self.breaker(model).record_failure()
+            self._count(model, "failures")
+            raise
+        except BaseException:
+            self.breaker(model).release_trial()
+            raise
+        if hedge_fired:
+            self._count(model, "hedges")
+        if hedge_won:
+            self._count(model, "hedge_wins")
+        self._record_success(model, kind, time.perf_counter() - start)
+        return result
+
+    def call_sync(self, model, call, deadline=None, kind="call"):
+        """Run a blocking provider call under the breaker (no hedging).
+
+        The caller passes deadline.remaining() on as the request timeout.
+        kind is as for call(); None records no latency, for calls that only
+        open a stream.
+        """
+        self._admit(model, deadline)
+        start = time.perf_counter()
+        try:
+            result = call()
+        except Exception:
+            self.breaker(model).record_failure()
+            self._count(model, "failures")
+            raise
+        except BaseException:
+            self.breaker(model).release_trial()
+            raise
+        self._record_success(model, kind, time.perf_counter() - start)
+        return result
+
+    def stats(self):
+        """Return {model: counters, breaker state, times opened, hedge delay per kind of call}."""
+        with self._lock:
+            models = sorted(set(self._breakers) | set(self._counts))
+            counts = {model: dict(self._counts.get(model, {})) for model in models}
+            kinds = {model: sorted(k for m, k in self._latencies if m == model) for model in models}
+        return {
+            model: {
+                **counts[model],
+                "state": self.breaker(model).state,
+                "times_opened": self.breaker(model).times_opened,
+                "hedge_delay_s": {kind: self.hedge_delay(model, kind) for kind in kinds[model]},
+            }
+            for model in models
+        }
+
+
+PROVIDER_HEALTH = ProviderHealth()
@@ -0,0 +1,82 @@
+"""Bounded LRU + TTL cache for product search results.
+
+Entries expire ttl_seconds after they were stored and the least recently
+used entry is evicted once max_size is reached. The cache is tagged with
+the catalog version it holds results for; set_version drops everything when
+the catalog changes.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class SearchCache:
+    """Thread-safe LRU cache with per-entry expiry and hit/miss counters.
+
+    Args:
+        max_size: Maximum number of entries.
+        ttl_seconds: Entry lifetime; None disables expiry.
+        clock: Monotonic time source (injectable for tests).
+    """
+
+    def __init__(self, max_size=1024, ttl_seconds=600.0, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        self._counts = {"hits": 0, "misses": 0, "expired": 0, "evicted": 0, "invalidations": 0}
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss or expiry."""
+        with self._lock:
+            entry = self._items.get(key)
+            if entry is None:
+                self._counts["misses"] += 1
+                return None
+            value, expires_at = entry
+            if expires_at is not None and self._clock() >= expires_at:
+                del self._items[key]
+                self._counts["expired"] += 1
+                self._counts["misses"] += 1
+                return None
+            self._items.move_to_end(key)
+            self._counts["hits"] += 1
+            return value
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries."""
+        expires_at = None if self.ttl_seconds is None else self._clock() + self.ttl_seconds
+        with self._lock:
+            self._items[key] = (value, expires_at)
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+                self._counts["evicted"] += 1
+
+    def set_version(self, version):
+        """Drop all entries if version differs from the one the cache holds."""
+        with self._lock:
+            if version != self._version:
+                if self._items:
+                    self._counts["invalidations"] += 1
+                self._items.clear()
+                self._version = version
+
+    def clear(self):
+        """Drop all entries (counters are kept)."""
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        """Return counters, current size and hit rate."""
+        with self._lock:
+            lookups = self._counts["hits"] + self._counts["misses"]
+            return {
+                **self._counts,
+                "size": len(self._items),
+                "max_size": self.max_size,
+                "hit_rate": self._counts["hits"] / lookups if lookups else 0.0,
+            }
@@ -0,0 +1,170 @@
+"""Single-pass parser turning a customer spec into reusable SpecFeatures."""
+
+import hashlib
+import re
+from dataclasses import dataclass
+
+# Capability flags and the trigger words that raise them (substring match,
+# same semantics as the original `kw in spec_lower` checks).
+FLAG_KEYWORDS = {
+    "terahertz": ["terahertz", "thz"],
+    "tunable": ["tunable", "tuning"],
+    "pulsed": ["pulsed", "nanosecond", "ns-", "q-switch"],
+    "femtosecond": ["femtosecond", "ultrafast", "multiphoton"],
+    "modulation": ["modulation", "modulated", "fast switching"],
+    "security": ["security", "screening", "mail"],
+    "noise": ["noise", "rms"],
+}
+
+_KEYWORD_TO_FLAG = {kw: flag for flag, kws in FLAG_KEYWORDS.items() for kw in kws}
+
+# One alternation scanned once over the spec: a zero-width lookahead catches
+# (possibly overlapping) trigger words, the second branch catches a number or
+# numeric range with an optional unit.
+_SPEC_PATTERN = re.compile(
+    r"(?=(?P<kw>"
+    + "|".join(re.escape(kw) for kw in sorted(_KEYWORD_TO_FLAG, key=len, reverse=True))
+    + r"))"
+    r"|(?P<num>\d+(?:\.\d+)?)"
+    r"(?:\s*(?:-|to)\s*(?P<num2>\d+(?:\.\d+)?))?"
+    r"(?:\s*(?P<unit>nm|mw|milliwatt|thz|watt\b|w\b|%))?"
+)
+
+_NOISE_CONTEXT = re.compile(r"noise|rms")
+
+# Spelled-out units folded to the abbreviations the parser reads.
+_UNIT_SPELLINGS = [
+    (re.compile(r"(?<![a-z])milli-?watts?\b"), "mw"),
+    (re.compile(r"(?<![a-z])watts?\b"), "w"),
+    (re.compile(r"(?<![a-z])nanomet(?:er|re)s?\b"), "nm"),
+]
+_NUMBER_UNIT = re.compile(r"(\d)\s*(nm|mw|w|thz|%)(?![a-z])")
+
+
+@dataclass(frozen=True)
+class SpecFeatures:
+    """Immutable view of everything the scorers need from one spec.
+
+    Attributes:
+        raw: Original spec text.
+        text: Lowercased spec text, used for phrase matching.
+        wavelength_numbers: Integers that may denote a wavelength, i.e. whole
+            numbers that are bare or given in nm (not mW, W, THz or %).
+        wavelengths_nm: Values given in nm.
+        power_mw: Values given in mW / milliwatt.
+        power_w: Values given in W / watt.
+        thz_values: Values given in THz.
+        noise_limits_percent: Percent values next to "noise" or "rms".
+        flags: Names of the raised FLAG_KEYWORDS capability flags.
+    """
+
+    raw: str
+    text: str
+    wavelength_numbers: tuple = ()
+    wavelengths_nm: tuple = ()
+    power_mw: tuple = ()
+    power_w: tuple = ()
+    thz_values: tuple = ()
+    noise_limits_percent: tuple = ()
+    flags: frozenset = frozenset()
+
+    @property
+    def terahertz(self):
+        return "terahertz" in self.flags
+
+    @property
+    def tunable(self):
+        return "tunable" in self.flags
+
+    @property
+    def pulsed(self):
+        return "pulsed" in self.flags
+
+    @property
+    def femtosecond(self):
+        return "femtosecond" in self.flags
+
+    @property
+    def modulation(self):
+        return "modulation" in self.flags
+
+    @property
+    def security(self):
+        return "security" in self.flags
+
+    @property
+    def noise(self):
+        return "noise" in self.flags
+
+
+def parse_spec(spec_text):
+    """Parse a spec into SpecFeatures with a single scan of the text.
+
+    Args:
+        spec_text: Customer specification text.
+
+    Returns:
+        SpecFeatures instance.
+    """
+    text = spec_text.lower()
+    wavelength_numbers = []
+    values = {"nm": [], "mw": [], "w": [], "thz": [], "%": []}
+    flags = set()
+
+    for match in _SPEC_PATTERN.finditer(text):
+        keyword = match.group("kw")
+        if keyword is not None:
+            flags.add(_KEYWORD_TO_FLAG[keyword])
+            continue
+
+        raw_values = [v for v in (match.group("num"), match.group("num2")) if v]
+        unit = match.group("unit")
+        if unit in (None, "nm"):
+            wavelength_numbers.extend(int(v) for v in raw_values if "." not in v)
+        if unit is None:
+            continue
+        unit = {"milliwatt": "mw", "watt": "w"}.get(unit, unit)
+        if unit == "thz":
+            flags.add("terahertz")
+        if unit == "%":
+            window = text[max(0, match.start() - 25):match.end() + 10]
+            if not _NOISE_CONTEXT.search(window):
+                continue
+        values[unit].extend(float(v) for v in raw_values)
+
+    return SpecFeatures(
+        raw=spec_text,
+        text=text,
+        wavelength_numbers=tuple(wavelength_numbers),
+        wavelengths_nm=tuple(values["nm"]),
+        power_mw=tuple(values["mw"]),
+        power_w=tuple(values["w"]),
+        thz_values=tuple(values["thz"]),
+        noise_limits_percent=tuple(values["%"]),
+        flags=frozenset(flags),
+    )
+
+
+def as_spec_features(spec):
+    """Return spec unchanged if already parsed, otherwise parse it."""
+    if isinstance(spec, SpecFeatures):
+        return spec
+    return parse_spec(spec)
+
+
+def normalize_spec_text(spec_text):
+    """Fold case, whitespace and unit spelling so near-identical specs compare equal.
+
+    "Need 500 Milliwatts at 1064nm" and "need 500 mW  at 1064 nm" both
+    become "need 500 mw at 1064 nm".
+    """
+    text = " ".join(spec_text.lower().split())
+    for pattern, unit in _UNIT_SPELLINGS:
+        text = pattern.sub(unit, text)
+    return _NUMBER_UNIT.sub(r"\1 \2", text)
+
+
+def spec_fingerprint(spec_text):
+    """Return a short hash of the normalized spec, for use as a cache key."""
+    normalized = normalize_spec_text(spec_text)
+    return hashlib.blake2b(normalized.encode("utf-8"), digest_size=16).hexdigest()
@@ -0,0 +1,256 @@
+"""Numeric index over catalog wavelengths (nm) and power ranges (mW).
+
+Maps the numeric values parsed from a spec straight to the products they
+score for, instead of testing every number against every product:
+
+- discrete wavelengths: exact-value hash lookup
+- wavelength and power ranges: static centered interval trees answering
+  point-stabbing queries in O(log n + hits)
+- the "close to minimum power" rule: minimum powers sorted for bisection
+"""
+
+from bisect import bisect_right
+
+WAVELENGTH_EXACT_POINTS = 25
+WAVELENGTH_RANGE_POINTS = 20
+POWER_RANGE_POINTS = 20
+POWER_NEAR_POINTS = 5
+
+
+def build_interval_tree(intervals):
+    """Build a centered interval tree from (low, high, item) tuples.
+
+    Intervals are closed on both ends. Returns None for an empty input.
+    """
+    if not intervals:
+        return None
+
+    endpoints = sorted(v for low, high, _ in intervals for v in (low, high))
+    center = endpoints[len(endpoints) // 2]
+
+    left, right, overlapping = [], [], []
+    for interval in intervals:
+        if interval[1] < center:
+            left.append(interval)
+        elif interval[0] > center:
+            right.append(interval)
+        else:
+            overlapping.append(interval)
+
+    return {
+        "center": center,
+        "by_low": sorted(overlapping, key=lambda iv: iv[0]),
+        "by_high": sorted(overlapping, key=lambda iv: iv[1], reverse=True),
+        "left": build_interval_tree(left),
+        "right": build_interval_tree(right),
+    }
+
+
+def stab(tree, value):
+    """Return the items of all intervals containing value."""
+    hits = []
+    node = tree
+    while node is not None:
+        if value < node["center"]:
+            for low, _, item in node["by_low"]:
+                if low > value:
+                    break
+                hits.append(item)
+            node = node["left"]
+        elif value > node["center"]:
+            for _, high, item in node["by_high"]:
+                if high < value:
+                    break
+                hits.append(item)
+            node = node["right"]
+        else:
+            hits.extend(item for _, _, item in node["by_low"])
+            break
+    return hits
+
+
+def _product_entries(product):
+    """Return (exact wavelengths, wavelength range, power range) of a product."""
+    wavelengths = product.get("wavelengths", [])
+    exact = tuple(set(wavelengths)) if isinstance(wavelengths, list) else ()
+    return (
+        exact,
+        tuple(product.get("wavelengths_range") or ()),
+        tuple(product.get("power_range_mw") or ()),
+    )
+
+
+def build_spectral_index(catalog):
+    """Build the numeric wavelength/power index for a catalog.
+
+    Returns:
+        Dict with wavelength_exact (nm -> list of IDs), wavelength_ranges and
+        power_ranges (interval trees of IDs), power_mins / power_min_ids
+        (minimum powers in mW, sorted ascending, with their product IDs),
+        wavelength_envelope / power_envelope ((lowest low, highest high) over
+        all ranges, or None) and entries (per-product numeric values, used by
+        update_spectral_index).
+    """
+    return _assemble({product["id"]: _product_entries(product) for product in catalog})
+
+
+def update_spectral_index(index, changed_products, removed_ids=()):
+    """Return a new index with some products replaced, added or removed.
+
+    Only the changed records are read; the others are reassembled from the
+    numeric values already kept in index["entries"]. The input index is not
+    modified.
+    """
+    entries = dict(index["entries"])
+    for product_id in removed_ids:
+        entries.pop(product_id, None)
+    for product in changed_products:
+        entries[product["id"]] = _product_entries(product)
+    return _assemble(entries)
+
+
+def _assemble(entries):
+    wavelength_exact = {}
+    wavelength_ranges = []
+    power_ranges = []
+
+    for product_id, (exact, wl_range, power_range) in entries.items():
+        for wl in exact:
+            wavelength_exact.setdefault(wl, []).append(product_id)
+        if wl_range:
+            wavelength_ranges.append((wl_range[0], wl_range[1], product_id))
+        if power_range:
+            power_ranges.append((power_range[0], power_range[1], product_id))
+
+    power_mins = sorted((low, product_id) for low, _, product_id in power_ranges)
+
+    return {
+        "wavelength_exact": wavelength_exact,
+        "wavelength_ranges": build_interval_tree(wavelength_ranges),
+        "power_ranges": build_interval_tree(power_ranges),
+        "power_mins": [low for low, _ in power_mins],
+        "power_min_ids": [product_id for _, product_id in power_mins],
+        "wavelength_envelope": _envelope(wavelength_ranges),
+        "power_envelope": _envelope(power_ranges),
+        "entries": entries,
+    }
+
+
+def _envelope(intervals):
+    """Return (lowest low, highest high) over intervals, or None if empty."""
+    if not intervals:
+        return None
+    return min(iv[0] for iv in intervals), max(iv[1] for iv in intervals)
+
+
+def spectral_points(index, features):
+    """Score the numeric wavelength and power rules for a parsed spec.
+
+    Args:
+        index: Dict from build_spectral_index.
+        features: SpecFeatures from utils.spec_parser.parse_spec.
+
+    Returns:
+        Dict mapping product ID to the points earned (only non-zero entries).
+    """
+    points = {}
+
+    def add(product_id, value):
+        points[product_id] = points.get(product_id, 0) + value
+
+    # Exact wavelengths count once per catalog line, ranges once per mention.
+    for wl in set(features.wavelength_numbers):
+        for product_id in index["wavelength_exact"].get(wl, ()):
+            add(product_id, WAVELENGTH_EXACT_POINTS)
+
+    for wl in features.wavelength_numbers:
+        for product_id in stab(index["wavelength_ranges"], wl):
+            add(product_id, WAVELENGTH_RANGE_POINTS)
+
+    for mw in features.power_mw:
+        in_range = set(stab(index["power_ranges"], mw))
+        for product_id in in_range:
+            add(product_id, POWER_RANGE_POINTS)
+        # Below twice the product's minimum power (and not in range).
+        start = bisect_right(index["power_mins"], mw / 2)
+        for product_id in index["power_min_ids"][start:]:
+            if product_id not in in_range:
+                add(product_id, POWER_NEAR_POINTS)
+
+    for w in features.power_w:
+        for product_id in stab(index["power_ranges"], w * 1000):
+            add(product_id, POWER_RANGE_POINTS)
+
+    return points
+
+
+def exact_wavelength_ids(index, features):
+    """Return IDs of products listing one of the spec's wavelengths exactly."""
+    ids = set()
+    for wl in set(features.wavelength_numbers):
+        ids.update(index["wavelength_exact"].get(wl, ()))
+    return ids
+
+
+def product_numeric_points(product, features):
+    """Score the numeric rules for a single product from its record.
+
+    Gives the same points as spectral_points does for that product; used when
+    only a few products need scoring.
+    """
+    points = 0
+
+    wavelengths = product.get("wavelengths", [])
+    if isinstance(wavelengths, list):
+        spec_wavelengths = set(features.wavelength_numbers)
+        points += WAVELENGTH_EXACT_POINTS * len(spec_wavelengths & set(wavelengths))
+
+    wl_range = product.get("wavelengths_range")
+    if wl_range:
+        for wl in features.wavelength_numbers:
+            if wl_range[0] <= wl <= wl_range[1]:
+                points += WAVELENGTH_RANGE_POINTS
+
+    power_range = product.get("power_range_mw")
+    if power_range:
+        for mw in features.power_mw:
+            if power_range[0] <= mw <= power_range[1]:
+                points += POWER_RANGE_POINTS
+            elif mw < power_range[0] * 2:
+                points += POWER_NEAR_POINTS
+        for w in features.power_w:
+            if power_range[0] <= w * 1000 <= power_range[1]:
+                points += POWER_RANGE_POINTS
+
+    return points
+
+
+def range_points_bound(index, features):
+    """Upper bound on the range and power points any single product can earn.
+
+    Values outside the envelope of all catalog ranges cannot score and are
+    left out. Excludes exact wavelength points, which only products found
+    through exact_wavelength_ids can earn.
+    """
+    bound = 0
+
+    wl_envelope = index["wavelength_envelope"]
+    if wl_envelope:
+        bound += WAVELENGTH_RANGE_POINTS * sum(
+            1 for wl in features.wavelength_numbers
+            if wl_envelope[0] <= wl <= wl_envelope[1]
+        )
+
+    power_envelope = index["power_envelope"]
+    if power_envelope:
+        for mw in features.power_mw:
+            if power_envelope[0] <= mw <= power_envelope[1]:
+                bound += POWER_RANGE_POINTS
+            elif mw < index["power_mins"][-1] * 2:
+                bound += POWER_NEAR_POINTS
+        bound += POWER_RANGE_POINTS * sum(
+            1 for w in features.power_w
+            if power_envelope[0] <= w * 1000 <= power_envelope[1]
+        )
+
+    return bound
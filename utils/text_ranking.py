@@ -0,0 +1,184 @@
+"""BM25 text ranking over the catalog, an alternative to the rule scorer.
+
+The hand-weighted rules saturate at 99% on long specs, so many products tie
+near the top. This mode ranks by Okapi BM25 instead:
+
+- each product's text fields are tokenized once per catalog snapshot into a
+  sparse term x product weight matrix (CSR arrays, as in utils.batch_scoring)
+- a spec is scored with one sparse dot product: the rows of its distinct
+  terms are summed into a product score vector
+- the text score is combined with the numeric wavelength and power rules
+  from utils.spectral_index, each normalized by its upper bound for the spec
+
+Numbers are left to the numeric rules and are not indexed as terms.
+"""
+
+import math
+import re
+
+import numpy as np
+
+from utils.spectral_index import (
+    WAVELENGTH_EXACT_POINTS,
+    spectral_points,
+    range_points_bound,
+)
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Term frequency multiplier per product field (a simple BM25F weighting).
+FIELD_WEIGHTS = {
+    "name": 3,
+    "named_models": 3,
+    "keywords": 2,
+    "applications": 2,
+    "category": 2,
+    "key_features": 1,
+    "type": 1,
+}
+
+# Share of the combined score taken by text and numeric evidence. When a spec
+# has no evidence of one kind, the other takes the full weight.
+TEXT_WEIGHT = 0.65
+NUMERIC_WEIGHT = 0.35
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it need of on or our "
+    "that the this to we with".split()
+)
+
+
+def tokenize(text):
+    """Return lowercase word tokens, without stopwords and pure numbers."""
+    return [
+        token for token in _TOKEN.findall(text.lower())
+        if token not in _STOPWORDS and not token.isdigit()
+    ]
+
+
+def _field_text(value):
+    if isinstance(value, list):
+        return " ".join(str(v) for v in value)
+    return str(value) if value else ""
+
+
+def build_text_index(catalog, k1=BM25_K1, b=BM25_B):
+    """Build the BM25 term x product matrix for a catalog.
+
+    Args:
+        catalog: Catalog store (see utils.catalog_store), streamed once.
+        k1, b: BM25 term-frequency saturation and length normalization.
+
+    Returns:
+        Dict with ids (product IDs in catalog order), position (ID -> column),
+        vocab (term -> row), indptr / columns / weights (CSR rows of
+        per-product BM25 term weights) and term_bounds (per-term maximum
+        weight, idf * (k1 + 1)).
+    """
+    ids = []
+    doc_terms = []
+    doc_lengths = []
+    vocab = {}
+    for product in catalog:
+        counts = {}
+        for field, weight in FIELD_WEIGHTS.items():
+            for token in tokenize(_field_text(product.get(field))):
+                term = vocab.setdefault(token, len(vocab))
+                counts[term] = counts.get(term, 0) + weight
+        ids.append(product["id"])
+        doc_terms.append(counts)
+        doc_lengths.append(sum(counts.values()))
+
+    n_docs = len(ids)
+    avg_length = (sum(doc_lengths) / n_docs) if n_docs else 0.0
+    rows = [[] for _ in vocab]
+    for position, counts in enumerate(doc_terms):
+        norm = k1 * (1 - b + b * doc_lengths[position] / avg_length) if avg_length else k1
+        for term, tf in counts.items():
+            rows[term].append((position, tf * (k1 + 1) / (tf + norm)))
+
+    idf = np.array([
+        math.log(1 + (n_docs - len(row) + 0.5) / (len(row) + 0.5)) for row in rows
+    ])
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(row) for row in rows])
+    columns = np.fromiter((p for row in rows for p, _ in row), dtype=np.int64, count=int(indptr[-1]))
+    weights = np.fromiter((w for row in rows for _, w in row), dtype=np.float64, count=int(indptr[-1]))
+    weights *= np.repeat(idf, np.diff(indptr))
+
+    return {
+        "ids": ids,
+        "position": {product_id: i for i, product_id in enumerate(ids)},
+        "vocab": vocab,
+        "indptr": indptr,
+        "columns": columns,
+        "weights": weights,
+        "term_bounds": idf * (k1 + 1),
+    }
+
+
+def text_scores(text_index, text):
+    """Score every product against a text with one sparse dot product.
+
+    Returns:
+        (scores, bound): BM25 score per product (catalog order) and the
+        highest score any product could reach for this text.
+    """
+    n_products = len(text_index["ids"])
+    terms = sorted({text_index["vocab"][t] for t in tokenize(text) if t in text_index["vocab"]})
+    if not terms:
+        return np.zeros(n_products), 0.0
+
+    indptr = text_index["indptr"]
+    spans = [np.arange(indptr[t], indptr[t + 1]) for t in terms]
+    entries = np.concatenate(spans)
+    scores = np.bincount(
+        text_index["columns"][entries], weights=text_index["weights"][entries], minlength=n_products
+    )
+    return scores, float(text_index["term_bounds"][terms].sum())
+
+
+def combined_scores(text_index, spectral, features):
+    """Combine BM25 and numeric rule evidence into scores in [0, 1).
+
+    Args:
+        text_index: Dict from build_text_index.
+        spectral: Numeric index from utils.spectral_index.build_spectral_index
+            for the same catalog.
+        features: SpecFeatures from utils.spec_parser.parse_spec.
+
+    Returns:
+        Float array of combined scores per product, in catalog order.
+    """
+    text, text_bound = text_scores(text_index, features.text)
+
+    numeric = np.zeros(len(text_index["ids"]))
+    for product_id, points in spectral_points(spectral, features).items():
+        numeric[text_index["position"][product_id]] = points
+    exact_hits = sum(1 for wl in set(features.wavelength_numbers) if wl in spectral["wavelength_exact"])
+    numeric_bound = WAVELENGTH_EXACT_POINTS * exact_hits + range_points_bound(spectral, features)
+
+    total = 0.0
+    combined = np.zeros(len(text_index["ids"]))
+    if text_bound:
+        combined += TEXT_WEIGHT * text / text_bound
+        total += TEXT_WEIGHT
+    if numeric_bound:
+        combined += NUMERIC_WEIGHT * np.minimum(numeric / numeric_bound, 1.0)
+        total += NUMERIC_WEIGHT
+    return combined / total if total else combined
+
+
+def rank_products(text_index, spectral, features, k=None):
+    """Return (combined score, product ID) pairs, best first.
+
+    Products without evidence are left out; ties keep catalog order.
+    """
+    combined = combined_scores(text_index, spectral, features)
+    ranked = np.argsort(-combined, kind="stable")[:int((combined > 0).sum())]
+    if k is not None:
+        ranked = ranked[:k]
+    ids = text_index["ids"]
+    return [(float(combined[i]), ids[i]) for i in ranked]
@@ -0,0 +1,183 @@
+"""Pre-flight token, cost and latency estimates for classifier and proposal calls.
+
+Input tokens are counted on the prompt that would be sent. count_tokens()
+uses tiktoken's o200k_base encoding (the GPT-5 tokenizer) when the package
+and its encoding file are available locally, else approximate_tokens(), a
+rule-based count that follows the BPE pre-tokenizer's splits. Either count
+is scaled per model by the observed ratio of billed to estimated input
+tokens (USAGE_HISTORY.calibrate), which also absorbs the difference to
+Anthropic's tokenizer.
+
+Output tokens cannot be counted in advance; they are predicted as the
+median of recent outputs per complexity tier, and latency as that size
+times the model's recent milliseconds per output token. Until
+HISTORY_MIN_SAMPLES live calls have been seen the priors below (the sizes
+and speeds of the demo-mode responses) are used.
+"""
+
+import math
+import re
+import statistics
+import threading
+from collections import deque
+from functools import lru_cache
+
+TOKENIZER_ENCODING = "o200k_base"
+
+# Chat formatting tokens added per message (role, separators).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+HISTORY_MIN_SAMPLES = 5
+CALIBRATION_WEIGHT = 0.2
+
+DEFAULT_OUTPUT_TOKENS = {
+    "classifier": 82,
+    "SIMPLE": 856,
+    "MEDIUM": 1243,
+    "COMPLEX": 1876,
+}
+
+DEFAULT_MS_PER_OUTPUT_TOKEN = {
+    "gpt-5-nano": 2.2,
+    "gpt-5-mini": 2.6,
+    "claude-sonnet-4-20250514": 2.9,
+}
+
+# Pieces the BPE pre-tokenizer splits text into: letter runs, digit groups
+# of up to three, whitespace and other symbols.
+_PIECE_RE = re.compile(r"[^\W\d_]+|\d{1,3}|\s+|[^\w\s]+|_+")
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    """The tiktoken encoding, or None if tiktoken or its encoding file is unavailable."""
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding(TOKENIZER_ENCODING)
+    except Exception:
+        return None
+
+
+def approximate_tokens(text):
+    """Approximate the BPE token count of text without a tokenizer.
+
+    Words of up to 8 letters (with their leading space) are one token and
+    longer ones one per 8 letters; digit groups of up to three are one
+    token; symbols pair up; single spaces merge into the next word.
+    """
+    tokens = 0
+    for piece in _PIECE_RE.findall(text):
+        if piece[0].isalpha():
+            tokens += math.ceil(len(piece) / 8)
+        elif piece[0].isdigit():
+            tokens += 1
+        elif piece.isspace():
+            tokens += 0 if piece == " " else 1
+        else:
+            tokens += math.ceil(len(piece) / 2)
+    return tokens
+
+
+def count_tokens(text):
+    """Return the token count of text (tiktoken if available, else approximate_tokens)."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return approximate_tokens(text)
+
+
+def count_message_tokens(messages):
+    """Token count of chat messages whose content is a string or a list of text blocks."""
+    total = 0
+    for message in messages:
+        content = message["content"]
+        if not isinstance(content, str):
+            content = "".join(block.get("text", "") for block in content)
+        total += count_tokens(content) + MESSAGE_OVERHEAD_TOKENS
+    return total
+
+
+def tokenizer_name():
+    """Name of the count count_tokens uses: "tiktoken/o200k_base" or "approximate"."""
+    return f"tiktoken/{TOKENIZER_ENCODING}" if _encoding() is not None else "approximate"
+
+
+class UsageHistory:
+    """Recent live usage used to predict output size, latency and input scale.
+
+    Args:
+        max_samples: Observations kept per tier and per model.
+    """
+
+    def __init__(self, max_samples=200):
+        self.max_samples = max_samples
+        self._lock = threading.Lock()
+        self._output_tokens = {}
+        self._ms_per_token = {}
+        self._input_ratio = {}
+
+    def record(self, tier, model, output_tokens, latency_ms):
+        """Record the output size of a live call for tier ("classifier" or a complexity) and model."""
+        if output_tokens <= 0:
+            return
+        with self._lock:
+            self._output_tokens.setdefault(tier, deque(maxlen=self.max_samples)).append(output_tokens)
+            if latency_ms > 0:
+                self._ms_per_token.setdefault(model, deque(maxlen=self.max_samples)).append(
+                    latency_ms / output_tokens
+                )
+
+    def calibrate(self, model, estimated_tokens, billed_tokens):
+        """Fold one billed/estimated input token ratio into model's scale factor.
+
+        estimated_tokens is an estimate already scaled by input_scale(model).
+        """
+        if estimated_tokens <= 0 or billed_tokens <= 0:
+            return
+        with self._lock:
+            previous = self._input_ratio.get(model)
+            ratio = (previous or 1.0) * billed_tokens / estimated_tokens
+            self._input_ratio[model] = ratio if previous is None else (
+                previous + CALIBRATION_WEIGHT * (ratio - previous)
+            )
+
+    def input_scale(self, model):
+        """Factor applied to counted input tokens for model (1.0 until calibrated)."""
+        with self._lock:
+            return self._input_ratio.get(model, 1.0)
+
+    def output_tokens(self, tier):
+        """Predicted output tokens for tier: the recent median, else the prior."""
+        with self._lock:
+            samples = list(self._output_tokens.get(tier, ()))
+        if len(samples) < HISTORY_MIN_SAMPLES:
+            return DEFAULT_OUTPUT_TOKENS.get(tier, DEFAULT_OUTPUT_TOKENS["MEDIUM"])
+        return int(statistics.median(samples))
+
+    def ms_per_output_token(self, model):
+        """Recent median call latency per output token of model, else the prior."""
+        with self._lock:
+            samples = list(self._ms_per_token.get(model, ()))
+        if len(samples) < HISTORY_MIN_SAMPLES:
+            return DEFAULT_MS_PER_OUTPUT_TOKEN.get(model, max(DEFAULT_MS_PER_OUTPUT_TOKEN.values()))
+        return statistics.median(samples)
+
+    def latency_ms(self, model, output_tokens):
+        """Predicted latency of a call to model producing output_tokens."""
+        return int(self.ms_per_output_token(model) * output_tokens)
+
+    def stats(self):
+        """Return samples per tier, ms per token per model and input scales."""
+        with self._lock:
+            return {
+                "tokenizer": tokenizer_name(),
+                "output_samples": {tier: len(s) for tier, s in self._output_tokens.items()},
+                "ms_per_output_token": {
+                    model: round(statistics.median(s), 3) for model, s in self._ms_per_token.items()
+                },
+                "input_scale": {model: round(r, 3) for model, r in self._input_ratio.items()},
+            }
+
+
+USAGE_HISTORY = UsageHistory()